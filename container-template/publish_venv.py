@@ -0,0 +1,199 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import subprocess
+from datetime import datetime, timezone
+
+# Only needed for the upload; the image build stage archives with --skip-upload and has no boto3
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.client import Config
+except ImportError:
+    boto3 = None
+
+MB = 1024 * 1024
+MANIFEST_SUFFIX = '.manifest.json'
+
+def get_s3_client(endpoint_url=None):
+    # MinIO configuration (same environment variables as the template Dockerfiles)
+    return boto3.client('s3',
+                        endpoint_url=endpoint_url or os.environ.get('MINIO_ENDPOINT', 'https://s3.madiator.com'),
+                        aws_access_key_id=os.environ.get('MINIO_ACCESS_KEY', ''),
+                        aws_secret_access_key=os.environ.get('MINIO_SECRET_KEY', ''),
+                        config=Config(signature_version='s3v4'),
+                        region_name=os.environ.get('MINIO_REGION', 'us-east-1'))
+
+def format_throughput(num_bytes, elapsed):
+    if elapsed <= 0:
+        return "n/a"
+    return f"{num_bytes / MB / elapsed:.2f} MB/s"
+
+def report_stage(stage, num_bytes, elapsed):
+    print(f"[{stage}] {num_bytes / MB:.2f} MB in {elapsed:.2f}s ({format_throughput(num_bytes, elapsed)})")
+    return {'bytes': num_bytes, 'seconds': round(elapsed, 3)}
+
+def get_directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            file_path = os.path.join(root, name)
+            if not os.path.islink(file_path):
+                total += os.path.getsize(file_path)
+    return total
+
+def build_archive(source_dir, archive_path, level=3, threads=0):
+    source_dir = os.path.abspath(source_dir.rstrip('/'))
+    parent_dir, venv_name = os.path.split(source_dir)
+    source_size = get_directory_size(source_dir)
+
+    # tar streams into zstd; -T0 lets zstd use one worker per core
+    zstd_command = ['zstd', f'-T{threads}', f'-{level}', '-f', '-q', '-o', archive_path]
+    if level > 19:
+        zstd_command.insert(1, '--ultra')
+
+    print(f"Archiving {source_dir} ({source_size / MB:.2f} MB) to {archive_path} with zstd level {level}...")
+    start_time = time.time()
+    tar_process = subprocess.Popen(['tar', '-cf', '-', '-C', parent_dir, venv_name], stdout=subprocess.PIPE)
+    zstd_process = subprocess.Popen(zstd_command, stdin=tar_process.stdout)
+    tar_process.stdout.close()
+    zstd_returncode = zstd_process.wait()
+    tar_returncode = tar_process.wait()
+    if tar_returncode != 0 or zstd_returncode != 0:
+        raise RuntimeError(f"Archive failed (tar exit {tar_returncode}, zstd exit {zstd_returncode})")
+    elapsed = time.time() - start_time
+
+    archive_size = os.path.getsize(archive_path)
+    stats = report_stage('archive', source_size, elapsed)
+    stats['archive_bytes'] = archive_size
+    stats['ratio'] = round(source_size / archive_size, 2) if archive_size else 0
+    print(f"[archive] compressed to {archive_size / MB:.2f} MB (ratio {stats['ratio']})")
+    return stats
+
+def compute_sha256(file_path, block_size=8 * MB):
+    sha256 = hashlib.sha256()
+    start_time = time.time()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha256.update(block)
+    stats = report_stage('checksum', os.path.getsize(file_path), time.time() - start_time)
+    return sha256.hexdigest(), stats
+
+class UploadProgress:
+    def __init__(self, file_path, interval=1.0):
+        self.total_size = os.path.getsize(file_path)
+        self.uploaded = 0
+        self.interval = interval
+        self.start_time = time.time()
+        self.last_report = 0
+        self.lock = threading.Lock()
+
+    # Called from the transfer worker threads
+    def __call__(self, bytes_amount):
+        with self.lock:
+            self.uploaded += bytes_amount
+            now = time.time()
+            if now - self.last_report < self.interval and self.uploaded < self.total_size:
+                return
+            self.last_report = now
+            percentage = (self.uploaded / self.total_size) * 100 if self.total_size else 100
+            speed = format_throughput(self.uploaded, now - self.start_time)
+            print(f"[upload] {percentage:.1f}% ({self.uploaded / MB:.2f} / {self.total_size / MB:.2f} MB) at {speed}")
+
+def upload_archive(s3_client, archive_path, bucket, object_name, chunk_size_mb=64, concurrency=16):
+    transfer_config = TransferConfig(multipart_threshold=chunk_size_mb * MB,
+                                     multipart_chunksize=chunk_size_mb * MB,
+                                     max_concurrency=concurrency,
+                                     use_threads=True)
+    print(f"Uploading {archive_path} to {bucket}/{object_name} "
+          f"({chunk_size_mb} MB parts, {concurrency} concurrent)...")
+    start_time = time.time()
+    s3_client.upload_file(archive_path, bucket, object_name,
+                          Config=transfer_config,
+                          Callback=UploadProgress(archive_path))
+    return report_stage('upload', os.path.getsize(archive_path), time.time() - start_time)
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_manifest(manifest, manifest_path, s3_client=None, bucket=None, object_name=None):
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Manifest written to {manifest_path}")
+
+    if s3_client:
+        s3_client.put_object(Bucket=bucket,
+                             Key=object_name + MANIFEST_SUFFIX,
+                             Body=json.dumps(manifest).encode('utf-8'),
+                             ContentType='application/json')
+        print(f"Manifest uploaded to {bucket}/{object_name}{MANIFEST_SUFFIX}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Build a zstd venv archive and publish it to MinIO/S3.')
+    parser.add_argument('--source', help='venv directory to archive (skip to publish an existing archive)')
+    parser.add_argument('--archive', required=True, help='path of the .tar.zst archive to build and/or upload')
+    parser.add_argument('--object-name', help='object key, defaults to <archive name without extension>/<archive name>')
+    parser.add_argument('--bucket', default=os.environ.get('MINIO_BUCKET', 'better'))
+    parser.add_argument('--endpoint', default=None, help='S3 endpoint, defaults to $MINIO_ENDPOINT')
+    parser.add_argument('--level', type=int, default=int(os.environ.get('ZSTD_LEVEL', 3)), help='zstd compression level')
+    parser.add_argument('--threads', type=int, default=0, help='zstd worker threads (0 = one per core)')
+    parser.add_argument('--chunk-size-mb', type=int, default=int(os.environ.get('UPLOAD_CHUNK_SIZE_MB', 64)))
+    parser.add_argument('--concurrency', type=int, default=int(os.environ.get('UPLOAD_CONCURRENCY', 16)))
+    parser.add_argument('--skip-upload', action='store_true', help='only build the archive and manifest')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    archive_name = os.path.basename(args.archive)
+    object_name = args.object_name or f"{archive_name.split('.')[0]}/{archive_name}"
+    stages = {}
+
+    try:
+        if not args.skip_upload and boto3 is None:
+            raise RuntimeError("boto3 is not installed, pass --skip-upload to only build the archive")
+
+        zstd_level = args.level if args.source else None
+        if args.source:
+            stages['archive'] = build_archive(args.source, args.archive, args.level, args.threads)
+        else:
+            # Archive built earlier (e.g. in the image build stage): keep its stage report
+            previous = load_manifest(args.archive + MANIFEST_SUFFIX)
+            if previous and previous.get('size') == os.path.getsize(args.archive) and 'archive' in previous.get('stages', {}):
+                stages['archive'] = previous['stages']['archive']
+                zstd_level = previous.get('zstd_level')
+
+        sha256, stages['checksum'] = compute_sha256(args.archive)
+        manifest = {
+            'object_name': object_name,
+            'size': os.path.getsize(args.archive),
+            'sha256': sha256,
+            'compression': 'zstd',
+            'zstd_level': zstd_level,
+            'created': datetime.now(timezone.utc).isoformat(),
+        }
+
+        s3_client = None
+        if not args.skip_upload:
+            s3_client = get_s3_client(args.endpoint)
+            stages['upload'] = upload_archive(s3_client, args.archive, args.bucket, object_name,
+                                              args.chunk_size_mb, args.concurrency)
+
+        manifest['stages'] = stages
+        write_manifest(manifest, args.archive + MANIFEST_SUFFIX, s3_client, args.bucket, object_name)
+    except Exception as e:
+        print(f"Error publishing {args.archive}: {str(e)}")
+        return 1
+
+    print(f"Published {object_name} ({manifest['size']} bytes, sha256 {sha256})")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,22 +4,41 @@ monkey.patch_all()
 import os
 import threading
 import time
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, g, send_file
 from flask_sock import Sock
 import json
 import signal
 import shutil
 import subprocess
 import traceback
+import re
 
-from utils.ssh_utils import setup_ssh, save_ssh_password, get_ssh_password, check_ssh_config, SSH_CONFIG_FILE
+from utils.ssh_utils import setup_ssh, save_ssh_password, get_ssh_password, check_ssh_config
 from utils.filebrowser_utils import configure_filebrowser, start_filebrowser, stop_filebrowser, get_filebrowser_status, FILEBROWSER_PORT
 from utils.app_utils import (
     run_app, update_process_status, check_app_directories, get_app_status,
-    force_kill_process_by_name, update_webui_user_sh, save_install_status,
-    get_install_status, download_and_unpack_venv, fix_custom_nodes, is_process_running,
+    force_kill_process_by_name, find_and_kill_process_by_port, update_webui_user_sh, save_install_status,
+    get_install_status, download_and_unpack_venv, is_process_running,
 )
-from utils.websocket_utils import send_websocket_message, active_websockets
+from utils.log_utils import search_logs
+from utils.custom_nodes_utils import start_fix_custom_nodes
+from utils.prometheus_utils import (
+    render_metrics, http_request_duration, symlink_sync_duration, ui_interactive_duration, ui_transfer_bytes, ui_page_loads,
+)
+from utils.instance_utils import (
+    instance_key, split_instance_key, get_app_instances, allocate_instance_ports, build_instance_command,
+    write_nginx_upstream, render_nginx_upstream, MAX_INSTANCES, BALANCER_PORT_OFFSET,
+)
+from utils.idle_utils import start_idle_monitor, release_app_port, last_activity, idle_stats
+from utils.telemetry_utils import start_resource_sampler, get_app_metrics, sampler_stats
+from utils.model_download_utils import (
+    start_download_workers, queue_model_download, cancel_model_download, retry_model_download, list_downloads,
+    get_model_categories, MODEL_CATEGORIES,
+)
+from utils.gallery_utils import start_gallery_indexer, query_gallery, get_gallery_image, gallery_stats
+from utils.sync_utils import start_sync_scheduler, start_sync, start_restore, get_sync_status, get_sync_paths, get_sync_target
+from utils.disk_utils import start_disk_scan, get_disk_usage, get_directory_usage, get_largest_files, scan_state, WORKSPACE_DIR
+from utils.websocket_utils import send_websocket_message, register_websocket, unregister_websocket, negotiate_protocol
 from utils.app_configs import get_app_configs, add_app_config, remove_app_config
 
 app = Flask(__name__)
@@ -35,6 +54,25 @@ S3_BASE_URL = "https://better.s3.madiator.com/"
 
 SETTINGS_FILE = '/workspace/.app_settings.json'
 
+# The websocket route only returns when the socket closes, so its "latency" is the connection length
+UNTIMED_ROUTES = ['/ws']
+
+@app.before_request
+def start_request_timer():
+    if request.path in UNTIMED_ROUTES:
+        return
+    g.request_start_time = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    start_time = g.get('request_start_time')
+    if start_time is not None:
+        # Label by route pattern (e.g. /logs/<app_name>) to keep the series count bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_request_duration.observe(time.perf_counter() - start_time,
+                                      route=route, method=request.method, status=response.status_code)
+    return response
+
 def load_settings():
     if os.path.exists(SETTINGS_FILE):
         with open(SETTINGS_FILE, 'r') as f:
@@ -53,14 +91,42 @@ def check_running_processes():
             send_websocket_message('status_update', {app_name: current_status})
         time.sleep(5)
 
+# Static assets are built with content hashes by build_static.py (see static/manifest.json)
+STATIC_MANIFEST_FILE = os.path.join(app.static_folder, 'manifest.json')
+static_manifest = None
+
+def asset_url(name):
+    global static_manifest
+    if static_manifest is None:
+        try:
+            with open(STATIC_MANIFEST_FILE, 'r') as f:
+                static_manifest = json.load(f)
+        except (OSError, ValueError):
+            static_manifest = {}  # not built (development), serve the plain files
+    return f"/static/{static_manifest.get(name, name)}"
+
+app.jinja_env.globals['asset_url'] = asset_url
+
 @app.route('/')
 def index():
+    # In the container nginx serves the prebuilt static/index.html; this is the fallback
+    return render_template('index.html')
+
+@app.route('/client_timing', methods=['POST'])
+def client_timing():
+    # sendBeacon posts the JSON as text/plain
+    data = request.get_json(force=True, silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('interactive_ms'), (int, float)):
+        return jsonify({'status': 'error', 'message': 'interactive_ms is required'}), 400
+    ui_interactive_duration.observe(data['interactive_ms'] / 1000)
+    if isinstance(data.get('transfer_bytes'), (int, float)):
+        ui_transfer_bytes.inc(data['transfer_bytes'])
+    ui_page_loads.inc()
+    return jsonify({'status': 'success'})
+
+@app.route('/bootstrap')
+def bootstrap():
     settings = load_settings()
-    
-    # Determine the current SSH authentication method
-    with open(SSH_CONFIG_FILE, 'r') as f:
-        ssh_config = f.read()
-    current_auth_method = 'key' if 'PasswordAuthentication no' in ssh_config else 'password'
 
     # Get the current SSH password if it exists
     ssh_password = get_ssh_password()
@@ -79,20 +145,51 @@ def index():
             'status': status,
             'installed': dirs_ok,
             'install_status': install_status,
-            'is_bcomfy': app_name == 'bcomfy'  # Add this line
+            'is_bcomfy': app_name == 'bcomfy'
         }
-    filebrowser_status = get_filebrowser_status()
-    return render_template('index.html', 
-                           apps=app_configs, 
-                           app_status=app_status, 
-                           pod_id=RUNPOD_POD_ID, 
-                           RUNPOD_PUBLIC_IP=os.environ.get('RUNPOD_PUBLIC_IP'),
-                           RUNPOD_TCP_PORT_22=os.environ.get('RUNPOD_TCP_PORT_22'),
-                           settings=settings,
-                           current_auth_method=current_auth_method,
-                           ssh_password=ssh_password,
-                           ssh_password_status=ssh_password_status,
-                           filebrowser_status=filebrowser_status)
+    response = jsonify({
+        'pod_id': RUNPOD_POD_ID,
+        'app_status': app_status,
+        'ssh': {
+            'public_ip': os.environ.get('RUNPOD_PUBLIC_IP'),
+            'port': os.environ.get('RUNPOD_TCP_PORT_22'),
+            'password_status': ssh_password_status,
+            'password': ssh_password
+        },
+        'settings': settings,
+        'filebrowser_status': get_filebrowser_status()
+    })
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+def launch_app(app_name, index=0, port=None):
+    # Update webui-user.sh for Forge and A1111
+    if app_name in ['bforge', 'ba1111']:
+        update_webui_user_sh(app_name, app_configs)
+
+    # Free the port if it is held for an on-demand start
+    if index == 0:
+        release_app_port(app_name)
+
+    port = port or app_configs[app_name]['port']
+    command = build_instance_command(app_name, index, port, app_configs)
+    threading.Thread(target=run_app, args=(instance_key(app_name, index), command, running_processes, port)).start()
+
+def update_instance_balancer(app_name, ports=None):
+    if ports is None:
+        ports = [running_processes[key]['port'] for key in get_app_instances(app_name, running_processes)
+                 if get_app_status(key, running_processes) == 'running']
+    return write_nginx_upstream(app_name, ports, app_configs[app_name]['port'] + BALANCER_PORT_OFFSET)
+
+def stop_app_with_instances(app_name):
+    # Idle stops take the extra instances down with the app and empty its balancer
+    for key in get_app_instances(app_name, running_processes):
+        stop_app_process(key)
+    update_instance_balancer(app_name, [])
+
+def can_launch_app(app_name):
+    dirs_ok, _ = check_app_directories(app_name, app_configs)
+    return dirs_ok
 
 @app.route('/start/<app_name>')
 def start_app(app_name):
@@ -100,18 +197,35 @@ def start_app(app_name):
     if not dirs_ok:
         return jsonify({'status': 'error', 'message': message})
     
-    if app_name in app_configs and get_app_status(app_name, running_processes) == 'stopped':
-        # Update webui-user.sh for Forge and A1111
-        if app_name in ['bforge', 'ba1111']:
-            update_webui_user_sh(app_name, app_configs)
+    instances = request.args.get('instances', 1, type=int)
+    if not 1 <= instances <= MAX_INSTANCES:
+        return jsonify({'status': 'error', 'message': f'instances must be between 1 and {MAX_INSTANCES}'})
 
-        command = app_configs[app_name]['command']
-        threading.Thread(target=run_app, args=(app_name, command, running_processes)).start()
-        return jsonify({'status': 'started'})
-    return jsonify({'status': 'already_running'})
+    stopped = [index for index in range(instances)
+               if get_app_status(instance_key(app_name, index), running_processes) == 'stopped']
+    if app_name not in app_configs or not stopped:
+        return jsonify({'status': 'already_running'})
 
-@app.route('/stop/<app_name>')
-def stop_app(app_name):
+    try:
+        extra_ports = iter(allocate_instance_ports(app_name, len([index for index in stopped if index > 0]),
+                                                   app_configs, running_processes))
+    except RuntimeError as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+
+    ports = {}
+    for index in range(instances):
+        key = instance_key(app_name, index)
+        if index not in stopped:
+            ports[key] = running_processes[key]['port'] or app_configs[app_name]['port']
+            continue
+        ports[key] = app_configs[app_name]['port'] if index == 0 else next(extra_ports)
+        launch_app(app_name, index, ports[key])
+
+    if instances > 1:
+        update_instance_balancer(app_name, list(ports.values()))
+    return jsonify({'status': 'started', 'instances': ports})
+
+def stop_app_process(app_name):
     if app_name in running_processes and get_app_status(app_name, running_processes) == 'running':
         try:
             pgid = os.getpgid(running_processes[app_name]['pid'])
@@ -126,28 +240,258 @@ def stop_app(app_name):
                 os.killpg(pgid, signal.SIGKILL)
             
             running_processes[app_name]['status'] = 'stopped'
-            return jsonify({'status': 'stopped'})
+            return 'stopped'
         except ProcessLookupError:
             running_processes[app_name]['status'] = 'stopped'
-            return jsonify({'status': 'already_stopped'})
-    return jsonify({'status': 'not_running'})
+            return 'already_stopped'
+    return 'not_running'
+
+@app.route('/stop/<app_name>')
+def stop_app(app_name):
+    status = stop_app_process(app_name)
+    base_app_name, index = split_instance_key(app_name)
+    if base_app_name not in app_configs:
+        return jsonify({'status': status})
+
+    # Stopping the app itself also stops its extra instances
+    if index == 0:
+        for key in get_app_instances(app_name, running_processes):
+            if key != app_name and stop_app_process(key) == 'stopped':
+                status = 'stopped'
+    update_instance_balancer(base_app_name)
+    return jsonify({'status': status})
+
+@app.route('/instances/<app_name>')
+def get_instances(app_name):
+    if app_name not in app_configs:
+        return jsonify({'status': 'error', 'message': f'App {app_name} not found'}), 404
+
+    instances = {key: {'port': running_processes[key].get('port'), 'status': get_app_status(key, running_processes)}
+                 for key in get_app_instances(app_name, running_processes)}
+    running_ports = [info['port'] for info in instances.values() if info['status'] == 'running']
+    return jsonify({
+        'status': 'success',
+        'instances': instances,
+        'nginx_upstream': render_nginx_upstream(app_name, running_ports, app_configs[app_name]['port'] + BALANCER_PORT_OFFSET),
+    })
 
 @app.route('/status')
 def get_status():
-    return jsonify({app_name: get_app_status(app_name, running_processes) for app_name in app_configs})
+    status = {app_name: get_app_status(app_name, running_processes) for app_name in app_configs}
+    # Extra instances are reported under their own '<app_name>@<index>' keys
+    for key in running_processes:
+        if split_instance_key(key)[1]:
+            status[key] = get_app_status(key, running_processes)
+    return jsonify(status)
 
 @app.route('/logs/<app_name>')
 def get_logs(app_name):
     if app_name in running_processes:
-        return jsonify({'logs': running_processes[app_name]['log'][-100:]})
-    return jsonify({'logs': []})
+        return jsonify({'logs': running_processes[app_name]['log'][-100:],
+                        'progress': running_processes[app_name].get('progress')})
+    return jsonify({'logs': [], 'progress': None})
+
+@app.route('/logs/<app_name>/search')
+def search_logs_route(app_name):
+    if split_instance_key(app_name)[0] not in app_configs:
+        return jsonify({'status': 'error', 'message': f'App {app_name} not found'}), 404
+
+    pattern = request.args.get('q')
+    try:
+        if pattern:
+            re.compile(pattern)
+        start = request.args.get('start', type=float)
+        end = request.args.get('end', type=float)
+        limit = request.args.get('limit', 1000, type=int)
+    except re.error as e:
+        return jsonify({'status': 'error', 'message': f'Invalid regex: {str(e)}'}), 400
+
+    # Stream matches as newline-delimited JSON while the segments are being scanned
+    def generate():
+        for match in search_logs(app_name, pattern, start, end, limit):
+            yield json.dumps(match) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/<app_name>')
+def get_metrics(app_name):
+    if split_instance_key(app_name)[0] not in app_configs:
+        return jsonify({'status': 'error', 'message': f'App {app_name} not found'}), 404
+
+    since = request.args.get('since', type=float)
+    points = request.args.get('points', 120, type=int)
+    return jsonify({
+        'status': get_app_status(app_name, running_processes),
+        'metrics': get_app_metrics(app_name, since, points),
+        'sampler': sampler_stats,
+    })
+
+@app.route('/disk_usage')
+def disk_usage_summary():
+    # Scans run in the background; the last result is returned while a rescan is running
+    full = request.args.get('full') == '1'
+    usage = get_disk_usage()
+    if usage is None or full or request.args.get('refresh') == '1':
+        start_disk_scan(app_configs, full)
+    return jsonify({
+        'status': 'success',
+        'scanning': scan_state['scanning'],
+        'error': scan_state['error'],
+        'usage': usage,
+    })
+
+@app.route('/disk_usage/directory')
+def disk_usage_directory():
+    usage = get_directory_usage(request.args.get('path', WORKSPACE_DIR))
+    if usage is None:
+        return jsonify({'status': 'error', 'message': 'Directory not scanned yet'}), 404
+    return jsonify({'status': 'success', 'directory': usage})
+
+@app.route('/disk_usage/largest')
+def disk_usage_largest():
+    limit = request.args.get('limit', 50, type=int)
+    files = get_largest_files(limit, request.args.get('path', WORKSPACE_DIR))
+    return jsonify({'status': 'success', 'scanning': scan_state['scanning'], 'files': files})
+
+@app.route('/gallery')
+def gallery():
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
+    total, images = query_gallery(request.args.get('app'), page, per_page, request.args.get('q'))
+    return jsonify({
+        'status': 'success',
+        'images': images,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page,
+        'index': gallery_stats,
+    })
+
+@app.route('/gallery/<int:image_id>')
+def gallery_image_details(image_id):
+    image = get_gallery_image(image_id)
+    if image is None:
+        return jsonify({'status': 'error', 'message': f'Image {image_id} not found'}), 404
+    image.pop('thumbnail')
+    return jsonify({'status': 'success', 'image': image})
+
+@app.route('/gallery/<int:image_id>/thumbnail')
+def gallery_thumbnail(image_id):
+    image = get_gallery_image(image_id)
+    if image is None or not image['thumbnail'] or not os.path.exists(image['thumbnail']):
+        return jsonify({'status': 'error', 'message': f'No thumbnail for image {image_id}'}), 404
+    # The thumbnail URL carries the image mtime, so it can be cached for good
+    return send_file(image['thumbnail'], mimetype='image/webp', max_age=31536000)
+
+@app.route('/gallery/<int:image_id>/image')
+def gallery_full_image(image_id):
+    image = get_gallery_image(image_id)
+    if image is None or not os.path.exists(image['path']):
+        return jsonify({'status': 'error', 'message': f'Image {image_id} not found'}), 404
+    return send_file(image['path'], conditional=True)
+
+@app.route('/idle_settings', methods=['GET', 'POST'])
+def idle_settings():
+    settings = load_settings()
+    if request.method == 'POST':
+        data = request.json or {}
+        try:
+            if 'idle_timeout_minutes' in data:
+                settings['idle_timeout_minutes'] = max(0, float(data['idle_timeout_minutes']))
+            if 'on_demand_start' in data:
+                settings['on_demand_start'] = bool(data['on_demand_start'])
+        except (TypeError, ValueError):
+            return jsonify({'status': 'error', 'message': 'idle_timeout_minutes must be a number'})
+        save_settings(settings)
+
+    now = time.time()
+    return jsonify({
+        'status': 'success',
+        'idle_timeout_minutes': settings.get('idle_timeout_minutes', 0),
+        'on_demand_start': settings.get('on_demand_start', False),
+        'apps': {app_name: {
+            'idle_seconds': round(now - last_activity[app_name]) if app_name in last_activity else None,
+            **idle_stats.get(app_name, {}),
+        } for app_name in app_configs},
+    })
+
+@app.route('/sync', methods=['GET', 'POST'])
+def workspace_sync():
+    if request.method == 'POST':
+        settings = load_settings()
+        data = request.get_json(silent=True)
+        data = {} if data is None else data  # the body is optional
+        if not isinstance(data, dict):
+            return jsonify({'status': 'error', 'message': 'Expected a JSON object'})
+        # Deleting bucket objects needs a real true, not a truthy string like "false"
+        delete = data.get('delete', settings.get('sync_delete') is True)
+        if not isinstance(delete, bool):
+            return jsonify({'status': 'error', 'message': 'delete must be true or false'})
+        success, message = start_sync(app_configs, settings, delete)
+        return jsonify({'status': 'success' if success else 'error', 'message': message, 'sync': get_sync_status()})
+    return jsonify({'status': 'success', 'sync': get_sync_status()})
+
+@app.route('/sync/restore', methods=['POST'])
+def workspace_restore():
+    data = request.get_json(silent=True)
+    data = {} if data is None else data  # the body is optional
+    if not isinstance(data, dict):
+        return jsonify({'status': 'error', 'message': 'Expected a JSON object'})
+    overwrite = data.get('overwrite', False)
+    if not isinstance(overwrite, bool):
+        return jsonify({'status': 'error', 'message': 'overwrite must be true or false'})
+    success, message = start_restore(load_settings(), overwrite)
+    return jsonify({'status': 'success' if success else 'error', 'message': message, 'sync': get_sync_status()})
+
+@app.route('/sync_settings', methods=['GET', 'POST'])
+def sync_settings():
+    settings = load_settings()
+    if request.method == 'POST':
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'status': 'error', 'message': 'Expected a JSON object'})
+        if 'sync_paths' in data and not isinstance(data['sync_paths'], list):
+            return jsonify({'status': 'error', 'message': 'sync_paths must be a list of paths'})
+        if 'sync_delete' in data and not isinstance(data['sync_delete'], bool):
+            return jsonify({'status': 'error', 'message': 'sync_delete must be true or false'})
+        try:
+            if 'sync_interval_minutes' in data:
+                settings['sync_interval_minutes'] = max(0, float(data['sync_interval_minutes']))
+            if 'sync_delete' in data:
+                settings['sync_delete'] = data['sync_delete']
+            for key in ['sync_bucket', 'sync_prefix']:
+                if key in data:
+                    settings[key] = str(data[key]).strip()
+            if 'sync_paths' in data:
+                # Relative to /workspace; an empty list restores the defaults
+                settings['sync_paths'] = [str(path).strip('/') for path in data['sync_paths'] if str(path).strip('/')]
+        except (TypeError, ValueError):
+            return jsonify({'status': 'error', 'message': 'sync_interval_minutes must be a number'})
+        save_settings(settings)
+
+    bucket, prefix = get_sync_target(settings)
+    return jsonify({
+        'status': 'success',
+        'sync_interval_minutes': settings.get('sync_interval_minutes', 0),
+        'sync_delete': settings.get('sync_delete') is True,
+        'sync_bucket': bucket,
+        'sync_prefix': prefix,
+        'sync_paths': [os.path.relpath(path, WORKSPACE_DIR) for path in get_sync_paths(app_configs, settings)],
+    })
 
 @app.route('/kill_all', methods=['POST'])
 def kill_all():
     try:
-        for app_key in app_configs:
+        for app_key in list(running_processes):
             if get_app_status(app_key, running_processes) == 'running':
-                stop_app(app_key)
+                stop_app_process(app_key)
+        for app_key in app_configs:
+            update_instance_balancer(app_key)
         return jsonify({'status': 'success'})
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
@@ -155,7 +499,12 @@ def kill_all():
 @app.route('/force_kill/<app_name>', methods=['POST'])
 def force_kill_app(app_name):
     try:
-        success, message = force_kill_process_by_name(app_name, app_configs)
+        if split_instance_key(app_name)[1] and app_name in running_processes:
+            port = running_processes[app_name]['port']
+            success = find_and_kill_process_by_port(port)
+            message = f"{app_name} processes have been forcefully terminated." if success else f"No running processes found for {app_name} on port {port}."
+        else:
+            success, message = force_kill_process_by_name(app_name, app_configs)
         if success:
             return jsonify({'status': 'killed', 'message': message})
         else:
@@ -165,7 +514,7 @@ def force_kill_app(app_name):
 
 @sock.route('/ws')
 def websocket(ws):
-    active_websockets.add(ws)
+    register_websocket(ws)
     try:
         while True:
             message = ws.receive()
@@ -173,26 +522,47 @@ def websocket(ws):
             
             if data['type'] == 'heartbeat':
                 ws.send(json.dumps({'type': 'heartbeat'}))
+            elif data['type'] == 'hello':
+                negotiate_protocol(ws, data.get('data') or {})
             else:
                 # Handle other message types
                 pass
     except Exception as e:
         print(f"WebSocket error: {str(e)}")
     finally:
-        active_websockets.remove(ws)
+        unregister_websocket(ws)
 
 def send_heartbeat():
     while True:
         time.sleep(60)  # Send heartbeat every 60 seconds (1 minute)
         send_websocket_message('heartbeat', {})
 
-# Start heartbeat thread
-threading.Thread(target=send_heartbeat, daemon=True).start()
+def start_background_tasks():
+    # Start heartbeat thread
+    threading.Thread(target=send_heartbeat, daemon=True).start()
+
+    # Start the per-app resource sampler
+    start_resource_sampler(running_processes)
+
+    # Start the idle auto-stop / on-demand start monitor
+    start_idle_monitor(app_configs, running_processes, load_settings, stop_app_with_instances, launch_app, can_launch_app)
+
+    # Start the output gallery indexer (thumbnails and generation parameters)
+    start_gallery_indexer(app_configs)
+
+    # Start the scheduled workspace sync to S3 (off until sync_interval_minutes is set);
+    # update_model_symlinks is defined further down, hence the lambda
+    start_sync_scheduler(app_configs, load_settings, send_websocket_message, on_restore=lambda: update_model_symlinks())
+
+# With `python app.py`, multiprocessing workers (gallery thumbnails) import this file again as __mp_main__;
+# they must not start a second set of background threads
+if __name__ != '__mp_main__':
+    start_background_tasks()
 
 @app.route('/install/<app_name>', methods=['POST'])
 def install_app(app_name):
     try:
-        success, message = download_and_unpack_venv(app_name)
+        success, message = download_and_unpack_venv(app_name, app_configs, send_websocket_message)
         if success:
             return jsonify({'status': 'success', 'message': message})
         else:
@@ -204,7 +574,7 @@ def install_app(app_name):
 
 @app.route('/fix_custom_nodes/<app_name>', methods=['POST'])
 def fix_custom_nodes_route(app_name):
-    success, message = fix_custom_nodes(app_name)
+    success, message = start_fix_custom_nodes(app_name, app_configs, send_websocket_message)
     if success:
         return jsonify({'status': 'success', 'message': message})
     else:
@@ -312,13 +682,17 @@ def setup_shared_models():
     return shared_models_dir
 
 def update_model_symlinks():
+    with symlink_sync_duration.time(mode='update'):
+        sync_model_symlinks()
+
+def sync_model_symlinks():
     shared_models_dir = '/workspace/shared_models'
     apps = {
         'stable-diffusion-webui': '/workspace/stable-diffusion-webui/models',
         'stable-diffusion-webui-forge': '/workspace/stable-diffusion-webui-forge/models',
         'ComfyUI': '/workspace/ComfyUI/models'
     }
-    model_types = ['Stable-diffusion', 'VAE', 'Lora', 'ESRGAN']
+    model_types = MODEL_CATEGORIES  # the categories the model downloader accepts
 
     for model_type in model_types:
         shared_model_path = os.path.join(shared_models_dir, model_type)
@@ -344,6 +718,8 @@ def update_model_symlinks():
 
             # Create symlinks for each file in the shared model directory
             for filename in os.listdir(shared_model_path):
+                if filename.startswith('.'):
+                    continue  # partial downloads (.<name>.part) and their resume state
                 src = os.path.join(shared_model_path, filename)
                 dst = os.path.join(app_model_path, filename)
                 if os.path.isfile(src) and not os.path.exists(dst):
@@ -361,6 +737,10 @@ def start_symlink_update_thread():
     thread.start()
 
 def recreate_symlinks():
+    with symlink_sync_duration.time(mode='recreate'):
+        return rebuild_model_symlinks()
+
+def rebuild_model_symlinks():
     shared_models_dir = '/workspace/shared_models'
     apps = {
         'stable-diffusion-webui': '/workspace/stable-diffusion-webui/models',
@@ -414,6 +794,45 @@ def recreate_symlinks_route():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)})
 
+@app.route('/downloads', methods=['GET', 'POST'])
+def model_downloads():
+    if request.method == 'GET':
+        return jsonify({'status': 'success', 'downloads': list_downloads(), 'categories': get_model_categories()})
+
+    # {'downloads': [{'url', 'category', 'filename'?, 'sha256'?, 'overwrite'?}, ...]} or a single entry
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'status': 'error', 'message': 'Expected a JSON object'}), 400
+    items = data.get('downloads', [data] if data.get('url') else [])
+    if not isinstance(items, list) or not items:
+        return jsonify({'status': 'error', 'message': 'No downloads provided'}), 400
+
+    start_download_workers(send_websocket_message, update_model_symlinks)
+    queued = []
+    errors = []
+    for item in items:
+        if not isinstance(item, dict):
+            errors.append({'url': None, 'message': f"Expected an object with 'url' and 'category', got {json.dumps(item)}"})
+            continue
+        success, result = queue_model_download(item.get('url'), item.get('category'), item.get('filename'),
+                                               item.get('sha256'), item.get('overwrite', False))
+        if success:
+            queued.append(result)
+        else:
+            errors.append({'url': item.get('url'), 'message': result})
+    return jsonify({'status': 'success' if queued else 'error', 'queued': queued, 'errors': errors})
+
+@app.route('/downloads/<download_id>/cancel', methods=['POST'])
+def cancel_download(download_id):
+    success, message = cancel_model_download(download_id)
+    return jsonify({'status': 'success' if success else 'error', 'message': message})
+
+@app.route('/downloads/<download_id>/retry', methods=['POST'])
+def retry_download(download_id):
+    start_download_workers(send_websocket_message, update_model_symlinks)
+    success, message = retry_model_download(download_id)
+    return jsonify({'status': 'success' if success else 'error', 'message': message})
+
 @app.route('/create_shared_folders', methods=['POST'])
 def create_shared_folders():
     try:
@@ -0,0 +1,41 @@
+import os
+import sys
+
+# gunicorn entry point for the benchmarks: the real launcher app, with every /workspace path
+# moved into BENCH_WORKSPACE and the app commands replaced by benchmarks/dummy_app.py.
+# BETTER_BUCKET_URL must point at the fake bucket before the launcher modules are imported.
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+WORKSPACE = os.environ['BENCH_WORKSPACE']
+APP_PORTS = [int(port) for port in os.environ['BENCH_APP_PORTS'].split(',')]
+DUMMY_APP_ARGS = os.environ.get('BENCH_DUMMY_APP_ARGS', '')
+
+from utils import app_utils, log_utils, ssh_utils, instance_utils, gallery_utils, sync_utils
+from utils.app_configs import get_app_configs
+
+app_utils.INSTALL_STATUS_FILE = os.path.join(WORKSPACE, '.install_status.json')
+log_utils.LOG_DIR = os.path.join(WORKSPACE, '.launcher_logs')
+ssh_utils.SSH_PASSWORD_FILE = os.path.join(WORKSPACE, '.ssh_password')
+instance_utils.INSTANCES_DIR = os.path.join(WORKSPACE, 'instances')
+instance_utils.NGINX_INSTANCES_DIR = os.path.join(WORKSPACE, 'nginx')
+gallery_utils.GALLERY_DIR = os.path.join(WORKSPACE, '.gallery')
+gallery_utils.GALLERY_INDEX_FILE = os.path.join(gallery_utils.GALLERY_DIR, 'index.db')
+gallery_utils.THUMBNAILS_DIR = os.path.join(gallery_utils.GALLERY_DIR, 'thumbnails')
+gallery_utils.INSTANCES_DIR = instance_utils.INSTANCES_DIR
+sync_utils.WORKSPACE_DIR = WORKSPACE
+sync_utils.SHARED_MODELS_DIR = os.path.join(WORKSPACE, 'shared_models')
+sync_utils.SYNC_STATE_FILE = os.path.join(WORKSPACE, '.sync_state.json')
+
+for (app_name, config), port in zip(get_app_configs().items(), APP_PORTS):
+    config['venv_path'] = os.path.join(WORKSPACE, os.path.basename(config['venv_path']))
+    config['app_path'] = os.path.join(WORKSPACE, os.path.basename(config['app_path']))
+    config['port'] = port
+    config['command'] = f"{sys.executable} -u {os.path.join(BENCH_DIR, 'dummy_app.py')} --port {port} {DUMMY_APP_ARGS}".strip()
+    config['instance_args'] = ''
+
+import app as launcher
+
+launcher.SETTINGS_FILE = os.path.join(WORKSPACE, '.app_settings.json')
+app = launcher.app
@@ -0,0 +1,66 @@
+import sys
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Stand-in for ComfyUI/Forge/A1111: serves a port so the launcher sees it as ready and prints log
+# lines and tqdm-style progress bars (redrawn with '\r') at a fixed rate. The description of every
+# progress line carries the print time, so the benchmark can measure the lag until the websocket event arrives.
+
+class PingHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port):
+    server = ThreadingHTTPServer(('127.0.0.1', port), PingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def progress_line(step, steps):
+    percentage = int(step * 100 / steps)
+    bar = ('#' * (percentage // 10)).ljust(10)
+    return f"\rbench {time.time():.6f}: {percentage:3d}%|{bar}| {step}/{steps} [00:01<00:01, {steps / 2:.2f}it/s]"
+
+def run(port, rate, steps, log_burst, duration):
+    serve(port)
+    print(f"To see the GUI go to: http://127.0.0.1:{port}", flush=True)
+
+    # Alternates a burst of log lines with a full progress bar, redrawn in place like tqdm
+    interval = 1.0 / rate
+    start_time = time.time()
+    line_number = 0
+    while not duration or time.time() - start_time < duration:
+        for _ in range(log_burst):
+            line_number += 1
+            sys.stdout.write(f"INFO bench line {line_number}: {'x' * random.randint(20, 120)}\n")
+            sys.stdout.flush()
+            time.sleep(interval)
+        for step in range(1, steps + 1):
+            sys.stdout.write(progress_line(step, steps))
+            sys.stdout.flush()
+            time.sleep(interval)
+        sys.stdout.write(f"\nPrompt executed in {random.uniform(1, 5):.2f} seconds\n")
+        sys.stdout.flush()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Dummy app that prints logs and progress bars at a fixed rate.')
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--rate', type=float, default=50, help='lines per second')
+    parser.add_argument('--steps', type=int, default=20, help='steps per progress bar')
+    parser.add_argument('--log-burst', type=int, default=20, help='log lines between two progress bars')
+    parser.add_argument('--duration', type=float, default=0, help='seconds to run (0 = until killed)')
+    # Extra instance arguments appended by the launcher are ignored
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+if __name__ == '__main__':
+    args = parse_args()
+    run(args.port, args.rate, args.steps, args.log_burst, args.duration)
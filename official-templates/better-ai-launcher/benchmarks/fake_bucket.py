@@ -0,0 +1,241 @@
+import os
+import re
+import json
+import uuid
+import shutil
+import tarfile
+import hashlib
+import argparse
+import threading
+from email.utils import formatdate
+from urllib.parse import parse_qsl, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from xml.sax.saxutils import escape
+
+# Local stand-in for the better.s3.madiator.com bucket: an S3 ListBucketResult at '/' and the
+# objects below it (fake venv archives and their manifests), with HTTP Range support.
+# Path-style boto3 requests map onto it as well (first directory = bucket): PUT, multipart
+# uploads and deletes are enough for the workspace sync (utils/sync_utils.py). Signatures are not checked.
+
+MB = 1024 * 1024
+MANIFEST_SUFFIX = '.manifest.json'
+RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)$')
+COPY_BUFFER_SIZE = 1024 * 1024
+UPLOADS_DIR = '.uploads'
+PART_NUMBER_PATTERN = re.compile(r'<PartNumber>(\d+)</PartNumber>')
+KEY_PATTERN = re.compile(r'<Key>(.*?)</Key>')
+
+def build_fake_archive(bucket_dir, app_name, size_mb, file_count=200):
+    app_dir = os.path.join(bucket_dir, app_name)
+    os.makedirs(app_dir, exist_ok=True)
+    archive_path = os.path.join(app_dir, f"{app_name}.tar.gz")
+
+    # Half random (incompressible like .so files), half text (like .py files)
+    file_size = max(size_mb * MB // file_count, 1)
+    source_dir = os.path.join(bucket_dir, '.src', app_name)
+    os.makedirs(source_dir, exist_ok=True)
+    for index in range(file_count):
+        with open(os.path.join(source_dir, f"file_{index:04d}.bin"), 'wb') as f:
+            if index % 2:
+                f.write(os.urandom(file_size))
+            else:
+                f.write((f"# module {index}\n" + 'value = 1\n' * (file_size // 10)).encode()[:file_size])
+    with tarfile.open(archive_path, 'w:gz', compresslevel=1) as tar:
+        tar.add(source_dir, arcname='.')
+
+    sha256 = hashlib.sha256()
+    with open(archive_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            sha256.update(chunk)
+    manifest = {'archive': os.path.basename(archive_path), 'size': os.path.getsize(archive_path),
+                'sha256': sha256.hexdigest(), 'compression': 'gzip'}
+    with open(archive_path + MANIFEST_SUFFIX, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def render_xml(root, body):
+    return (f'<?xml version="1.0" encoding="UTF-8"?><{root} xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            f'{body}</{root}>').encode()
+
+def render_listing(bucket_dir):
+    contents = []
+    for root, dirs, files in os.walk(bucket_dir):
+        dirs[:] = [name for name in dirs if not name.startswith('.')]
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            key = os.path.relpath(path, bucket_dir).replace(os.sep, '/')
+            contents.append(f"<Contents><Key>{escape(key)}</Key><Size>{os.path.getsize(path)}</Size></Contents>")
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+            + ''.join(contents) + '</ListBucketResult>').encode()
+
+class BucketHandler(BaseHTTPRequestHandler):
+    bucket_dir = None
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self.handle_request(send_body=False)
+
+    def do_GET(self):
+        self.handle_request(send_body=True)
+
+    def parse_path(self):
+        path, _, query = self.path.partition('?')
+        params = dict(parse_qsl(query, keep_blank_values=True))
+        return os.path.realpath(os.path.join(self.bucket_dir, unquote(path.lstrip('/')))), params
+
+    def is_inside(self, path):
+        return path.startswith(os.path.realpath(self.bucket_dir) + os.sep)
+
+    def read_body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def send_body(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def write_file(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+        return f'"{hashlib.md5(data).hexdigest()}"'
+
+    def do_PUT(self):
+        path, params = self.parse_path()
+        if not self.is_inside(path):
+            self.send_error(403)
+            return
+        data = self.read_body()
+        if 'uploadId' in params:
+            part_path = os.path.join(self.bucket_dir, UPLOADS_DIR, params['uploadId'], params['partNumber'])
+            etag = self.write_file(part_path, data)
+        elif os.path.dirname(path) == os.path.realpath(self.bucket_dir) and not data:
+            os.makedirs(path, exist_ok=True)  # CreateBucket
+            etag = '""'
+        else:
+            etag = self.write_file(path, data)
+        self.send_body(200, headers={'ETag': etag})
+
+    def do_POST(self):
+        path, params = self.parse_path()
+        data = self.read_body().decode()
+        if not self.is_inside(path):
+            self.send_error(403)
+        elif 'delete' in params:
+            deleted = []
+            for key in KEY_PATTERN.findall(data):
+                key_path = os.path.realpath(os.path.join(path, key))
+                if self.is_inside(key_path) and os.path.isfile(key_path):
+                    os.remove(key_path)
+                deleted.append(f"<Deleted><Key>{key}</Key></Deleted>")
+            self.send_body(200, render_xml('DeleteResult', ''.join(deleted)))
+        elif 'uploads' in params:
+            upload_id = uuid.uuid4().hex
+            os.makedirs(os.path.join(self.bucket_dir, UPLOADS_DIR, upload_id))
+            self.send_body(200, render_xml('InitiateMultipartUploadResult', f"<UploadId>{upload_id}</UploadId>"))
+        elif 'uploadId' in params:
+            upload_dir = os.path.join(self.bucket_dir, UPLOADS_DIR, params['uploadId'])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                for part_number in PART_NUMBER_PATTERN.findall(data):
+                    with open(os.path.join(upload_dir, part_number), 'rb') as part:
+                        shutil.copyfileobj(part, f, COPY_BUFFER_SIZE)
+            os.replace(path + '.tmp', path)
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            self.send_body(200, render_xml('CompleteMultipartUploadResult', f'<ETag>"{uuid.uuid4().hex}"</ETag>'))
+        else:
+            self.send_error(400)
+
+    def do_DELETE(self):
+        path, params = self.parse_path()
+        if 'uploadId' in params:
+            shutil.rmtree(os.path.join(self.bucket_dir, UPLOADS_DIR, params['uploadId']), ignore_errors=True)
+        elif self.is_inside(path) and os.path.isfile(path):
+            os.remove(path)
+        self.send_body(204)
+
+    def handle_request(self, send_body):
+        if self.path.split('?')[0] == '/':
+            body = render_listing(self.bucket_dir)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/xml')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+            return
+
+        path, _ = self.parse_path()
+        if self.is_inside(path) and os.path.isdir(path) and not send_body:
+            self.send_body(200)  # HeadBucket
+            return
+        if not self.is_inside(path) or not os.path.isfile(path):
+            body = b'<?xml version="1.0" encoding="UTF-8"?><Error><Code>NoSuchKey</Code></Error>'
+            self.send_body(404, body if send_body else b'')
+            return
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = RANGE_PATTERN.match(self.headers.get('Range', ''))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            else:
+                start = max(size - int(match.group(2)), 0)  # suffix range: last N bytes
+            if start > end:
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{size}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Type', 'application/json' if path.endswith('.json') else 'application/octet-stream')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Last-Modified', formatdate(os.path.getmtime(path), usegmt=True))
+        self.end_headers()
+        if not send_body:
+            return
+
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(COPY_BUFFER_SIZE, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_bucket_server(bucket_dir, port=0):
+    handler = type('Handler', (BucketHandler,), {'bucket_dir': bucket_dir})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve a directory as a fake venv bucket (S3 listing + Range requests).')
+    parser.add_argument('bucket_dir')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--build', nargs='*', default=[], help='app names to build fake archives for')
+    parser.add_argument('--size-mb', type=int, default=64)
+    args = parser.parse_args()
+
+    for app_name in args.build:
+        print(f"Built {app_name}: {build_fake_archive(args.bucket_dir, app_name, args.size_mb)}")
+    server, url = start_bucket_server(args.bucket_dir, args.port)
+    print(f"Serving {args.bucket_dir} at {url}")
+    threading.Event().wait()
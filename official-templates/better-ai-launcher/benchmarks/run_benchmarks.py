@@ -0,0 +1,418 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from datetime import datetime, timezone
+
+import psutil
+import requests
+import simple_websocket
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from fake_bucket import build_fake_archive, start_bucket_server
+
+# Load test for the launcher: runs app.py under gunicorn (gevent, one worker, like pre_start.sh)
+# against a throwaway workspace, a local fake bucket and dummy apps, drives N dashboard clients
+# and writes the measurements as JSON so runs on different commits can be compared (--compare).
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+LAUNCHER_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+MB = 1024 * 1024
+
+# Directory names of the default app configs (venv_path / app_path basenames)
+APPS = {
+    'bcomfy': ('bcomfy', 'ComfyUI'),
+    'bforge': ('bforge', 'stable-diffusion-webui-forge'),
+    'ba1111': ('ba1111', 'stable-diffusion-webui'),
+}
+STAGE_SUM_PATTERN = re.compile(r'launcher_install_stage_duration_seconds_sum\{app="(?P<app>[^"]+)",stage="(?P<stage>[^"]+)"\} (?P<value>\S+)')
+BENCH_DESC_PATTERN = re.compile(r'bench (?P<printed>[\d.]+)')
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def summarize(values, scale=1000):
+    # Percentiles in milliseconds by default
+    if not values:
+        return {'count': 0}
+    values = sorted(values)
+    def percentile(p):
+        return round(values[min(int(len(values) * p / 100), len(values) - 1)] * scale, 3)
+    return {
+        'count': len(values),
+        'mean': round(sum(values) / len(values) * scale, 3),
+        'p50': percentile(50),
+        'p90': percentile(90),
+        'p99': percentile(99),
+        'max': round(values[-1] * scale, 3),
+    }
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=LAUNCHER_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '.'], cwd=LAUNCHER_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+
+def prepare_workspace(workspace, install_app):
+    for app_name, (venv_dir, app_dir) in APPS.items():
+        # The installed app only gets its app_path, so the install skips the git clone
+        if app_name != install_app:
+            os.makedirs(os.path.join(workspace, venv_dir, 'bin'), exist_ok=True)
+        os.makedirs(os.path.join(workspace, app_dir), exist_ok=True)
+
+def start_launcher(workspace, port, bucket_url, app_ports, dummy_app_args):
+    env = dict(os.environ,
+               BENCH_WORKSPACE=workspace,
+               BENCH_APP_PORTS=','.join(str(app_port) for app_port in app_ports),
+               BENCH_DUMMY_APP_ARGS=dummy_app_args,
+               BETTER_BUCKET_URL=bucket_url,
+               PYTHONUNBUFFERED='1')
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--worker-class', 'gevent',
+               '--workers', '1', '--chdir', LAUNCHER_DIR, '--pythonpath', BENCH_DIR, 'bench_app:app']
+    log_file = open(os.path.join(workspace, 'launcher.log'), 'wb')
+    return subprocess.Popen(command, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+def wait_for_launcher(base_url, process, timeout=60):
+    start_time = time.time()
+    while time.time() - start_time < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"Launcher exited with code {process.returncode}")
+        try:
+            requests.get(f"{base_url}/status", timeout=2)
+            return time.time() - start_time
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"Launcher not ready after {timeout}s")
+
+class ResourceSampler:
+    # CPU and memory of the gunicorn master and its workers (the dummy apps are not counted)
+    def __init__(self, pid, interval=0.5):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.samples = []
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def launcher_processes(self):
+        processes = [self.process]
+        for child in self.process.children():
+            if 'gunicorn' in ' '.join(child.cmdline()):
+                processes.append(child)
+        return processes
+
+    def run(self):
+        known = {}
+        while not self.stop_event.wait(self.interval):
+            cpu_percent = 0
+            rss = 0
+            try:
+                for process in self.launcher_processes():
+                    if process.pid not in known:
+                        known[process.pid] = process
+                        process.cpu_percent()  # first call only primes the counter
+                    cpu_percent += known[process.pid].cpu_percent()
+                    rss += process.memory_info().rss
+            except psutil.Error:
+                continue
+            self.samples.append((cpu_percent, rss))
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+        cpu = [sample[0] for sample in self.samples]
+        rss = [sample[1] for sample in self.samples]
+        if not self.samples:
+            return {'samples': 0}
+        return {
+            'samples': len(self.samples),
+            'cpu_percent_mean': round(sum(cpu) / len(cpu), 2),
+            'cpu_percent_max': round(max(cpu), 2),
+            'rss_mb_mean': round(sum(rss) / len(rss) / MB, 2),
+            'rss_mb_max': round(max(rss) / MB, 2),
+        }
+
+class DashboardClient:
+    # One browser tab: polls /status and /logs like the UI and holds a /ws connection
+    def __init__(self, base_url, app_names, poll_interval, protocol, encoding, recorder):
+        self.base_url = base_url
+        self.app_names = app_names
+        self.poll_interval = poll_interval
+        self.protocol = protocol
+        self.encoding = encoding
+        self.recorder = recorder
+        self.session = requests.Session()
+        self.ws_messages = 0
+        self.ws_bytes = 0
+        self.errors = 0
+
+    def poll(self, stop_event):
+        index = 0
+        while not stop_event.is_set():
+            app_name = self.app_names[index % len(self.app_names)]
+            index += 1
+            for route, path in (('/status', '/status'), ('/logs/<app_name>', f'/logs/{app_name}')):
+                start_time = time.perf_counter()
+                try:
+                    self.session.get(self.base_url + path, timeout=30).raise_for_status()
+                    self.recorder.add_latency(route, time.perf_counter() - start_time)
+                except requests.RequestException:
+                    self.errors += 1
+            stop_event.wait(self.poll_interval)
+
+    def decode(self, frame):
+        self.ws_messages += 1
+        self.ws_bytes += len(frame)
+        if isinstance(frame, bytes):
+            return msgpack.unpackb(frame, raw=False)
+        return json.loads(frame)
+
+    def progress_events(self, message):
+        if message.get('type') == 'app_progress':
+            yield message['data']
+        elif message.get('type') == 'delta' and message.get('key') == 'progress':
+            yield from message['data'].values()
+
+    def listen(self, stop_event):
+        ws_url = self.base_url.replace('http://', 'ws://') + '/ws'
+        try:
+            ws = simple_websocket.Client.connect(ws_url)
+        except Exception:
+            self.errors += 1
+            return
+        try:
+            if self.protocol > 1:
+                ws.send(json.dumps({'type': 'hello', 'data': {'protocol': self.protocol, 'encoding': self.encoding}}))
+            while not stop_event.is_set():
+                frame = ws.receive(timeout=0.5)
+                if frame is None:
+                    continue
+                received = time.time()
+                for event in self.progress_events(self.decode(frame)):
+                    match = BENCH_DESC_PATTERN.search(event.get('desc') or '')
+                    if match:
+                        self.recorder.add_progress(match.group('printed'), float(match.group('printed')),
+                                                   event.get('timestamp'), received)
+        except simple_websocket.ConnectionClosed:
+            self.errors += 1
+        finally:
+            ws.close()
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.progress = {}
+
+    def add_latency(self, route, seconds):
+        with self.lock:
+            self.latencies.setdefault(route, []).append(seconds)
+
+    def add_progress(self, key, printed, emitted, received):
+        with self.lock:
+            self.progress.setdefault(key, {'printed': printed, 'emitted': emitted, 'received': []})['received'].append(received)
+
+    def websocket_summary(self, clients):
+        end_to_end = []
+        broadcast = []
+        fan_out_spread = []
+        for event in self.progress.values():
+            end_to_end.extend(received - event['printed'] for received in event['received'])
+            if event['emitted']:
+                broadcast.extend(received - event['emitted'] for received in event['received'])
+            fan_out_spread.append(max(event['received']) - min(event['received']))
+        return {
+            'progress_events': len(self.progress),
+            'delivery_ratio': round(sum(len(event['received']) for event in self.progress.values())
+                                    / max(len(self.progress) * len(clients), 1), 4),
+            'end_to_end_lag_ms': summarize(end_to_end),
+            'broadcast_lag_ms': summarize(broadcast),
+            'fan_out_spread_ms': summarize(fan_out_spread),
+            'messages_per_client': round(sum(client.ws_messages for client in clients) / max(len(clients), 1), 1),
+            'bytes_per_client': round(sum(client.ws_bytes for client in clients) / max(len(clients), 1)),
+        }
+
+def scrape_install_stages(base_url, app_name):
+    stages = {}
+    for match in STAGE_SUM_PATTERN.finditer(requests.get(f"{base_url}/metrics", timeout=30).text):
+        if match.group('app') == app_name:
+            stages[match.group('stage')] = float(match.group('value'))
+    return stages
+
+def run_install(base_url, app_name, manifest):
+    start_time = time.perf_counter()
+    response = requests.post(f"{base_url}/install/{app_name}", timeout=3600).json()
+    elapsed = time.perf_counter() - start_time
+    stages = scrape_install_stages(base_url, app_name)
+    archive_mb = manifest['size'] / MB
+    return {
+        'app': app_name,
+        'status': response.get('status'),
+        'archive_mb': round(archive_mb, 2),
+        'total_seconds': round(elapsed, 3),
+        'stages': {stage: {'seconds': round(seconds, 3),
+                           'archive_mb_per_second': round(archive_mb / seconds, 2) if seconds > 0 else None}
+                   for stage, seconds in stages.items()},
+    }
+
+def start_apps(base_url, app_names, timeout=60):
+    for app_name in app_names:
+        requests.get(f"{base_url}/start/{app_name}", timeout=30)
+    start_time = time.time()
+    while time.time() - start_time < timeout:
+        status = requests.get(f"{base_url}/status", timeout=30).json()
+        if all(status.get(app_name) == 'running' for app_name in app_names):
+            return
+        time.sleep(0.5)
+    raise RuntimeError(f"Apps not running after {timeout}s: {status}")
+
+def run_load(base_url, app_names, launcher_pid, args):
+    recorder = Recorder()
+    clients = [DashboardClient(base_url, app_names, args.poll_interval, args.ws_protocol, args.ws_encoding, recorder)
+               for _ in range(args.clients)]
+    stop_event = threading.Event()
+    threads = []
+    for client in clients:
+        threads.append(threading.Thread(target=client.listen, args=(stop_event,), daemon=True))
+        threads.append(threading.Thread(target=client.poll, args=(stop_event,), daemon=True))
+
+    sampler = ResourceSampler(launcher_pid)
+    sampler.start()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop_event.set()
+    for thread in threads:
+        thread.join(timeout=10)
+    resources = sampler.stop()
+
+    return {
+        'routes': {route: summarize(values) for route, values in recorder.latencies.items()},
+        'requests_per_second': round(sum(len(values) for values in recorder.latencies.values()) / args.duration, 2),
+        'websocket': recorder.websocket_summary(clients),
+        'client_errors': sum(client.errors for client in clients),
+        'resources': resources,
+    }
+
+def flatten(data, prefix=''):
+    values = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+def compare_results(baseline, current):
+    baseline_values = flatten(baseline['results'])
+    current_values = flatten(current['results'])
+    print(f"Comparing {baseline['commit']} -> {current['commit']}")
+    for name, value in current_values.items():
+        previous = baseline_values.get(name)
+        if previous is None:
+            continue
+        change = f"{(value - previous) / previous * 100:+.1f}%" if previous else 'n/a'
+        print(f"  {name}: {previous} -> {value} ({change})")
+
+def run(args):
+    if args.ws_encoding == 'msgpack' and msgpack is None:
+        raise RuntimeError("msgpack encoding requested but the msgpack module is not installed")
+
+    workspace = tempfile.mkdtemp(prefix='launcher-bench-')
+    bucket_dir = os.path.join(workspace, '.bucket')
+    print(f"Workspace: {workspace}")
+    manifest = build_fake_archive(bucket_dir, args.install_app, args.archive_mb)
+    bucket_server, bucket_url = start_bucket_server(bucket_dir)
+    prepare_workspace(workspace, args.install_app)
+
+    port = free_port()
+    app_ports = [free_port() for _ in APPS]
+    base_url = f"http://127.0.0.1:{port}"
+    dummy_app_args = f"--rate {args.log_rate} --log-burst {args.log_burst} --steps {args.steps}"
+    launcher = start_launcher(workspace, port, bucket_url, app_ports, dummy_app_args)
+    commit, dirty = git_revision()
+    results = {}
+    try:
+        results['startup_seconds'] = round(wait_for_launcher(base_url, launcher), 3)
+        if not args.skip_install:
+            print(f"Installing {args.install_app} ({manifest['size'] / MB:.1f} MB archive)...")
+            results['install'] = run_install(base_url, args.install_app, manifest)
+
+        app_names = [app_name for app_name in APPS if app_name != args.install_app or not args.skip_install]
+        start_apps(base_url, app_names)
+        print(f"Running {args.clients} clients for {args.duration}s against {', '.join(app_names)}...")
+        results.update(run_load(base_url, app_names, launcher.pid, args))
+    finally:
+        try:
+            requests.post(f"{base_url}/kill_all", timeout=30)
+        except requests.RequestException:
+            pass
+        launcher.terminate()
+        try:
+            launcher.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            launcher.kill()
+        bucket_server.shutdown()
+        if not args.keep_workspace:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'config': vars(args),
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"bench-{commit}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare_results(json.load(f), report)
+    return report
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test the launcher with local stand-ins and write the results as JSON.')
+    parser.add_argument('--clients', type=int, default=20, help='concurrent dashboard clients')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds between /status + /logs polls per client')
+    parser.add_argument('--ws-protocol', type=int, choices=[1, 2], default=2)
+    parser.add_argument('--ws-encoding', choices=['json', 'msgpack'], default='json')
+    parser.add_argument('--log-rate', type=float, default=50, help='log lines per second per dummy app')
+    parser.add_argument('--log-burst', type=int, default=20, help='dummy app log lines between two progress bars')
+    parser.add_argument('--steps', type=int, default=20, help='redraws per dummy app progress bar')
+    parser.add_argument('--install-app', default='ba1111', choices=list(APPS), help='app installed from the fake bucket')
+    parser.add_argument('--archive-mb', type=int, default=64, help='size of the fake venv archive contents')
+    parser.add_argument('--skip-install', action='store_true')
+    parser.add_argument('--output', help='result file (default benchmarks/results/bench-<commit>-<time>.json)')
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    parser.add_argument('--keep-workspace', action='store_true')
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    run(parse_args())
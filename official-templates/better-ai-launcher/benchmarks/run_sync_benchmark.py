@@ -0,0 +1,172 @@
+from gevent import monkey
+monkey.patch_all()
+
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+from run_benchmarks import BENCH_DIR, LAUNCHER_DIR, RESULTS_DIR, MB, free_port, git_revision, compare_results
+
+# Workspace sync against the local fake bucket: a full upload, a no-op rerun, a rerun after only
+# touching files (hashing, no upload), an incremental upload of a few changed files and a restore
+# into an empty workspace, which is then compared file by file with the source.
+
+sys.path.insert(0, LAUNCHER_DIR)
+from utils import sync_utils
+
+def wait_for_port(port, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Fake bucket did not start on port {port}")
+
+def create_files(workspace, args):
+    models_dir = os.path.join(workspace, 'shared_models', 'Lora')
+    outputs_dir = os.path.join(workspace, 'ComfyUI', 'output')
+    os.makedirs(models_dir, exist_ok=True)
+    os.makedirs(outputs_dir, exist_ok=True)
+    for index in range(args.models):
+        with open(os.path.join(models_dir, f"model_{index:02d}.safetensors"), 'wb') as f:
+            for _ in range(args.model_mb):
+                f.write(os.urandom(MB))
+    for index in range(args.outputs):
+        with open(os.path.join(outputs_dir, f"ComfyUI_{index:05d}_.png"), 'wb') as f:
+            f.write(os.urandom(args.output_kb * 1024))
+    return [os.path.join(outputs_dir, name) for name in sorted(os.listdir(outputs_dir))]
+
+def use_workspace(workspace):
+    sync_utils.WORKSPACE_DIR = workspace
+    sync_utils.SHARED_MODELS_DIR = os.path.join(workspace, 'shared_models')
+    sync_utils.SYNC_STATE_FILE = os.path.join(workspace, '.sync_state.json')
+    return {'bcomfy': {'app_path': os.path.join(workspace, 'ComfyUI')}}
+
+def run_phase(name, operation, *args):
+    success, message = sync_utils.claim_sync(operation)
+    if not success:
+        raise RuntimeError(message)
+    target = sync_utils.sync_workspace if operation == 'sync' else sync_utils.restore_workspace
+    sync_utils.run_sync_operation(operation, target, *args)
+    state = sync_utils.get_sync_status()
+    if state['status'] != 'completed':
+        raise RuntimeError(f"{name} failed: {state['error']} {state['errors']}")
+    seconds = state['finished'] - state['started']
+    result = {
+        'seconds': round(seconds, 3),
+        'files_checked': state['files'],
+        'files_transferred': state['transferred'],
+        'files_unchanged': state['unchanged'],
+        'mb_processed': round(state['bytes_done'] / MB, 2),  # transferred, or hashed for unchanged files
+        'mb_per_second': round(state['bytes_done'] / MB / seconds, 2) if seconds > 0 else None,
+    }
+    print(f"[{name}] {result}")
+    return result
+
+def compare_workspaces(source, restored, paths):
+    mismatches = []
+    for path in paths:
+        restored_path = os.path.join(restored, os.path.relpath(path, source))
+        if not os.path.exists(restored_path):
+            mismatches.append(f"missing {restored_path}")
+        elif sync_utils.hash_file(path) != sync_utils.hash_file(restored_path) or \
+                os.stat(path).st_mtime_ns != os.stat(restored_path).st_mtime_ns:
+            mismatches.append(f"differs {restored_path}")
+    return mismatches
+
+def run(args):
+    temp_dir = tempfile.mkdtemp(prefix='launcher-sync-bench-')
+    source = os.path.join(temp_dir, 'workspace')
+    restored = os.path.join(temp_dir, 'restored')
+    bucket_dir = os.path.join(temp_dir, 'bucket')
+    os.makedirs(restored)
+    os.makedirs(bucket_dir)
+    # Own process: a bucket served from this gevent-patched process would compete with the transfers it measures
+    bucket_port = free_port()
+    bucket_server = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, 'fake_bucket.py'), bucket_dir,
+                                      '--port', str(bucket_port)], stdout=subprocess.DEVNULL)
+    wait_for_port(bucket_port)
+    os.environ['MINIO_ENDPOINT'] = f"http://127.0.0.1:{bucket_port}"
+    os.environ.setdefault('MINIO_ACCESS_KEY', 'bench')
+    os.environ.setdefault('MINIO_SECRET_KEY', 'bench')
+    sync_utils.PART_SIZE = args.part_size_mb * MB
+    sync_utils.FILE_WORKERS = args.file_workers
+    settings = {'sync_bucket': 'workspace-sync', 'sync_prefix': 'bench'}
+    print(f"Workspace: {temp_dir}")
+
+    commit, dirty = git_revision()
+    results = {}
+    try:
+        outputs = create_files(source, args)
+        app_configs = use_workspace(source)
+        results['initial'] = run_phase('initial', 'sync', app_configs, settings)
+        results['unchanged'] = run_phase('unchanged', 'sync', app_configs, settings)
+
+        # New mtimes, same content: hashed but not uploaded
+        for path in outputs[:args.changed]:
+            os.utime(path)
+        results['touched'] = run_phase('touched', 'sync', app_configs, settings)
+
+        for path in outputs[args.changed:args.changed * 2]:
+            with open(path, 'ab') as f:
+                f.write(os.urandom(1024))
+        results['incremental'] = run_phase('incremental', 'sync', app_configs, settings)
+
+        use_workspace(restored)
+        results['restore'] = run_phase('restore', 'restore', settings)
+        source_files = [os.path.join(root, name) for root, _, names in os.walk(source)
+                        for name in names if not name.startswith('.')]
+        mismatches = compare_workspaces(source, restored, source_files)
+        results['restore']['verified_files'] = len(source_files) - len(mismatches)
+        results['restore']['mismatches'] = mismatches[:20]
+        if mismatches:
+            print(f"Restore differs from the source for {len(mismatches)} files")
+    finally:
+        bucket_server.terminate()
+        bucket_server.wait()
+        if not args.keep_workspace:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'config': vars(args),
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"sync-{commit}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare_results(json.load(f), report)
+    return report
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the workspace sync and restore against a local fake bucket.')
+    parser.add_argument('--models', type=int, default=4, help='large files in shared_models')
+    parser.add_argument('--model-mb', type=int, default=64, help='size of each large file')
+    parser.add_argument('--outputs', type=int, default=500, help='small files in the ComfyUI output folder')
+    parser.add_argument('--output-kb', type=int, default=256, help='size of each small file')
+    parser.add_argument('--changed', type=int, default=20, help='outputs touched, then modified, between the syncs')
+    parser.add_argument('--part-size-mb', type=int, default=16, help='multipart threshold and part size')
+    parser.add_argument('--file-workers', type=int, default=sync_utils.FILE_WORKERS)
+    parser.add_argument('--output', help='result file (default benchmarks/results/sync-<commit>-<time>.json)')
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    parser.add_argument('--keep-workspace', action='store_true')
+    return parser.parse_args(argv)
+
+if __name__ == '__main__':
+    run(parse_args())
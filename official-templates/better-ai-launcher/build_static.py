@@ -0,0 +1,124 @@
+import os
+import re
+import gzip
+import json
+import hashlib
+import subprocess
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+TEMPLATE_FILE = os.path.join(BASE_DIR, 'templates', 'index.html')
+MANIFEST_FILE = os.path.join(STATIC_DIR, 'manifest.json')
+
+# Bundles that get a content hash in their name and can be cached forever
+ASSETS = ['launcher.css', 'launcher.js']
+HASH_LENGTH = 12
+ASSET_URL_PATTERN = re.compile(r"\{\{\s*asset_url\('([^']+)'\)\s*\}\}")
+
+def hashed_name(name, content):
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest}{ext}"
+
+def remove_old_builds(name):
+    stem, ext = os.path.splitext(name)
+    pattern = re.compile(rf"^{re.escape(stem)}\.[0-9a-f]{{{HASH_LENGTH}}}{re.escape(ext)}(\.gz|\.br)?$")
+    for filename in os.listdir(STATIC_DIR):
+        if pattern.match(filename):
+            os.remove(os.path.join(STATIC_DIR, filename))
+
+def precompress(path):
+    with open(path, 'rb') as f:
+        content = f.read()
+    sizes = {'raw': len(content)}
+
+    # mtime=0 keeps the .gz output identical between builds of the same content
+    gz_content = gzip.compress(content, compresslevel=9, mtime=0)
+    with open(path + '.gz', 'wb') as f:
+        f.write(gz_content)
+    sizes['gzip'] = len(gz_content)
+
+    if brotli is not None:
+        br_content = brotli.compress(content, quality=11)
+        with open(path + '.br', 'wb') as f:
+            f.write(br_content)
+        sizes['brotli'] = len(br_content)
+    return sizes
+
+def compressed_sizes(content):
+    sizes = {'raw': len(content), 'gzip': len(gzip.compress(content, compresslevel=9, mtime=0))}
+    if brotli is not None:
+        sizes['brotli'] = len(brotli.compress(content, quality=11))
+    return sizes
+
+def find_baseline_template():
+    # Newest committed templates/index.html that still inlined the CSS and JS (before the asset split)
+    try:
+        commits = subprocess.run(['git', 'log', '--format=%H', '--', 'templates/index.html'], cwd=BASE_DIR,
+                                 capture_output=True, text=True, check=True).stdout.split()
+        for commit in commits:
+            content = subprocess.run(['git', 'show', f"{commit}:./templates/index.html"], cwd=BASE_DIR,
+                                     capture_output=True, check=True).stdout
+            if b'asset_url(' not in content:
+                return commit[:12], content
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    return None, None
+
+def report_baseline(report):
+    # First visit: shell + hashed assets; repeat visit: only the shell, the assets are cached as immutable.
+    # The old page was rendered by Flask on every load, so both visits transferred all of it
+    commit, content = find_baseline_template()
+    if content is None:
+        print("No inline baseline template found in the git history, skipping the before/after comparison.")
+        return None
+    before = compressed_sizes(content)
+    first_visit = {kind: sum(sizes.get(kind, 0) for sizes in report.values()) for kind in before}
+    repeat_visit = report['index.html']
+    print(f"Before (inline template of {commit}), every visit: " +
+          ', '.join(f"{kind} {size / 1024:.1f} KB" for kind, size in before.items()))
+    for label, after in [('first visit', first_visit), ('repeat visit', repeat_visit)]:
+        print(f"After, {label}: " + ', '.join(f"{kind} {after[kind] / 1024:.1f} KB ({(after[kind] - size) * 100 / size:+.0f}%)"
+                                             for kind, size in before.items()))
+    return {'commit': commit, 'before': before, 'first_visit': first_visit, 'repeat_visit': repeat_visit}
+
+def build():
+    manifest = {}
+    report = {}
+    for name in ASSETS:
+        with open(os.path.join(STATIC_DIR, name), 'rb') as f:
+            content = f.read()
+        remove_old_builds(name)
+        manifest[name] = hashed_name(name, content)
+        output_path = os.path.join(STATIC_DIR, manifest[name])
+        with open(output_path, 'wb') as f:
+            f.write(content)
+        report[manifest[name]] = precompress(output_path)
+
+    with open(MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    # Static page shell served by nginx; only /bootstrap is rendered by Flask
+    with open(TEMPLATE_FILE, 'r') as f:
+        shell = ASSET_URL_PATTERN.sub(lambda match: f"/static/{manifest[match.group(1)]}", f.read())
+    shell_path = os.path.join(STATIC_DIR, 'index.html')
+    with open(shell_path, 'w') as f:
+        f.write(shell)
+    report['index.html'] = precompress(shell_path)
+
+    total = {}
+    for filename, sizes in report.items():
+        print(f"{filename}: " + ', '.join(f"{kind} {size / 1024:.1f} KB" for kind, size in sizes.items()))
+        for kind, size in sizes.items():
+            total[kind] = total.get(kind, 0) + size
+    print("Page load total: " + ', '.join(f"{kind} {size / 1024:.1f} KB" for kind, size in total.items()))
+    report_baseline(report)
+    return manifest
+
+if __name__ == '__main__':
+    build()
@@ -0,0 +1,849 @@
+const appStatuses = {};
+const appProgress = {};  // Latest structured progress event per app (steps, downloads, model loads)
+const installState = {};  // Install progress per app, merged from websocket deltas
+const WS_PROTOCOL = 2;
+let currentLogApp = null;
+let currentLogAppName = null;
+const WS_PORT = 7222;  // This is the Nginx port
+let bootstrap = {};  // Per-pod data from /bootstrap, everything else in this file is static
+let podId = '';
+
+let socket;
+let heartbeatInterval;
+
+function updateAppStatus(appKey, status) {
+    appStatuses[appKey] = status;
+    const statusElement = document.getElementById(`status-${appKey}`);
+    if (statusElement) {
+        statusElement.textContent = status.charAt(0).toUpperCase() + status.slice(1);
+        statusElement.className = `status status-${status}`;
+        document.getElementById(`start-${appKey}`).disabled = (status === 'running');
+        document.getElementById(`stop-${appKey}`).disabled = (status === 'stopped');
+        document.getElementById(`open-${appKey}`).disabled = (status === 'stopped');
+    }
+}
+
+async function startApp(appKey) {
+    const response = await fetch(`/start/${appKey}`);
+    const data = await response.json();
+    if (data.status === 'started') {
+        updateAppStatus(appKey, 'running');
+        // Automatically switch to the logs of the started app
+        viewLogs(appKey, appConfigs[appKey].name);
+    } else if (data.status === 'error') {
+        alert(data.message);
+    }
+}
+
+async function stopApp(appKey) {
+    const response = await fetch(`/stop/${appKey}`);
+    const data = await response.json();
+    if (data.status === 'stopped') {
+        updateAppStatus(appKey, 'stopped');
+    } else if (data.status === 'error') {
+        alert(data.message);
+    }
+    // Immediately update the status after stopping
+    await updateStatus();
+}
+
+function openApp(appKey, port) {
+    const url = `https://${podId}-${port}.proxy.runpod.net/`;
+    window.open(url, '_blank');
+}
+
+async function updateStatus() {
+    const response = await fetch('/status');
+    const data = await response.json();
+    for (const [appKey, status] of Object.entries(data)) {
+        updateAppStatus(appKey, status);
+    }
+}
+
+function viewLogs(appKey, appName) {
+    currentLogApp = appKey;
+    currentLogAppName = appName;
+    document.getElementById('currentAppName').textContent = `Logs: ${appName}`;
+    updateLogs();
+    // Show the download button when logs are being viewed
+    document.getElementById('downloadLogsBtn').style.display = 'flex';
+}
+
+function updateLogs() {
+    if (currentLogApp) {
+        fetch(`/logs/${currentLogApp}`)
+            .then(response => response.json())
+            .then(data => {
+                const logsDiv = document.getElementById('logs');
+                const wasScrolledToBottom = logsDiv.scrollHeight - logsDiv.clientHeight <= logsDiv.scrollTop + 1;
+                // The live progress slot holds the latest '\r' redraw of a progress bar
+                logsDiv.textContent = data.logs.concat(data.progress ? [data.progress] : []).join('\n');
+                if (wasScrolledToBottom) {
+                    logsDiv.scrollTop = logsDiv.scrollHeight;
+                }
+                document.getElementById('downloadLogsBtn').style.display = 'flex';
+            });
+    } else {
+        document.getElementById('downloadLogsBtn').style.display = 'none';
+    }
+}
+
+function openTab(evt, tabName) {
+    var i, tabContent, tabLinks;
+    tabContent = document.getElementsByClassName("tab-content");
+    for (i = 0; i < tabContent.length; i++) {
+        tabContent[i].style.display = "none";
+    }
+    tabLinks = document.getElementsByClassName("tab-link");
+    for (i = 0; i < tabLinks.length; i++) {
+        tabLinks[i].className = tabLinks[i].className.replace(" active", "");
+    }
+    document.getElementById(tabName).style.display = tabName === 'apps-tab' ? 'flex' : 'block';
+    evt.currentTarget.className += " active";
+
+    if (tabName === 'settings-tab') {
+        clearLogs();
+        loadSshDetails();
+    }
+}
+
+async function forceKillApp(appKey) {
+    if (confirm(`Are you sure you want to force kill ${appKey}? This may cause data loss.`)) {
+        try {
+            const response = await fetch(`/force_kill/${appKey}`, { method: 'POST' });
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            const data = await response.json();
+            if (data.status === 'killed') {
+                updateAppStatus(appKey, 'stopped');
+                alert(data.message);
+            } else {
+                alert(`Error: ${data.message}`);
+            }
+        } catch (error) {
+            console.error('Error:', error);
+            alert(`Error killing ${appKey}: ${error.message}`);
+        }
+        await updateStatus();
+    }
+}
+
+function initializeUI() {
+    updateStatus(); // Initial status update
+    setInterval(updateStatus, 5000);
+    setInterval(updateLogs, 1000);
+
+    // Check for ongoing installations
+    for (const [appKey, status] of Object.entries(bootstrap.app_status)) {
+        if (status.install_status.status === 'in_progress') {
+            updateInstallProgress({
+                app_name: appKey,
+                percentage: status.install_status.progress,
+                stage: status.install_status.stage
+            });
+        }
+    }
+}
+
+// Time-to-interactive (overlay hidden, websocket connected) and bytes transferred for this page load,
+// sent once per load to /client_timing and exported as Prometheus metrics
+let pageTimingReported = false;
+function reportPageTiming() {
+    if (pageTimingReported || !window.performance || !navigator.sendBeacon) {
+        return;
+    }
+    pageTimingReported = true;
+    const navigation = performance.getEntriesByType('navigation')[0];
+    const resources = performance.getEntriesByType('resource');
+    const timing = {
+        interactive_ms: Math.round(performance.now()),
+        dom_content_loaded_ms: navigation ? Math.round(navigation.domContentLoadedEventEnd) : null,
+        transfer_bytes: (navigation ? navigation.transferSize : 0) +
+            resources.reduce((total, entry) => total + (entry.transferSize || 0), 0),
+    };
+    console.log('Launcher page timing:', timing);
+    navigator.sendBeacon('/client_timing', JSON.stringify(timing));
+}
+
+function connectWebSocket() {
+    socket = new WebSocket(`wss://${podId}-${WS_PORT}.proxy.runpod.net/ws`);
+
+    socket.onopen = function(e) {
+        console.log("Connected to WebSocket");
+        // Ask for the delta protocol: a snapshot now, then only changed fields
+        sendWebSocketMessage('hello', { protocol: WS_PROTOCOL, encoding: 'json' });
+        document.getElementById('loadingOverlay').style.display = 'none';
+        startHeartbeat();
+        initializeUI();
+        reportPageTiming();
+    };
+
+    socket.onmessage = function(event) {
+        try {
+            const data = JSON.parse(event.data);
+            console.log(`Data received from server:`, data);
+
+            if (data.type === 'heartbeat' || data.type === 'hello') {
+                // Keepalive only; replying here would echo heartbeats back and forth forever
+            } else if (data.type === 'snapshot') {
+                // A snapshot replaces the entries, so nothing from before a reconnect lingers
+                applyStateUpdate('status', data.data.status, true);
+                applyStateUpdate('install', data.data.install, true);
+                applyStateUpdate('progress', data.data.progress, true);
+            } else if (data.type === 'delta') {
+                applyStateUpdate(data.key, data.data);
+            } else if (data.type === 'install_progress') {
+                updateInstallProgress(data.data);
+            } else if (data.type === 'install_log') {
+                appendToInstallLogs(data.data);
+            } else if (data.type === 'install_complete') {
+                handleInstallComplete(data.data);
+            } else if (data.type === 'custom_nodes_complete') {
+                handleCustomNodesComplete(data.data);
+            } else if (data.type === 'app_progress') {
+                appProgress[data.data.app_name] = data.data;
+            }
+        } catch (error) {
+            console.error('Error parsing WebSocket message:', error, 'Raw message:', event.data);
+            appendToInstallLogs({app_name: 'system', log: `Error: ${error.message}`});
+        }
+    };
+
+    socket.onclose = function(event) {
+        if (event.wasClean) {
+            console.log(`Connection closed cleanly, code=${event.code} reason=${event.reason}`);
+        } else {
+            console.log('Connection died');
+        }
+        stopHeartbeat();
+        document.getElementById('loadingOverlay').style.display = 'flex';
+        document.getElementById('loadingMessage').textContent = 'WebSocket disconnected. Attempting to reconnect...';
+        setTimeout(connectWebSocket, 5000); // Attempt to reconnect after 5 seconds
+    };
+
+    socket.onerror = function(error) {
+        console.log(`WebSocket Error: ${error.message}`);
+        document.getElementById('loadingMessage').textContent = 'Error connecting to WebSocket. Retrying...';
+    };
+}
+
+// Delta fields set to null were removed on the server
+function mergeFields(target, changes, replace) {
+    const merged = replace ? {} : Object.assign({}, target || {});
+    for (const [field, value] of Object.entries(changes || {})) {
+        if (value === null) {
+            delete merged[field];
+        } else {
+            merged[field] = value;
+        }
+    }
+    return merged;
+}
+
+function applyStateUpdate(key, changes, replace) {
+    for (const [appKey, value] of Object.entries(changes || {})) {
+        if (value === null) {
+            // The entry was removed on the server (e.g. a pruned download)
+            if (key === 'install') {
+                delete installState[appKey];
+            } else if (key === 'progress') {
+                delete appProgress[appKey];
+            }
+        } else if (key === 'status') {
+            updateAppStatus(appKey, value);
+        } else if (key === 'install') {
+            installState[appKey] = mergeFields(installState[appKey], value, replace);
+            if (document.getElementById(`install-progress-${appKey}`)) {
+                updateInstallProgress(Object.assign({ app_name: appKey }, installState[appKey]));
+            }
+        } else if (key === 'progress') {
+            appProgress[appKey] = mergeFields(appProgress[appKey], value, replace);
+        }
+    }
+}
+
+function startHeartbeat() {
+    heartbeatInterval = setInterval(() => {
+        if (socket.readyState === WebSocket.OPEN) {
+            sendWebSocketMessage('heartbeat', {});
+        }
+    }, 60000); // Send heartbeat every 60000 milliseconds (1 minute)
+}
+
+function stopHeartbeat() {
+    clearInterval(heartbeatInterval);
+}
+
+function sendWebSocketMessage(type, data) {
+    if (socket.readyState === WebSocket.OPEN) {
+        socket.send(JSON.stringify({ type, data }));
+    }
+}
+
+async function installApp(appKey) {
+    const installButton = document.getElementById(`install-${appKey}`);
+    const progressContainer = document.getElementById(`install-progress-${appKey}`);
+    const logsContainer = document.getElementById(`install-logs-${appKey}`);
+
+    installButton.disabled = true;
+    progressContainer.style.display = 'block';
+    logsContainer.style.display = 'block';
+    logsContainer.textContent = '';
+
+    try {
+        const response = await fetch(`/install/${appKey}`, { method: 'POST' });
+
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const contentType = response.headers.get("content-type");
+        if (contentType && contentType.indexOf("application/json") !== -1) {
+            const data = await response.json();
+            if (data.status !== 'success') {
+                throw new Error(data.message);
+            }
+        } else {
+            throw new Error("Received non-JSON response from server");
+        }
+
+        // Don't reload the page here, wait for the WebSocket 'install_complete' message
+    } catch (error) {
+        console.error('Installation error:', error);
+        appendToInstallLogs({app_name: appKey, log: `Error: ${error.message}`});
+    }
+    // Don't re-enable the button here, it will be handled by the WebSocket messages
+}
+
+function updateInstallProgress(data) {
+    const progressContainer = document.getElementById(`install-progress-${data.app_name}`);
+    const downloadProgress = progressContainer.querySelector('.download-progress');
+    const unpackProgress = progressContainer.querySelector('.unpack-progress');
+    const speedDisplay = progressContainer.querySelector('.download-speed');
+    const etaDisplay = progressContainer.querySelector('.download-eta');
+    const stageDisplay = progressContainer.querySelector('.install-stage');
+
+    progressContainer.style.display = 'block';
+
+    if (data.stage === 'Downloading') {
+        downloadProgress.style.width = `${data.percentage}%`;
+        downloadProgress.textContent = `${data.percentage.toFixed(2)}%`;
+        speedDisplay.textContent = `Speed: ${formatBytes(data.speed)}/s`;
+        etaDisplay.textContent = `ETA: ${formatTime(Math.round(data.eta))}`;
+    } else if (data.stage === 'Unpacking') {
+        unpackProgress.style.width = `${data.percentage}%`;
+        unpackProgress.textContent = `${data.percentage.toFixed(2)}%`;
+        speedDisplay.textContent = `Processed: ${data.processed} / ${data.total} files`;
+        etaDisplay.textContent = '';
+    } else if (data.stage === 'Download Complete') {
+        downloadProgress.style.width = '100%';
+        downloadProgress.textContent = '100%';
+        speedDisplay.textContent = '';
+        etaDisplay.textContent = '';
+    }
+
+    stageDisplay.textContent = `Stage: ${data.stage}`;
+}
+
+function formatBytes(bytes) {
+    return `${(bytes / (1024 * 1024)).toFixed(2)} MB`;
+}
+
+function formatTime(seconds) {
+    if (seconds < 60) {
+        return `${seconds} seconds`;
+    } else if (seconds < 3600) {
+        return `${Math.floor(seconds / 60)} minutes ${seconds % 60} seconds`;
+    } else {
+        const hours = Math.floor(seconds / 3600);
+        const minutes = Math.floor((seconds % 3600) / 60);
+        return `${hours} hours ${minutes} minutes`;
+    }
+}
+
+function appendToInstallLogs(data) {
+    const logsContainer = document.getElementById(`install-logs-${data.app_name}`);
+    const logEntry = document.createElement('div');
+    logEntry.textContent = data.log;
+    logsContainer.appendChild(logEntry);
+    logsContainer.scrollTop = logsContainer.scrollHeight;
+}
+
+function handleInstallComplete(data) {
+    const installButton = document.getElementById(`install-${data.app_name}`);
+    if (data.status === 'success') {
+        console.log(data.message);
+        location.reload();  // Reload the page to reflect the new installation status
+    } else {
+        console.error(`Installation failed: ${data.message}`);
+        installButton.disabled = false;  // Re-enable the button only on failure
+    }
+}
+
+// Add this new object to store app configurations (filled from /bootstrap)
+const appConfigs = {};
+
+async function fixCustomNodes(appKey) {
+    const fixButton = document.getElementById('fix-custom-nodes-' + appKey);
+    let logsContainer = document.getElementById('install-logs-' + appKey);
+
+    // Create logs container if it doesn't exist
+    if (!logsContainer) {
+        logsContainer = document.createElement('div');
+        logsContainer.id = 'install-logs-' + appKey;
+        logsContainer.className = 'install-logs';
+        fixButton.parentNode.insertBefore(logsContainer, fixButton.nextSibling);
+    }
+
+    fixButton.disabled = true;
+    logsContainer.style.display = 'block';
+    appendToInstallLogs({app_name: appKey, log: "Starting to fix custom nodes..."});
+
+    try {
+        // Returns once the fix has started; the result arrives as 'custom_nodes_complete'
+        const response = await fetch('/fix_custom_nodes/' + appKey, { method: 'POST' });
+        const data = await response.json();
+        if (data.status === 'success') {
+            appendToInstallLogs({app_name: appKey, log: data.message});
+        } else {
+            throw new Error(data.message);
+        }
+    } catch (error) {
+        console.error('Error fixing custom nodes:', error);
+        appendToInstallLogs({app_name: appKey, log: 'Error: ' + error.message});
+        fixButton.disabled = false;
+    }
+}
+
+function handleCustomNodesComplete(data) {
+    const fixButton = document.getElementById('fix-custom-nodes-' + data.app_name);
+    appendToInstallLogs({app_name: data.app_name, log: (data.status === 'success' ? 'Success: ' : 'Error: ') + data.message});
+    if (fixButton) {
+        fixButton.disabled = false;
+    }
+}
+
+// Poddy animation
+const secretSequence = [38, 38, 40, 40, 37, 39, 37, 39, 66, 65];
+let sequenceIndex = 0;
+let lastKeyTime = 0;
+let animationInterval;
+let specialItemInterval;
+let currentSpecialItem = '';
+
+document.addEventListener('keydown', (e) => {
+    const currentTime = new Date().getTime();
+    if (currentTime - lastKeyTime > 1000) {
+        sequenceIndex = 0;
+    }
+    lastKeyTime = currentTime;
+
+    if (e.keyCode === secretSequence[sequenceIndex]) {
+        sequenceIndex++;
+        if (sequenceIndex === secretSequence.length) {
+            startPoddyAnimation();
+            sequenceIndex = 0;
+        }
+    } else {
+        sequenceIndex = 0;
+    }
+});
+
+function startPoddyAnimation() {
+    const animationContainer = document.getElementById('poddy-animation');
+    const poddyContainer = document.getElementById('poddy-container');
+    const specialItem = document.getElementById('special-item');
+    const audio = document.getElementById('poddy-audio');
+
+    animationContainer.style.display = 'block';
+    audio.play();
+
+    let animationTime = 0;
+    const poddyInterval = 400; // 0.4 seconds between each Poddy spawn attempt
+    const mushroomDuration = 1200; // 1.2 seconds for mushroom display
+    const snakeDuration = 6000; // 6 seconds for snake animation
+    let poddies = [];
+
+    const animationInterval = setInterval(() => {
+        animationTime += 100; // Increment by 100ms each interval
+
+        // Poddy animation
+        if (animationTime % poddyInterval === 0 && poddies.length < 15) {
+            if (Math.random() < 0.7) { // 70% chance to spawn a new Poddy
+                const poddy = document.createElement('div');
+                poddy.className = 'poddy';
+                poddy.style.left = `${Math.random() * 90}vw`;
+                poddy.style.top = `${Math.random() * 90}vh`;
+                poddyContainer.appendChild(poddy);
+                poddy.style.animation = 'dance 0.6s infinite, wiggle 0.3s infinite';
+                poddies.push(poddy);
+            }
+        }
+
+        // Mushroom animation
+        if ([5000, 11000, 18000, 35000, 41000, 47000, 53000, 72000].includes(animationTime)) {
+            poddies.forEach(poddy => poddyContainer.removeChild(poddy));
+            poddies = [];
+            specialItem.style.backgroundImage = "url('/static/mushroom.png')";
+            specialItem.style.display = 'block';
+            specialItem.style.left = '50%';
+            specialItem.style.top = '50%';
+            specialItem.style.transform = 'translate(-50%, -50%) scale(1)';
+            setTimeout(() => {
+                specialItem.style.transform = 'translate(-50%, -50%) scale(3)';
+            }, 100);
+            setTimeout(() => {
+                specialItem.style.display = 'none';
+                specialItem.style.transform = 'translate(-50%, -50%) scale(1)';
+            }, mushroomDuration);
+        }
+
+        // Snake animation
+        if (animationTime === 24000 || animationTime === 60000) {
+            poddies.forEach(poddy => poddyContainer.removeChild(poddy));
+            poddies = [];
+            specialItem.style.backgroundImage = "url('/static/snake.png')";
+            specialItem.style.display = 'block';
+            specialItem.style.left = '-30vw';
+            specialItem.style.top = '50%';
+            specialItem.style.transform = 'translateY(-50%)';
+            specialItem.style.transition = `left ${snakeDuration/1000}s linear`;
+            setTimeout(() => {
+                specialItem.style.left = '100vw';
+            }, 100);
+            setTimeout(() => {
+                specialItem.style.display = 'none';
+                specialItem.style.transition = 'none';
+                specialItem.style.left = '-30vw';
+            }, snakeDuration);
+        }
+
+        if (animationTime >= 73000) { // End animation after 73 seconds (1:13)
+            clearInterval(animationInterval);
+            animationContainer.style.display = 'none';
+            poddyContainer.innerHTML = '';
+            specialItem.style.display = 'none';
+            audio.pause();
+            audio.currentTime = 0;
+        }
+    }, 100);
+}
+
+document.getElementById('downloadLogsBtn').addEventListener('click', () => {
+    if (currentLogApp && currentLogAppName) {
+        downloadLogs(currentLogApp, currentLogAppName);
+    } else {
+        alert('Please select an app to view logs before downloading.');
+    }
+});
+
+async function downloadLogs(appKey, appName) {
+    try {
+        const response = await fetch('/logs/' + appKey);
+            const data = await response.json();
+        const logs = data.logs.join('\n');
+
+        const blob = new Blob([logs], { type: 'text/plain' });
+        const url = window.URL.createObjectURL(blob);
+
+        const a = document.createElement('a');
+        a.style.display = 'none';
+        a.href = url;
+        a.download = appName + '_logs.txt';
+        document.body.appendChild(a);
+        a.click();
+
+        window.URL.revokeObjectURL(url);
+        document.body.removeChild(a);
+        } catch (error) {
+        console.error('Error downloading logs:', error);
+        alert('An error occurred while downloading the logs. Please try again.');
+    }
+}
+
+// Initialize the logs viewer
+    setInterval(updateLogs, 1000);
+
+// Clear logs and hide download button when switching tabs or closing the app
+function clearLogs() {
+    currentLogApp = null;
+    currentLogAppName = null;
+    document.getElementById('currentAppName').textContent = 'Logs';
+    document.getElementById('logs').textContent = '';
+    document.getElementById('downloadLogsBtn').style.display = 'none';
+}
+
+// Add this function call where appropriate, e.g., when closing an app or switching tabs
+// clearLogs();
+
+function loadSshDetails() {
+    const ip = bootstrap.ssh.public_ip;
+    const port = bootstrap.ssh.port;
+    const passwordStatus = bootstrap.ssh.password_status;
+    document.getElementById('sshIp').textContent = ip;
+    document.getElementById('sshPort').textContent = port;
+
+    const sshCommand = `ssh root@${ip} -p ${port}`;
+    document.getElementById('sshCommand').textContent = sshCommand;
+
+    const newSshPassword = document.getElementById('newSshPassword');
+    const passwordButtons = document.querySelector('.password-buttons');
+
+    if (passwordStatus === 'set') {
+        newSshPassword.placeholder = "Password is set (hidden)";
+        passwordButtons.style.display = 'flex';
+    } else {
+        newSshPassword.placeholder = "Enter new SSH password";
+        passwordButtons.style.display = 'flex';
+    }
+}
+
+function copySshCommand() {
+    const sshCommand = document.getElementById('sshCommand').textContent;
+    navigator.clipboard.writeText(sshCommand).then(() => {
+        alert('SSH command copied to clipboard!');
+    }, (err) => {
+        console.error('Could not copy text: ', err);
+        alert('Failed to copy SSH command. Please copy it manually.');
+    });
+}
+
+function togglePasswordVisibility() {
+    const passwordInput = document.getElementById('newSshPassword');
+    if (passwordInput.type === 'password') {
+        passwordInput.type = 'text';
+        if (passwordInput.placeholder === "Password is set (hidden)") {
+            passwordInput.value = bootstrap.ssh.password;
+        }
+        } else {
+        passwordInput.type = 'password';
+        if (passwordInput.value === bootstrap.ssh.password) {
+            passwordInput.value = '';
+            passwordInput.placeholder = "Password is set (hidden)";
+        }
+    }
+}
+
+async function setCustomSshPassword() {
+    const newPassword = document.getElementById('newSshPassword').value;
+    if (!newPassword) {
+        alert('Please enter a password.');
+        return;
+    }
+
+    if (confirm('Warning: Password-based SSH authentication is less secure than key-based authentication. Are you sure you want to set a password?')) {
+        try {
+            const response = await fetch('/set_ssh_password', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ password: newPassword }),
+            });
+            const result = await response.json();
+            if (result.status === 'success') {
+                alert('SSH password set successfully.');
+                document.getElementById('newSshPassword').value = '';
+                document.getElementById('newSshPassword').placeholder = 'Password is set (hidden)';
+            } else {
+                alert('Failed to set SSH password: ' + result.message);
+            }
+        } catch (error) {
+            console.error('Error setting SSH password:', error);
+            alert('An error occurred while setting the SSH password.');
+        }
+    }
+}
+
+function openFileBrowser() {
+    const url = `https://${podId}-7222.proxy.runpod.net/fileapp/`;
+    window.open(url, '_blank');
+}
+
+async function controlFileBrowser(action) {
+    try {
+        const response = await fetch(`/${action}_filebrowser`);
+        const result = await response.json();
+        if (result.status === 'started' || result.status === 'stopped') {
+            updateFileBrowserStatus();
+        }
+    } catch (error) {
+        console.error('Error controlling File Browser:', error);
+    }
+}
+
+async function updateFileBrowserStatus() {
+    try {
+        const response = await fetch('/filebrowser_status');
+        const result = await response.json();
+        const statusElement = document.getElementById('filebrowser-status');
+        if (statusElement) {
+            statusElement.textContent = result.status;
+        }
+        const startButton = document.getElementById('start-filebrowser');
+        const stopButton = document.getElementById('stop-filebrowser');
+        if (startButton && stopButton) {
+            startButton.disabled = (result.status === 'running');
+            stopButton.disabled = (result.status === 'stopped');
+        }
+    } catch (error) {
+        console.error('Error updating File Browser status:', error);
+    }
+}
+
+// Call this function periodically to update the status
+setInterval(updateFileBrowserStatus, 5000);
+
+// Update the DOMContentLoaded event listener
+document.addEventListener('DOMContentLoaded', function() {
+    updateFileBrowserStatus();
+    // ... (other initialization code)
+});
+
+// Call this function periodically
+setInterval(updateLogs, 1000);
+
+// Add a function to handle window resizing
+function handleResize() {
+    const contentContainer = document.querySelector('.content-container');
+    const navbar = document.querySelector('.navbar');
+    const windowHeight = window.innerHeight;
+    const navbarHeight = navbar.offsetHeight;
+    contentContainer.style.height = `${windowHeight - navbarHeight}px`;
+
+    const appsSection = document.querySelector('.apps-section');
+    const logsSection = document.querySelector('.logs-section');
+    if (window.innerWidth <= 768) {
+        appsSection.style.height = `${(windowHeight - navbarHeight) / 2}px`;
+        logsSection.style.height = `${(windowHeight - navbarHeight) / 2}px`;
+    } else {
+        appsSection.style.height = `${windowHeight - navbarHeight}px`;
+        logsSection.style.height = `${windowHeight - navbarHeight}px`;
+    }
+}
+
+// Call handleResize on page load and window resize
+window.addEventListener('load', handleResize);
+window.addEventListener('resize', handleResize);
+
+async function createSharedFolders() {
+    const statusElement = document.getElementById('shared-folders-status');
+    statusElement.textContent = 'Creating shared folders...';
+    try {
+        const response = await fetch('/create_shared_folders', { method: 'POST' });
+        const data = await response.json();
+    if (data.status === 'success') {
+            statusElement.textContent = data.message;
+    } else {
+            statusElement.textContent = 'Error: ' + data.message;
+        }
+    } catch (error) {
+        statusElement.textContent = 'Error: ' + error.message;
+    }
+}
+
+async function recreateSymlinks() {
+    const statusElement = document.getElementById('symlink-status');
+    statusElement.textContent = 'Recreating symlinks...';
+    try {
+        const response = await fetch('/recreate_symlinks', { method: 'POST' });
+        const data = await response.json();
+        if (data.status === 'success') {
+            statusElement.textContent = data.message;
+        } else {
+            statusElement.textContent = 'Error: ' + data.message;
+        }
+    } catch (error) {
+        statusElement.textContent = 'Error: ' + error.message;
+    }
+}
+
+function escapeHtml(value) {
+    return String(value ?? '').replace(/[&<>"']/g, (c) => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]));
+}
+
+function renderAppCard(appKey, status) {
+    const key = escapeHtml(appKey);
+    const name = escapeHtml(status.name);
+    if (!status.dirs_ok) {
+        const installing = status.install_status.status === 'in_progress';
+        const installBlock = status.installed ? '' : `
+            <div class="install-container">
+                <button onclick="installApp('${key}')" id="install-${key}" class="install-button" ${installing ? 'disabled' : ''}>
+                    <i class="fas fa-download"></i> ${installing ? 'Installing...' : `Install ${name}`}
+                </button>
+                <div id="install-progress-${key}" class="install-progress" ${installing ? 'style="display: block;"' : ''}>
+                    <div class="progress-container">
+                        <div class="progress-label">Download Progress:</div>
+                        <div class="progress-bar">
+                            <div class="progress-bar-fill download-progress" style="width: 0%">0%</div>
+                        </div>
+                    </div>
+                    <div class="progress-container">
+                        <div class="progress-label">Unpack Progress:</div>
+                        <div class="progress-bar">
+                            <div class="progress-bar-fill unpack-progress" style="width: 0%">0%</div>
+                        </div>
+                    </div>
+                    <div class="download-info">
+                        <span class="download-speed"></span>
+                        <span class="download-eta"></span>
+                    </div>
+                    <div class="install-stage"></div>
+                </div>
+            </div>
+            <div id="install-logs-${key}" class="install-logs"></div>`;
+        return `<div class="app"><h2>${name}</h2><p class="error-message">${escapeHtml(status.message)}</p>${installBlock}</div>`;
+    }
+
+    const running = status.status === 'running';
+    const fixButton = status.is_bcomfy ? `
+            <button onclick="fixCustomNodes('${key}')" id="fix-custom-nodes-${key}" class="fix-custom-nodes-button">
+                <i class="fas fa-wrench"></i> Fix Custom Nodes
+            </button>` : '';
+    return `
+        <div class="app">
+            <h2>${name}</h2>
+            <div class="button-group">
+                <button onclick="startApp('${key}')" id="start-${key}" class="start-button" ${running ? 'disabled' : ''}>
+                    <i class="fas fa-play"></i> Start
+                </button>
+                <button onclick="stopApp('${key}')" id="stop-${key}" class="stop-button" ${running ? '' : 'disabled'}>
+                    <i class="fas fa-stop"></i> Stop
+                </button>
+                <button onclick="viewLogs('${key}', appConfigs['${key}'].name)" id="log-${key}" class="log-button">
+                    <i class="fas fa-list-alt"></i> View Logs
+                </button>
+                <button onclick="openApp('${key}', ${Number(status.port)})" id="open-${key}" class="open-button" ${running ? '' : 'disabled'}>
+                    <i class="fas fa-external-link-alt"></i> Open App
+                </button>
+                <button onclick="forceKillApp('${key}')" id="force-kill-${key}" class="force-kill-button">
+                    <i class="fas fa-skull-crossbones"></i> Force Kill
+                </button>${fixButton}
+            </div>
+            <span id="status-${key}" class="status status-${escapeHtml(status.status)}">
+                ${escapeHtml(status.status.charAt(0).toUpperCase() + status.status.slice(1))}
+            </span>
+        </div>`;
+}
+
+async function loadBootstrap() {
+    const response = await fetch('/bootstrap');
+    bootstrap = await response.json();
+    podId = bootstrap.pod_id;
+
+    for (const [appKey, status] of Object.entries(bootstrap.app_status)) {
+        appConfigs[appKey] = { name: status.name };
+    }
+    document.getElementById('apps').innerHTML = Object.entries(bootstrap.app_status)
+        .map(([appKey, status]) => renderAppCard(appKey, status)).join('');
+
+    loadSshDetails();
+    connectWebSocket();
+}
+
+loadBootstrap().catch((error) => {
+    console.error('Error loading launcher data:', error);
+    document.getElementById('loadingMessage').textContent = 'Error loading launcher data. Please refresh the page.';
+});
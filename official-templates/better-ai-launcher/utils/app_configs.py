@@ -2,22 +2,36 @@ import os
 import xml.etree.ElementTree as ET
 import requests
 
+MANIFEST_SUFFIX = '.manifest.json'
+# Bucket with the prebuilt venv archives; overridable so benchmarks can point it at a local server
+# Always with a trailing slash, object keys are appended to it
+BUCKET_URL = os.environ.get('BETTER_BUCKET_URL', 'https://better.s3.madiator.com/').rstrip('/') + '/'
+
 def fetch_app_info():
-    url = "https://better.s3.madiator.com/"
+    url = BUCKET_URL
     response = requests.get(url)
     root = ET.fromstring(response.content)
 
-    app_info = {}
+    archives = {}
+    manifest_keys = set()
     for content in root.findall('{http://s3.amazonaws.com/doc/2006-03-01/}Contents'):
         key = content.find('{http://s3.amazonaws.com/doc/2006-03-01/}Key').text
         size = int(content.find('{http://s3.amazonaws.com/doc/2006-03-01/}Size').text)
         app_name = key.split('/')[0]
         
         if app_name in ['ba1111', 'bcomfy', 'bforge']:
-            app_info[app_name] = {
-                'download_url': f"https://better.s3.madiator.com/{key}",
-                'size': size
-            }
+            if key.endswith(MANIFEST_SUFFIX):
+                manifest_keys.add(key)
+            else:
+                archives[app_name] = (key, size)
+
+    # Only apps with an archive get an entry; the checksum/size sidecar written by publish_venv.py
+    # is named after its archive, so a manifest without a matching archive is ignored
+    app_info = {}
+    for app_name, (key, size) in archives.items():
+        app_info[app_name] = {'download_url': f"{url}{key}", 'size': size}
+        if key + MANIFEST_SUFFIX in manifest_keys:
+            app_info[app_name]['manifest_url'] = f"{url}{key}{MANIFEST_SUFFIX}"
 
     return app_info
 
@@ -28,6 +42,7 @@ app_configs = {
         'venv_path': '/workspace/bcomfy',
         'app_path': '/workspace/ComfyUI',
         'port': 3000,
+        'instance_args': '--output-directory {output_dir} --temp-directory {temp_dir}',
     },
     'bforge': {
         'name': 'Better Forge',
@@ -35,6 +50,7 @@ app_configs = {
         'venv_path': '/workspace/bforge',
         'app_path': '/workspace/stable-diffusion-webui-forge',
         'port': 7862,
+        'instance_args': '--skip-prepare-environment --ui-settings-file {settings_file} --ui-config-file {ui_config_file}',
     },
     'ba1111': {
         'name': 'Better A1111',
@@ -42,6 +58,7 @@ app_configs = {
         'venv_path': '/workspace/ba1111',
         'app_path': '/workspace/stable-diffusion-webui',
         'port': 7863,
+        'instance_args': '--skip-prepare-environment --ui-settings-file {settings_file} --ui-config-file {ui_config_file}',
     }
 }
 
@@ -10,8 +10,17 @@ import traceback
 from tqdm import tqdm
 import xml.etree.ElementTree as ET
 import time
+import hashlib
+import socket
+import threading
+
+from utils.log_utils import get_log_writer
+from utils.progress_utils import ProgressTracker
+from utils.prometheus_utils import install_stage_duration, install_bytes, install_download_throughput, app_start_to_ready
+from utils.websocket_utils import send_websocket_message
 
 INSTALL_STATUS_FILE = '/tmp/install_status.json'
+INSTALL_PROGRESS_INTERVAL = 0.5  # minimum seconds between two install_progress messages
 
 def is_process_running(pid):
     try:
@@ -20,22 +29,93 @@ def is_process_running(pid):
     except psutil.NoSuchProcess:
         return False
 
-def run_app(app_name, command, running_processes):
-    process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, preexec_fn=os.setsid)
+LOG_MAX_LINES = 1000
+READ_BUFFER_SIZE = 64 * 1024
+MAX_LINE_LENGTH = 256 * 1024  # output without any line break (e.g. a binary dump) is logged in pieces of this size
+LINE_SPLIT_PATTERN = re.compile(rb'\r\n|\r|\n')
+
+def append_log_line(app_name, line, running_processes):
+    # Persist to the rotating segment files on /workspace (queued, written by the log writer thread)
+    get_log_writer(app_name).write(line)
+    log = running_processes[app_name]['log']
+    log.append(line)
+    if len(log) > LOG_MAX_LINES:
+        running_processes[app_name]['log'] = log[-LOG_MAX_LINES:]
+
+def run_app(app_name, command, running_processes, port=None):
+    process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=0, preexec_fn=os.setsid)
     running_processes[app_name] = {
         'process': process,
         'pid': process.pid,
         'log': [],
+        'progress': None,
+        'port': port,
         'status': 'running'
     }
-    
-    for line in process.stdout:
-        running_processes[app_name]['log'].append(line.strip())
-        if len(running_processes[app_name]['log']) > 1000:
-            running_processes[app_name]['log'] = running_processes[app_name]['log'][-1000:]
-    
+    progress_tracker = ProgressTracker(app_name, send_websocket_message)
+    if port:
+        threading.Thread(target=wait_for_app_ready, args=(app_name, port, running_processes), daemon=True).start()
+
+    # Read raw chunks so tqdm-style '\r' redraws collapse into the single 'progress' slot
+    # instead of being appended to the log buffer one redraw at a time
+    # bufsize=0 keeps stdout unbuffered, so read() returns whatever is available (cooperatively under gevent)
+    buffer = b''
+    while True:
+        chunk = process.stdout.read(READ_BUFFER_SIZE)
+        if not chunk:
+            break
+        buffer += chunk
+
+        position = 0
+        for match in LINE_SPLIT_PATTERN.finditer(buffer):
+            # A trailing '\r' may be the first half of '\r\n', wait for the next chunk
+            if match.group() == b'\r' and match.end() == len(buffer):
+                break
+            line = buffer[position:match.start()].decode('utf-8', errors='replace').strip()
+            position = match.end()
+            if match.group() == b'\r':
+                if line:
+                    running_processes[app_name]['progress'] = line
+                    progress_tracker.handle_line(line, redraw=True)
+                continue
+            # A newline commits the last redraw (tqdm's final state) as a regular log line
+            running_processes[app_name]['progress'] = None
+            if line:
+                append_log_line(app_name, line, running_processes)
+                progress_tracker.handle_line(line)
+        buffer = buffer[position:]
+        if len(buffer) > MAX_LINE_LENGTH:
+            append_log_line(app_name, buffer.decode('utf-8', errors='replace').strip(), running_processes)
+            buffer = b''
+
+    line = buffer.decode('utf-8', errors='replace').strip()
+    if line:
+        append_log_line(app_name, line, running_processes)
+    get_log_writer(app_name).flush()
+    running_processes[app_name]['progress'] = None
     running_processes[app_name]['status'] = 'stopped'
 
+def is_port_open(port, host='127.0.0.1', timeout=0.5):
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+def wait_for_app_ready(app_name, port, running_processes, timeout=1800, interval=0.5):
+    start_time = time.time()
+    while time.time() - start_time < timeout:
+        process_info = running_processes.get(app_name)
+        if process_info and process_info['status'] == 'stopped':
+            return False
+        if process_info and is_port_open(port):
+            ready_seconds = time.time() - start_time
+            process_info['ready_seconds'] = round(ready_seconds, 3)
+            app_start_to_ready.observe(ready_seconds, app=app_name)
+            return True
+        time.sleep(interval)
+    return False
+
 def update_process_status(app_name, running_processes):
     if app_name in running_processes:
         if is_process_running(running_processes[app_name]['pid']):
@@ -67,7 +147,8 @@ def get_app_status(app_name, running_processes):
 
 def find_and_kill_process_by_port(port):
     for conn in psutil.net_connections():
-        if conn.laddr.port == port:
+        # Skip the launcher itself, which may be holding the port for an on-demand start
+        if conn.laddr and conn.laddr.port == port and conn.pid and conn.pid != os.getpid():
             try:
                 process = psutil.Process(conn.pid)
                 for child in process.children(recursive=True):
@@ -134,76 +215,128 @@ def get_install_status(app_name):
     except (FileNotFoundError, json.JSONDecodeError):
         return {'status': 'not_started', 'progress': 0, 'stage': ''}
 
+def fetch_venv_manifest(app_config):
+    manifest_url = app_config.get('manifest_url')
+    if not manifest_url:
+        return None
+    response = requests.get(manifest_url, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+def verify_venv_download(downloaded_file, sha256, manifest):
+    if not manifest:
+        return True, "No manifest published, skipping verification."
+
+    actual_size = os.path.getsize(downloaded_file)
+    if actual_size != manifest['size']:
+        return False, f"Size mismatch: expected {manifest['size']} bytes, got {actual_size} bytes."
+    if sha256 != manifest['sha256']:
+        return False, f"Checksum mismatch: expected sha256 {manifest['sha256']}, got {sha256}."
+    return True, f"Verified {actual_size} bytes, sha256 {sha256}."
+
 def download_and_unpack_venv(app_name, app_configs, send_websocket_message):
     app_config = app_configs.get(app_name)
     if not app_config:
         return False, f"App '{app_name}' not found in configurations."
+    if 'download_url' not in app_config:
+        return False, f"No venv archive found for '{app_name}' in the bucket."
 
     venv_path = app_config['venv_path']
     app_path = app_config['app_path']
     download_url = app_config['download_url']
     total_size = app_config['size']
     tar_filename = os.path.basename(download_url)
-    workspace_dir = '/workspace'
+    workspace_dir = os.path.dirname(venv_path.rstrip('/'))  # /workspace for the default configs
     downloaded_file = os.path.join(workspace_dir, tar_filename)
 
     try:
         save_install_status(app_name, 'in_progress', 0, 'Downloading')
         send_websocket_message('install_log', {'app_name': app_name, 'log': f'Starting download of {total_size / (1024 * 1024):.2f} MB...'})
 
+        manifest = fetch_venv_manifest(app_config)
+        if manifest:
+            total_size = manifest['size']
+
         response = requests.get(download_url, stream=True)
         response.raise_for_status()
+        sha256 = hashlib.sha256()
 
-        block_size = 8192
+        block_size = 1024 * 1024
         downloaded_size = 0
         start_time = time.time()
+        last_progress_time = 0
 
         with open(downloaded_file, 'wb') as file:
             for chunk in response.iter_content(chunk_size=block_size):
                 if chunk:
                     file.write(chunk)
+                    sha256.update(chunk)
                     downloaded_size += len(chunk)
                     current_time = time.time()
                     elapsed_time = current_time - start_time
                     
-                    if elapsed_time > 0:
+                    if elapsed_time > 0 and current_time - last_progress_time >= INSTALL_PROGRESS_INTERVAL:
+                        last_progress_time = current_time
                         speed = downloaded_size / elapsed_time
                         percentage = (downloaded_size / total_size) * 100
                         eta = (total_size - downloaded_size) / speed if speed > 0 else 0
                         
+                        # Numeric fields only, the UI does the formatting
                         send_websocket_message('install_progress', {
                             'app_name': app_name,
                             'percentage': round(percentage, 2),
-                            'speed': f"{speed / (1024 * 1024):.2f} MB/s",
-                            'eta': f"{eta:.0f}",
+                            'speed': round(speed),
+                            'eta': round(eta),
                             'stage': 'Downloading',
-                            'downloaded': f"{downloaded_size / (1024 * 1024):.2f} MB"
+                            'downloaded': downloaded_size,
+                            'total': total_size
                         })
 
+        download_seconds = time.time() - start_time
+        install_stage_duration.observe(download_seconds, app=app_name, stage='download')
+        install_bytes.inc(downloaded_size, app=app_name)
+        if download_seconds > 0:
+            install_download_throughput.set(downloaded_size / download_seconds, app=app_name)
+
+        verified, verify_message = verify_venv_download(downloaded_file, sha256.hexdigest(), manifest)
+        send_websocket_message('install_log', {'app_name': app_name, 'log': verify_message})
+        if not verified:
+            os.remove(downloaded_file)
+            error_message = f"Download verification failed: {verify_message}"
+            send_websocket_message('install_complete', {'app_name': app_name, 'status': 'error', 'message': error_message})
+            save_install_status(app_name, 'failed', 0, 'Failed')
+            return False, error_message
+
         send_websocket_message('install_log', {'app_name': app_name, 'log': 'Download completed. Starting unpacking...'})
         send_websocket_message('install_progress', {'app_name': app_name, 'percentage': 100, 'stage': 'Download Complete'})
         
         # Ensure the venv directory exists
         os.makedirs(venv_path, exist_ok=True)
 
-        # Unpack the tar.gz file
+        # Unpack the tar.gz / tar.zst file
         send_websocket_message('install_progress', {'app_name': app_name, 'percentage': 0, 'stage': 'Unpacking'})
-        unpack_command = f"tar -xzvf {downloaded_file} -C {venv_path}"
+        unpack_start_time = time.time()
+        compression_flag = '-I zstd' if downloaded_file.endswith('.zst') else '-z'
+        unpack_command = f"tar {compression_flag} -xvf {downloaded_file} -C {venv_path}"
         process = subprocess.Popen(unpack_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
         
-        total_files = sum(1 for _ in subprocess.Popen(f"tar -tvf {downloaded_file}", shell=True, stdout=subprocess.PIPE).stdout)
+        total_files = sum(1 for _ in subprocess.Popen(f"tar {compression_flag} -tvf {downloaded_file}", shell=True, stdout=subprocess.PIPE).stdout)
         files_processed = 0
+        last_progress_time = 0
         
         for line in process.stdout:
             files_processed += 1
-            percentage = min(int((files_processed / total_files) * 100), 100)
-            send_websocket_message('install_progress', {
-                'app_name': app_name,
-                'percentage': percentage,
-                'stage': 'Unpacking',
-                'processed': files_processed,
-                'total': total_files
-            })
+            current_time = time.time()
+            if current_time - last_progress_time >= INSTALL_PROGRESS_INTERVAL or files_processed == total_files:
+                last_progress_time = current_time
+                percentage = min(int((files_processed / total_files) * 100), 100)
+                send_websocket_message('install_progress', {
+                    'app_name': app_name,
+                    'percentage': percentage,
+                    'stage': 'Unpacking',
+                    'processed': files_processed,
+                    'total': total_files
+                })
             send_websocket_message('install_log', {'app_name': app_name, 'log': f"Unpacking: {line.strip()}"})
         
         process.wait()
@@ -213,6 +346,7 @@ def download_and_unpack_venv(app_name, app_configs, send_websocket_message):
             save_install_status(app_name, 'failed', 0, 'Failed')
             return False, error_message
         
+        install_stage_duration.observe(time.time() - unpack_start_time, app=app_name, stage='unpack')
         send_websocket_message('install_progress', {'app_name': app_name, 'percentage': 100, 'stage': 'Unpacking Complete'})
 
         # Clone the repository if it doesn't exist
@@ -227,6 +361,7 @@ def download_and_unpack_venv(app_name, app_configs, send_websocket_message):
             elif app_name == 'ba1111':
                 repo_url = 'https://github.com/AUTOMATIC1111/stable-diffusion-webui.git'
             
+            clone_start_time = time.time()
             try:
                 git.Repo.clone_from(repo_url, app_path, progress=lambda op_code, cur_count, max_count, message: send_websocket_message('install_log', {
                     'app_name': app_name,
@@ -244,6 +379,8 @@ def download_and_unpack_venv(app_name, app_configs, send_websocket_message):
                         git.Repo.clone_from('https://github.com/ltdrdata/ComfyUI-Manager.git', comfyui_manager_path)
                         send_websocket_message('install_log', {'app_name': app_name, 'log': 'ComfyUI-Manager cloned successfully.'})
 
+                install_stage_duration.observe(time.time() - clone_start_time, app=app_name, stage='clone')
+
             except git.exc.GitCommandError as e:
                 send_websocket_message('install_log', {'app_name': app_name, 'log': f'Error cloning repository: {str(e)}'})
                 return False, f"Error cloning repository: {str(e)}"
@@ -266,28 +403,3 @@ def download_and_unpack_venv(app_name, app_configs, send_websocket_message):
         save_install_status(app_name, 'failed', 0, 'Failed')
         send_websocket_message('install_complete', {'app_name': app_name, 'status': 'error', 'message': error_message})
         return False, error_message
-
-def fix_custom_nodes(app_name, app_configs):
-    if app_name != 'bcomfy':
-        return False, "This operation is only available for Better ComfyUI."
-    
-    venv_path = app_configs['bcomfy']['venv_path']
-    app_path = app_configs['bcomfy']['app_path']
-    
-    try:
-        # Activate the virtual environment and run the commands
-        activate_venv = f"source {venv_path}/bin/activate"
-        set_default_command = f"comfy --skip-prompt --no-enable-telemetry set-default {app_path}"
-        restore_dependencies_command = "comfy node restore-dependencies"
-        
-        full_command = f"{activate_venv} && {set_default_command} && {restore_dependencies_command}"
-        
-        process = subprocess.Popen(full_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, executable='/bin/bash')
-        output, _ = process.communicate()
-        
-        if process.returncode == 0:
-            return True, f"Custom nodes fixed successfully. Output: {output.decode('utf-8')}"
-        else:
-            return False, f"Error fixing custom nodes. Output: {output.decode('utf-8')}"
-    except Exception as e:
-        return False, f"Error fixing custom nodes: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+import threading
+
+from utils.prometheus_utils import install_stage_duration
+from utils.thread_utils import run_parallel
+
+# Wheels built or downloaded once are kept on the network volume and installed offline afterwards
+WHEELHOUSE_DIR = '/workspace/.wheelhouse'
+NODE_WORKERS = 4  # custom nodes resolved / downloaded at the same time
+
+fix_lock = threading.Lock()
+fix_running = set()  # apps with a fix in progress
+
+def find_custom_nodes(app_path):
+    custom_nodes_dir = os.path.join(app_path, 'custom_nodes')
+    nodes = []
+    if not os.path.isdir(custom_nodes_dir):
+        return nodes
+    for name in sorted(os.listdir(custom_nodes_dir)):
+        node_path = os.path.join(custom_nodes_dir, name)
+        # ComfyUI-Manager disables nodes by renaming them to *.disabled
+        if not os.path.isdir(node_path) or name.startswith('.') or name.endswith('.disabled') or name == '__pycache__':
+            continue
+        requirements = os.path.join(node_path, 'requirements.txt')
+        install_script = os.path.join(node_path, 'install.py')
+        nodes.append({
+            'name': name,
+            'path': node_path,
+            'requirements': requirements if os.path.isfile(requirements) and os.path.getsize(requirements) else None,
+            'install_script': install_script if os.path.isfile(install_script) else None,
+        })
+    return nodes
+
+def stream_command(command, app_name, send_websocket_message, prefix, cwd=None):
+    # Every output line goes to the websocket as it is printed instead of after the command exits
+    process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               universal_newlines=True, bufsize=1)
+    for line in process.stdout:
+        line = line.rstrip()
+        if line:
+            send_websocket_message('install_log', {'app_name': app_name, 'log': f"[{prefix}] {line}"})
+    process.wait()
+    return process.returncode
+
+def find_unsatisfied_requirements(python, node, report_path):
+    # Dry run against the venv and the index: the report lists only what the venv does not already have,
+    # so torch and the other packages the venv ships with are never downloaded or built again
+    result = subprocess.run([python, '-m', 'pip', 'install', '--dry-run', '--quiet', '--find-links', WHEELHOUSE_DIR,
+                             '--report', report_path, '-r', node['requirements']],
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    if result.returncode != 0:
+        return None, result.stdout.strip().splitlines()[-1:] or ['pip dry run failed']
+    with open(report_path, 'r') as f:
+        report = json.load(f)
+
+    specs = []
+    for item in report.get('install', []):
+        download_info = item.get('download_info', {})
+        url = download_info.get('url', '')
+        if url.startswith('file://') and os.path.dirname(url[len('file://'):]) == WHEELHOUSE_DIR:
+            continue  # already in the wheelhouse
+        name, version = item['metadata']['name'], item['metadata']['version']
+        vcs_info = download_info.get('vcs_info')
+        if vcs_info:
+            specs.append(f"{name} @ {vcs_info['vcs']}+{url}@{vcs_info['commit_id']}")
+        elif item.get('is_direct'):
+            specs.append(f"{name} @ {url}")
+        else:
+            specs.append(f"{name}=={version}")
+    return specs, []
+
+def check_comfy_venv(app_name, app_configs):
+    if app_name != 'bcomfy':
+        return False, "This operation is only available for Better ComfyUI."
+    if not os.path.exists(os.path.join(app_configs['bcomfy']['venv_path'], 'bin', 'python')):
+        return False, f"Virtual environment not found: {app_configs['bcomfy']['venv_path']}"
+    return True, None
+
+def fix_custom_nodes(app_name, app_configs, send_websocket_message):
+    success, message = check_comfy_venv(app_name, app_configs)
+    if not success:
+        return False, message
+
+    python = os.path.join(app_configs['bcomfy']['venv_path'], 'bin', 'python')
+    app_path = app_configs['bcomfy']['app_path']
+
+    def log(message):
+        send_websocket_message('install_log', {'app_name': app_name, 'log': message})
+
+    timings = {}
+    try:
+        os.makedirs(WHEELHOUSE_DIR, exist_ok=True)
+        nodes = find_custom_nodes(app_path)
+        nodes_with_requirements = [node for node in nodes if node['requirements']]
+        log(f"Found {len(nodes)} custom nodes, {len(nodes_with_requirements)} with requirements. Wheelhouse: {WHEELHOUSE_DIR}")
+
+        # Resolve: read-only dry runs against the wheelhouse and the venv, safe to run side by side
+        start_time = time.time()
+        def resolve(node):
+            # Not streamed: a failure only means the node needs wheels
+            result = subprocess.run([python, '-m', 'pip', 'install', '--dry-run', '--no-index', '--quiet',
+                                     '--find-links', WHEELHOUSE_DIR, '-r', node['requirements']],
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return result.returncode == 0
+        resolved = run_parallel(resolve, nodes_with_requirements, NODE_WORKERS)
+        missing = [node for node in nodes_with_requirements if not resolved[node['name']]]
+        timings['resolve'] = time.time() - start_time
+        log(f"{len(nodes_with_requirements) - len(missing)} nodes satisfied offline, {len(missing)} need wheels.")
+
+        # Download / build the missing wheels once; each node gets its own directory so concurrent pip runs never share files
+        start_time = time.time()
+        def build_wheels(node):
+            wheel_dir = tempfile.mkdtemp(prefix=f".{node['name']}-", dir=WHEELHOUSE_DIR)
+            try:
+                specs, errors = find_unsatisfied_requirements(python, node, os.path.join(wheel_dir, 'report.json'))
+                if specs is None:
+                    log(f"[wheel {node['name']}] Could not resolve the requirements: {' '.join(errors)}")
+                    return False
+                if not specs:
+                    return True
+                log(f"[wheel {node['name']}] Building {len(specs)} missing packages: {', '.join(specs)}")
+                # Dependencies are already in the resolved list, so each spec is wheeled on its own
+                returncode = stream_command([python, '-m', 'pip', 'wheel', '--progress-bar', 'off', '--no-deps',
+                                             '--find-links', WHEELHOUSE_DIR, '--wheel-dir', wheel_dir] + specs,
+                                            app_name, send_websocket_message, f"wheel {node['name']}")
+                os.remove(os.path.join(wheel_dir, 'report.json'))
+                for filename in os.listdir(wheel_dir):
+                    os.replace(os.path.join(wheel_dir, filename), os.path.join(WHEELHOUSE_DIR, filename))
+                return returncode == 0
+            except (OSError, ValueError) as e:
+                # e.g. no report.json from a pip without --report (older than 22.2)
+                log(f"[wheel {node['name']}] Error building wheels: {str(e)}")
+                return False
+            finally:
+                shutil.rmtree(wheel_dir, ignore_errors=True)
+        built = run_parallel(build_wheels, missing, NODE_WORKERS)
+        failed_builds = [name for name, success in built.items() if not success]
+        if failed_builds:
+            log(f"Could not build all wheels for {', '.join(failed_builds)}, the install falls back to the package index.")
+        timings['download'] = time.time() - start_time
+
+        # Install: one pip run for all nodes, since parallel installs into the same venv are not safe
+        # and a single resolver pass catches conflicts between the nodes' pins
+        start_time = time.time()
+        failed = []
+        if nodes_with_requirements:
+            requirement_args = []
+            for node in nodes_with_requirements:
+                requirement_args += ['-r', node['requirements']]
+            install_command = [python, '-m', 'pip', 'install', '--progress-bar', 'off', '--find-links', WHEELHOUSE_DIR]
+            returncode = stream_command(install_command + ['--no-index'] + requirement_args,
+                                        app_name, send_websocket_message, 'install')
+            if returncode != 0:
+                log("Offline install from the wheelhouse failed, retrying with the package index...")
+                returncode = stream_command(install_command + requirement_args, app_name, send_websocket_message, 'install')
+            if returncode != 0:
+                failed.append('requirements')
+
+        # install.py scripts may pip install on their own, so they run one after another
+        for node in nodes:
+            if node['install_script']:
+                returncode = stream_command([python, 'install.py'], app_name, send_websocket_message,
+                                            f"install.py {node['name']}", cwd=node['path'])
+                if returncode != 0:
+                    failed.append(node['name'])
+        timings['install'] = time.time() - start_time
+
+        for stage, seconds in timings.items():
+            install_stage_duration.observe(seconds, app=app_name, stage=f"custom_nodes_{stage}")
+        summary = ', '.join(f"{stage} {seconds:.1f}s" for stage, seconds in timings.items())
+        log(f"Custom node dependencies restored ({summary}).")
+
+        if failed:
+            return False, f"Error fixing custom nodes: {', '.join(failed)} failed ({summary}). See the log for details."
+        return True, f"Custom nodes fixed successfully for {len(nodes)} nodes ({summary})."
+    except Exception as e:
+        return False, f"Error fixing custom nodes: {str(e)}"
+
+def run_fix_custom_nodes(app_name, app_configs, send_websocket_message):
+    try:
+        success, message = fix_custom_nodes(app_name, app_configs, send_websocket_message)
+    finally:
+        with fix_lock:
+            fix_running.discard(app_name)
+    send_websocket_message('custom_nodes_complete', {
+        'app_name': app_name,
+        'status': 'success' if success else 'error',
+        'message': message,
+    })
+
+def start_fix_custom_nodes(app_name, app_configs, send_websocket_message):
+    # Runs in the background for minutes; the log and the result arrive over the websocket
+    success, message = check_comfy_venv(app_name, app_configs)
+    if not success:
+        return False, message
+    with fix_lock:
+        if app_name in fix_running:
+            return False, "Custom nodes are already being fixed."
+        fix_running.add(app_name)
+    threading.Thread(target=run_fix_custom_nodes, args=(app_name, app_configs, send_websocket_message), daemon=True).start()
+    return True, "Fixing custom nodes started, progress is shown in the log."
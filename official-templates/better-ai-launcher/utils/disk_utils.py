@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import heapq
+import threading
+from concurrent.futures import wait, FIRST_COMPLETED
+
+# Native threads even when gevent has patched threading, so the stat() calls run in parallel
+# on the network volume and do not block the event loop
+from gevent.threadpool import ThreadPoolExecutor
+
+WORKSPACE_DIR = '/workspace'
+SHARED_MODELS_DIR = os.path.join(WORKSPACE_DIR, 'shared_models')
+DISK_CACHE_FILE = os.path.join(WORKSPACE_DIR, '.disk_usage_cache.json')
+SCAN_WORKERS = 16
+LARGEST_FILES = 50  # largest files kept per directory, and the default size of the report
+
+# Per directory: [mtime_ns, size of the files directly inside, file count, subdirectory names, largest files].
+# A directory whose mtime is unchanged had no entries added, removed or renamed, so its file list is
+# reused and only its subdirectories are stat()ed. Files rewritten in place are only picked up by a full scan.
+directory_cache = {}
+disk_usage = None
+scan_state = {'scanning': False, 'started': None, 'error': None}
+scan_lock = threading.Lock()
+
+def load_disk_cache():
+    global directory_cache
+    try:
+        with open(DISK_CACHE_FILE, 'r') as f:
+            directory_cache = json.load(f)
+    except (OSError, ValueError):
+        directory_cache = {}
+
+def save_disk_cache():
+    try:
+        with open(DISK_CACHE_FILE + '.tmp', 'w') as f:
+            json.dump(directory_cache, f, separators=(',', ':'))
+        os.replace(DISK_CACHE_FILE + '.tmp', DISK_CACHE_FILE)
+    except OSError as e:
+        print(f"Error saving disk usage cache: {str(e)}")
+
+def scan_directory(path, cached):
+    mtime = os.stat(path, follow_symlinks=False).st_mtime_ns
+    if cached and cached[0] == mtime:
+        return cached, True
+
+    files_size = 0
+    file_count = 0
+    subdirs = []
+    largest = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                # Symlinks (e.g. the app model folders pointing into shared_models) are not counted twice
+                if entry.is_symlink():
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file(follow_symlinks=False):
+                    size = entry.stat(follow_symlinks=False).st_size
+                    files_size += size
+                    file_count += 1
+                    if len(largest) < LARGEST_FILES:
+                        heapq.heappush(largest, (size, entry.name))
+                    elif size > largest[0][0]:
+                        heapq.heapreplace(largest, (size, entry.name))
+            except OSError:
+                continue
+    return [mtime, files_size, file_count, subdirs, sorted(largest, reverse=True)], False
+
+def walk_workspace(root, previous_cache):
+    scanned = {}
+    stats = {'directories': 0, 'cached_directories': 0, 'errors': 0}
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        pending = {executor.submit(scan_directory, root, previous_cache.get(root)): root}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    entry, from_cache = future.result()
+                except OSError:
+                    stats['errors'] += 1
+                    continue
+                scanned[path] = entry
+                stats['directories'] += 1
+                stats['cached_directories'] += from_cache
+                for name in entry[3]:
+                    subdir = os.path.join(path, name)
+                    pending[executor.submit(scan_directory, subdir, previous_cache.get(subdir))] = subdir
+    return scanned, stats
+
+def compute_totals(scanned):
+    # Deepest directories first, so every subdirectory total exists before its parent needs it
+    totals = {}
+    for path in sorted(scanned, key=lambda path: path.count(os.sep), reverse=True):
+        mtime, files_size, file_count, subdirs, largest = scanned[path]
+        size, count = files_size, file_count
+        for name in subdirs:
+            sub_size, sub_count = totals.get(os.path.join(path, name), (0, 0))
+            size += sub_size
+            count += sub_count
+        totals[path] = (size, count)
+    return totals
+
+def usage_of(path, totals):
+    size, files = totals.get(path.rstrip('/'), (0, 0))
+    return {'path': path, 'size': size, 'files': files}
+
+def build_report(app_configs, totals, root):
+    apps = {}
+    for app_name, config in app_configs.items():
+        app_path = config['app_path']
+        output_path = next((os.path.join(app_path, name) for name in ['output', 'outputs']
+                            if os.path.join(app_path, name) in totals), os.path.join(app_path, 'output'))
+        apps[app_name] = {
+            'venv': usage_of(config['venv_path'], totals),
+            'app': usage_of(app_path, totals),
+            'models': usage_of(os.path.join(app_path, 'models'), totals),
+            'outputs': usage_of(output_path, totals),
+            'instances': usage_of(os.path.join(WORKSPACE_DIR, 'instances', app_name), totals),
+        }
+        apps[app_name]['total'] = apps[app_name]['venv']['size'] + apps[app_name]['app']['size'] + apps[app_name]['instances']['size']
+
+    shared_models = {}
+    shared_entry = directory_cache.get(SHARED_MODELS_DIR)
+    for name in sorted(shared_entry[3]) if shared_entry else []:
+        shared_models[name] = usage_of(os.path.join(SHARED_MODELS_DIR, name), totals)
+
+    root_entry = directory_cache.get(root)
+    top_level = {name: totals.get(os.path.join(root, name), (0, 0))[0] for name in root_entry[3]} if root_entry else {}
+    total_size, total_files = totals.get(root, (0, 0))
+    return {
+        'root': root,
+        'total': total_size,
+        'files': total_files,
+        'apps': apps,
+        'shared_models': shared_models,
+        'top_level': dict(sorted(top_level.items(), key=lambda item: item[1], reverse=True)),
+    }
+
+def scan_disk_usage(app_configs, full=False, root=WORKSPACE_DIR):
+    global directory_cache, disk_usage
+    start_time = time.time()
+    if not directory_cache and not full:
+        load_disk_cache()
+
+    scanned, stats = walk_workspace(root, {} if full else directory_cache)
+    directory_cache = scanned
+    totals = compute_totals(scanned)
+    report = build_report(app_configs, totals, root)
+    report['totals'] = totals
+    report['stats'] = dict(stats, full=full, seconds=round(time.time() - start_time, 3))
+    report['scanned_at'] = time.time()
+    disk_usage = report
+    save_disk_cache()
+    print(f"Disk usage scan of {root}: {stats['directories']} directories ({stats['cached_directories']} unchanged) "
+          f"in {report['stats']['seconds']}s")
+    return report
+
+def run_disk_scan(app_configs, full):
+    try:
+        scan_disk_usage(app_configs, full)
+        scan_state['error'] = None
+    except Exception as e:
+        scan_state['error'] = str(e)
+        print(f"Error scanning disk usage: {str(e)}")
+    finally:
+        scan_state['scanning'] = False
+
+def start_disk_scan(app_configs, full=False):
+    with scan_lock:
+        if scan_state['scanning']:
+            return False
+        scan_state['scanning'] = True
+        scan_state['started'] = time.time()
+    threading.Thread(target=run_disk_scan, args=(app_configs, full), daemon=True).start()
+    return True
+
+def get_disk_usage():
+    if disk_usage is None:
+        return None
+    return {key: value for key, value in disk_usage.items() if key != 'totals'}
+
+def get_directory_usage(path):
+    # Direct children of an already scanned directory, largest first
+    path = os.path.normpath(path)
+    entry = directory_cache.get(path)
+    if disk_usage is None or entry is None:
+        return None
+    totals = disk_usage['totals']
+    children = [usage_of(os.path.join(path, name), totals) for name in entry[3]]
+    children.sort(key=lambda child: child['size'], reverse=True)
+    return {'path': path, 'size': totals.get(path, (0, 0))[0], 'files_size': entry[1], 'file_count': entry[2],
+            'children': children}
+
+def get_largest_files(limit=LARGEST_FILES, prefix=WORKSPACE_DIR):
+    prefix = os.path.normpath(prefix)
+    candidates = []
+    for path, entry in directory_cache.items():
+        if path == prefix or path.startswith(prefix + os.sep):
+            candidates.extend((size, os.path.join(path, name)) for size, name in entry[4])
+    return [{'path': path, 'size': size} for size, path in heapq.nlargest(limit, candidates)]
@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.thumbnail_utils import Image, process_image_safe
+
+GALLERY_DIR = '/workspace/.gallery'
+GALLERY_INDEX_FILE = os.path.join(GALLERY_DIR, 'index.db')
+THUMBNAILS_DIR = os.path.join(GALLERY_DIR, 'thumbnails')
+INSTANCES_DIR = '/workspace/instances'
+GALLERY_SCAN_INTERVAL = 15   # seconds between two checks of the output directories
+GALLERY_WORKERS = 2          # thumbnail processes; decoding large PNGs is CPU bound
+INDEX_BATCH_SIZE = 64        # images decoded between two commits of the index
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+gallery_stats = {'images': 0, 'indexed': 0, 'reused': 0, 'removed': 0, 'errors': 0,
+                 'last_scan': None, 'last_scan_seconds': None, 'thumbnails': Image is not None}
+gallery_lock = threading.Lock()
+gallery_db = None
+gallery_executor = None
+
+def get_output_dirs(app_name, app_config):
+    # ComfyUI writes to output/, Forge and A1111 to outputs/; extra instances have their own (see instance_utils)
+    dirs = [os.path.join(app_config['app_path'], name) for name in ['output', 'outputs']]
+    instances_dir = os.path.join(INSTANCES_DIR, app_name)
+    if os.path.isdir(instances_dir):
+        dirs += [os.path.join(instances_dir, index, 'output') for index in sorted(os.listdir(instances_dir))]
+    return [path for path in dirs if os.path.isdir(path)]
+
+def get_gallery_db():
+    global gallery_db
+    if gallery_db is None:
+        os.makedirs(GALLERY_DIR, exist_ok=True)
+        gallery_db = sqlite3.connect(GALLERY_INDEX_FILE, check_same_thread=False)
+        gallery_db.row_factory = sqlite3.Row
+        gallery_db.executescript('''
+            CREATE TABLE IF NOT EXISTS images (
+                id INTEGER PRIMARY KEY, path TEXT UNIQUE, app TEXT, dir TEXT, inode INTEGER, mtime_ns INTEGER,
+                size INTEGER, width INTEGER, height INTEGER, prompt TEXT, params TEXT, thumbnail TEXT);
+            CREATE INDEX IF NOT EXISTS images_app_mtime ON images (app, mtime_ns DESC);
+            CREATE INDEX IF NOT EXISTS images_inode_mtime ON images (inode, mtime_ns);
+            CREATE INDEX IF NOT EXISTS images_dir ON images (dir);
+            CREATE TABLE IF NOT EXISTS directories (path TEXT PRIMARY KEY, app TEXT, mtime_ns INTEGER, subdirs TEXT);
+        ''')
+    return gallery_db
+
+def get_executor():
+    global gallery_executor
+    if gallery_executor is None:
+        # forkserver: forking the gevent hub of the launcher is not safe, and the workers are forked
+        # from a server that only preloaded thumbnail_utils instead of each importing the launcher again
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['utils.thumbnail_utils'])
+        gallery_executor = ProcessPoolExecutor(GALLERY_WORKERS, mp_context=context)
+    return gallery_executor
+
+def thumbnail_path_for(app_name, inode, mtime_ns):
+    return os.path.join(THUMBNAILS_DIR, app_name, f"{inode}-{mtime_ns}.webp")
+
+def remove_images(db, rows):
+    for row in rows:
+        if row['thumbnail'] and os.path.exists(row['thumbnail']):
+            os.remove(row['thumbnail'])
+        db.execute('DELETE FROM images WHERE id = ?', (row['id'],))
+    gallery_stats['removed'] += len(rows)
+
+def scan_directory(db, app_name, path, pending, vanished, directory_updates):
+    # Unchanged directory mtime: no images added, removed or renamed here, only the subdirectories are checked
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return
+    directory_row = db.execute('SELECT mtime_ns, subdirs FROM directories WHERE path = ?', (path,)).fetchone()
+    if directory_row and directory_row['mtime_ns'] == mtime_ns:
+        for name in json.loads(directory_row['subdirs']):
+            scan_directory(db, app_name, os.path.join(path, name), pending, vanished, directory_updates)
+        return
+
+    subdirs = []
+    files = {}
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    files[entry.path] = entry.stat()
+            except OSError:
+                continue
+
+    indexed = {row['path']: row for row in db.execute('SELECT * FROM images WHERE dir = ?', (path,))}
+    vanished.extend(row for image_path, row in indexed.items() if image_path not in files)
+    for image_path, stat in files.items():
+        image_row = indexed.get(image_path)
+        if image_row is None or image_row['inode'] != stat.st_ino or image_row['mtime_ns'] != stat.st_mtime_ns:
+            pending.append((app_name, path, image_path, stat))
+
+    # Subdirectories that disappeared take their images with them
+    previous_subdirs = json.loads(directory_row['subdirs']) if directory_row else []
+    for name in set(previous_subdirs) - set(subdirs):
+        removed = os.path.join(path, name)
+        vanished.extend(db.execute('SELECT * FROM images WHERE dir = ? OR dir LIKE ?',
+                                   (removed, removed + os.sep + '%')).fetchall())
+        db.execute('DELETE FROM directories WHERE path = ? OR path LIKE ?', (removed, removed + os.sep + '%'))
+
+    # Stored only after its images are indexed, so an interrupted scan looks at this directory again
+    directory_updates.append((path, app_name, mtime_ns, json.dumps(subdirs)))
+    for name in subdirs:
+        scan_directory(db, app_name, os.path.join(path, name), pending, vanished, directory_updates)
+
+def reuse_moved_images(db, pending, vanished):
+    # A moved file keeps its inode and mtime: reuse its metadata and thumbnail instead of decoding it again
+    vanished_by_inode = {(row['inode'], row['mtime_ns']): row for row in vanished}
+    to_process = []
+    reused = set()
+    for app_name, directory, path, stat in pending:
+        moved = vanished_by_inode.pop((stat.st_ino, stat.st_mtime_ns), None)
+        if moved:
+            remove_images(db, db.execute('SELECT id, thumbnail FROM images WHERE path = ?', (path,)).fetchall())
+            db.execute('UPDATE images SET path = ?, dir = ?, app = ? WHERE id = ?', (path, directory, app_name, moved['id']))
+            reused.add(moved['id'])
+            gallery_stats['reused'] += 1
+        else:
+            to_process.append((app_name, directory, path, stat))
+    # Whatever was not found again has been deleted
+    remove_images(db, [row for row in vanished if row['id'] not in reused])
+    return to_process
+
+def store_images(db, batch, results):
+    for (app_name, directory, path, stat), (result, error) in zip(batch, results):
+        if error:
+            print(f"Error indexing {path}: {error}")
+            gallery_stats['errors'] += 1
+            continue
+        width, height, params, thumbnail = result
+        old = db.execute('SELECT thumbnail FROM images WHERE path = ?', (path,)).fetchone()
+        if old and old['thumbnail'] and old['thumbnail'] != thumbnail and os.path.exists(old['thumbnail']):
+            os.remove(old['thumbnail'])
+        db.execute('''INSERT OR REPLACE INTO images (path, app, dir, inode, mtime_ns, size, width, height, prompt, params, thumbnail)
+                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                   (path, app_name, directory, stat.st_ino, stat.st_mtime_ns, stat.st_size, width, height,
+                    params.get('prompt', ''), json.dumps(params), thumbnail))
+        gallery_stats['indexed'] += 1
+
+def scan_gallery(app_configs):
+    start_time = time.time()
+    pending = []
+    vanished = []
+    directory_updates = []
+    with gallery_lock:
+        db = get_gallery_db()
+        for app_name, config in app_configs.items():
+            for output_dir in get_output_dirs(app_name, config):
+                scan_directory(db, app_name, output_dir, pending, vanished, directory_updates)
+        to_process = reuse_moved_images(db, pending, vanished)
+        db.commit()
+
+    # The gallery API keeps answering while the worker processes decode; results are committed per batch
+    for offset in range(0, len(to_process), INDEX_BATCH_SIZE):
+        batch = to_process[offset:offset + INDEX_BATCH_SIZE]
+        jobs = [(path, thumbnail_path_for(app_name, stat.st_ino, stat.st_mtime_ns)) for app_name, directory, path, stat in batch]
+        results = list(get_executor().map(process_image_safe, jobs))
+        with gallery_lock:
+            store_images(db, batch, results)
+            db.commit()
+
+    with gallery_lock:
+        db.executemany('INSERT OR REPLACE INTO directories (path, app, mtime_ns, subdirs) VALUES (?, ?, ?, ?)', directory_updates)
+        db.commit()
+        gallery_stats['images'] = db.execute('SELECT COUNT(*) FROM images').fetchone()[0]
+    gallery_stats['last_scan'] = time.time()
+    gallery_stats['last_scan_seconds'] = round(time.time() - start_time, 3)
+    if pending:
+        print(f"Gallery index: {len(pending)} new or changed images in {gallery_stats['last_scan_seconds']}s")
+
+def gallery_indexer(app_configs):
+    while True:
+        try:
+            scan_gallery(app_configs)
+        except Exception as e:
+            print(f"Error updating the gallery index: {str(e)}")
+        time.sleep(GALLERY_SCAN_INTERVAL)
+
+def start_gallery_indexer(app_configs):
+    thread = threading.Thread(target=gallery_indexer, args=(app_configs,), daemon=True)
+    thread.start()
+    return thread
+
+def format_image(row):
+    return {
+        'id': row['id'],
+        'app': row['app'],
+        'path': row['path'],
+        'filename': os.path.basename(row['path']),
+        'size': row['size'],
+        'width': row['width'],
+        'height': row['height'],
+        'mtime': row['mtime_ns'] / 1e9,
+        'prompt': row['prompt'],
+        'thumbnail_url': f"/gallery/{row['id']}/thumbnail?v={row['mtime_ns']}" if row['thumbnail'] else None,
+        'image_url': f"/gallery/{row['id']}/image",
+    }
+
+def query_gallery(app_name=None, page=1, per_page=50, search=None):
+    conditions, args = [], []
+    if app_name:
+        conditions.append('app = ?')
+        args.append(app_name)
+    if search:
+        conditions.append('prompt LIKE ?')
+        args.append(f"%{search}%")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    with gallery_lock:
+        db = get_gallery_db()
+        total = db.execute(f'SELECT COUNT(*) FROM images {where}', args).fetchone()[0]
+        rows = db.execute(f'SELECT * FROM images {where} ORDER BY mtime_ns DESC LIMIT ? OFFSET ?',
+                          args + [per_page, (page - 1) * per_page]).fetchall()
+    return total, [format_image(row) for row in rows]
+
+def get_gallery_image(image_id):
+    with gallery_lock:
+        row = get_gallery_db().execute('SELECT * FROM images WHERE id = ?', (image_id,)).fetchone()
+    if row is None:
+        return None
+    image = format_image(row)
+    image['params'] = json.loads(row['params'] or '{}')
+    image['thumbnail'] = row['thumbnail']
+    return image
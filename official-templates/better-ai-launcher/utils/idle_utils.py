@@ -0,0 +1,295 @@
+import time
+import shutil
+import socket
+import threading
+import subprocess
+
+import psutil
+import requests
+
+from utils.app_utils import is_port_open, is_process_running
+from utils.instance_utils import get_app_instances
+from utils.telemetry_utils import app_metrics
+from utils.prometheus_utils import Counter, Histogram, SLOW_BUCKETS
+
+IDLE_CHECK_INTERVAL = 15   # seconds between two activity checks
+READY_TIMEOUT = 900        # seconds a held connection waits for an on-demand start
+START_PENDING_TIMEOUT = 60 # seconds a requested start may take to register its process
+PIPE_BUFFER_SIZE = 64 * 1024
+BUSY_CHECK_TIMEOUT = 3     # seconds for the queue/progress API of an app about to be stopped
+BUSY_CPU_PERCENT = 50      # process tree CPU that counts as working when the app API does not answer
+
+last_activity = {}
+pending_starts = {}  # app_name -> time its start was requested; the port is not held again meanwhile
+idle_stats = {}
+activators = {}
+
+idle_stops = Counter('launcher_app_idle_stops_total', 'Apps stopped after being idle.')
+idle_freed_bytes = Counter('launcher_app_idle_freed_bytes_total', 'RSS and VRAM released by idle stops.')
+cold_start_duration = Histogram('launcher_app_cold_start_seconds',
+                                'Time from the first connection to a stopped app until it was ready.', SLOW_BUCKETS)
+
+def get_idle_stats(app_name):
+    if app_name not in idle_stats:
+        idle_stats[app_name] = {
+            'idle_stops': 0,
+            'last_freed_rss': 0,
+            'last_freed_vram': 0,
+            'cold_starts': 0,
+            'last_cold_start_seconds': None,
+        }
+    return idle_stats[app_name]
+
+def count_port_connections(ports):
+    counts = {port: 0 for port in ports}
+    # One system-wide scan instead of one per app
+    for conn in psutil.net_connections(kind='tcp'):
+        if conn.status == psutil.CONN_ESTABLISHED and conn.laddr and conn.laddr.port in counts:
+            counts[conn.laddr.port] += 1
+    return counts
+
+def get_process_tree_rss(pid):
+    try:
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return 0, []
+    rss = 0
+    pids = []
+    for p in processes:
+        try:
+            rss += p.memory_info().rss
+            pids.append(p.pid)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return rss, pids
+
+def get_gpu_memory_by_pid():
+    if not shutil.which('nvidia-smi'):
+        return {}
+    try:
+        output = subprocess.run(['nvidia-smi', '--query-compute-apps=pid,used_memory', '--format=csv,noheader,nounits'],
+                                capture_output=True, text=True, timeout=10).stdout
+    except (subprocess.SubprocessError, OSError):
+        return {}
+    usage = {}
+    for line in output.splitlines():
+        try:
+            pid, used_mib = [part.strip() for part in line.split(',')]
+            usage[int(pid)] = int(used_mib) * 1024 * 1024
+        except ValueError:
+            pass
+    return usage
+
+class AppActivator:
+    # Holds a stopped app's port; the first connection starts the app and is piped to it once ready
+    def __init__(self, app_name, port, start_app_callback):
+        self.app_name = app_name
+        self.port = port
+        self.start_app_callback = start_app_callback
+        self.listener = None
+        self.lock = threading.Lock()
+
+    def is_listening(self):
+        return self.listener is not None
+
+    def listen(self):
+        with self.lock:
+            if self.listener is not None:
+                return True
+            try:
+                listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                listener.bind(('0.0.0.0', self.port))
+                listener.listen(16)
+            except OSError as e:
+                print(f"Could not hold port {self.port} for {self.app_name}: {str(e)}")
+                return False
+            self.listener = listener
+        threading.Thread(target=self._accept, args=(listener,), daemon=True).start()
+        return True
+
+    def close(self):
+        with self.lock:
+            listener, self.listener = self.listener, None
+        if listener is not None:
+            try:
+                listener.close()
+            except OSError:
+                pass
+
+    def _accept(self, listener):
+        try:
+            client, _ = listener.accept()
+        except OSError:
+            return  # closed by an explicit start or a settings change
+
+        # The app has to bind this port itself, so release it before starting;
+        # connections arriving during startup are refused and retried by the proxy/browser
+        release_app_port(self.app_name)
+        start_time = time.time()
+        print(f"Connection on port {self.port}, starting {self.app_name} on demand...")
+        self.start_app_callback(self.app_name)
+
+        while time.time() - start_time < READY_TIMEOUT:
+            if is_port_open(self.port):
+                break
+            time.sleep(0.5)
+        else:
+            client.close()
+            return
+
+        cold_start_seconds = time.time() - start_time
+        stats = get_idle_stats(self.app_name)
+        stats['cold_starts'] += 1
+        stats['last_cold_start_seconds'] = round(cold_start_seconds, 3)
+        cold_start_duration.observe(cold_start_seconds, app=self.app_name)
+        last_activity[self.app_name] = time.time()
+
+        try:
+            upstream = socket.create_connection(('127.0.0.1', self.port))
+        except OSError:
+            client.close()
+            return
+        threading.Thread(target=pipe_socket, args=(upstream, client), daemon=True).start()
+        pipe_socket(client, upstream)
+
+def pipe_socket(source, destination):
+    try:
+        while True:
+            data = source.recv(PIPE_BUFFER_SIZE)
+            if not data:
+                break
+            destination.sendall(data)
+    except OSError:
+        pass
+    finally:
+        for sock in (source, destination):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+def release_app_port(app_name):
+    # Called right before the app starts: the port stays free until the process is registered as running
+    pending_starts[app_name] = time.time()
+    activator = activators.get(app_name)
+    if activator:
+        activator.close()
+
+def get_running_instances(app_name, config, running_processes):
+    # The app and its extra instances (see instance_utils), each on its own port
+    instances = {}
+    for key in get_app_instances(app_name, running_processes):
+        process_info = running_processes[key]
+        if process_info['status'] == 'running' and is_process_running(process_info['pid']):
+            instances[key] = process_info.get('port') or config['port']
+    return instances
+
+def get_gpu_utilization():
+    if not shutil.which('nvidia-smi'):
+        return 0
+    try:
+        output = subprocess.run(['nvidia-smi', '--query-gpu=utilization.gpu', '--format=csv,noheader,nounits'],
+                                capture_output=True, text=True, timeout=10).stdout
+        return max([int(line) for line in output.split()] or [0])
+    except (subprocess.SubprocessError, OSError, ValueError):
+        return 0
+
+def is_instance_busy(app_name, key, port, pid):
+    # A queue keeps generating after the browser tab is closed, so no connections does not mean idle
+    try:
+        if app_name == 'bcomfy':
+            queue_info = requests.get(f"http://127.0.0.1:{port}/queue", timeout=BUSY_CHECK_TIMEOUT).json()
+            return bool(queue_info.get('queue_running') or queue_info.get('queue_pending'))
+        progress = requests.get(f"http://127.0.0.1:{port}/sdapi/v1/progress?skip_current_image=true",
+                                timeout=BUSY_CHECK_TIMEOUT).json()
+        return progress.get('state', {}).get('job_count', 0) > 0 or progress.get('progress', 0) > 0
+    except (requests.RequestException, ValueError, AttributeError):
+        pass
+
+    # No answer from the API (e.g. started without --api): fall back to CPU and GPU utilisation
+    samples = app_metrics.get(key)
+    if samples and samples[-1]['cpu_percent'] >= BUSY_CPU_PERCENT:
+        return True
+    _, pids = get_process_tree_rss(pid)
+    gpu_usage = get_gpu_memory_by_pid()
+    return any(p in gpu_usage for p in pids) and get_gpu_utilization() > 0
+
+def stop_idle_app(app_name, instances, running_processes, stop_app_callback):
+    rss = 0
+    pids = []
+    for key in instances:
+        instance_rss, instance_pids = get_process_tree_rss(running_processes[key]['pid'])
+        rss += instance_rss
+        pids += instance_pids
+    gpu_usage = get_gpu_memory_by_pid()
+    vram = sum(gpu_usage.get(p, 0) for p in pids)
+
+    stop_app_callback(app_name)
+
+    stats = get_idle_stats(app_name)
+    stats['idle_stops'] += 1
+    stats['last_freed_rss'] = rss
+    stats['last_freed_vram'] = vram
+    idle_stops.inc(app=app_name)
+    idle_freed_bytes.inc(rss, app=app_name, memory='rss')
+    idle_freed_bytes.inc(vram, app=app_name, memory='vram')
+    print(f"Stopped idle app {app_name} ({len(instances)} instances), freed {rss / (1024 * 1024):.0f} MB RAM "
+          f"and {vram / (1024 * 1024):.0f} MB VRAM.")
+
+def check_idle_apps(app_configs, running_processes, settings, stop_app_callback, start_app_callback, can_start_app):
+    idle_timeout = settings.get('idle_timeout_minutes', 0) * 60
+    on_demand_start = settings.get('on_demand_start', False)
+    now = time.time()
+    running = {app_name: get_running_instances(app_name, config, running_processes)
+               for app_name, config in app_configs.items()}
+    ports = [config['port'] for config in app_configs.values()]
+    ports += [port for instances in running.values() for port in instances.values()]
+    connections = count_port_connections(ports)
+
+    for app_name, config in list(app_configs.items()):
+        instances = running[app_name]
+        if instances:
+            pending_starts.pop(app_name, None)
+            if any(connections.get(port, 0) > 0 for port in instances.values()) or app_name not in last_activity:
+                last_activity[app_name] = now
+            elif idle_timeout and now - last_activity[app_name] >= idle_timeout:
+                busy = [key for key, port in instances.items()
+                        if is_instance_busy(app_name, key, port, running_processes[key]['pid'])]
+                if busy:
+                    last_activity[app_name] = now
+                    print(f"{app_name} has no connections but is still working ({', '.join(busy)}), not stopping it.")
+                else:
+                    stop_idle_app(app_name, instances, running_processes, stop_app_callback)
+                    instances = {}
+            if instances:
+                continue
+
+        last_activity.pop(app_name, None)
+        # A start was requested but the process is not registered yet: the app is about to bind the port
+        if now - pending_starts.get(app_name, 0) < START_PENDING_TIMEOUT:
+            continue
+        pending_starts.pop(app_name, None)
+        if app_name not in activators:
+            activators[app_name] = AppActivator(app_name, config['port'], start_app_callback)
+        activator = activators[app_name]
+        if on_demand_start and can_start_app(app_name):
+            activator.listen()
+        elif activator.is_listening():
+            activator.close()
+
+def run_idle_monitor(app_configs, running_processes, load_settings, stop_app_callback, start_app_callback, can_start_app):
+    while True:
+        try:
+            check_idle_apps(app_configs, running_processes, load_settings(),
+                            stop_app_callback, start_app_callback, can_start_app)
+        except Exception as e:
+            print(f"Error checking idle apps: {str(e)}")
+        time.sleep(IDLE_CHECK_INTERVAL)
+
+def start_idle_monitor(*args):
+    thread = threading.Thread(target=run_idle_monitor, args=args, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,155 @@
+import os
+import re
+import json
+import socket
+import shutil
+import subprocess
+
+# Extra instances of an app are tracked in running_processes as '<app_name>@<index>';
+# instance 0 keeps the plain app name, its configured port and its default directories
+INSTANCE_SEPARATOR = '@'
+INSTANCES_DIR = '/workspace/instances'
+NGINX_INSTANCES_DIR = '/etc/nginx/conf.d'
+MAX_INSTANCES = 8
+BALANCER_PORT_OFFSET = 1000  # nginx balancer listens on <app port> + offset
+
+def instance_key(app_name, index):
+    return app_name if index == 0 else f"{app_name}{INSTANCE_SEPARATOR}{index}"
+
+def split_instance_key(key):
+    app_name, _, index = key.partition(INSTANCE_SEPARATOR)
+    return app_name, int(index) if index.isdigit() else 0
+
+def get_app_instances(app_name, running_processes):
+    keys = [key for key in running_processes if split_instance_key(key)[0] == app_name]
+    return sorted(keys, key=lambda key: split_instance_key(key)[1])
+
+def get_instance_dirs(app_name, index):
+    base_dir = os.path.join(INSTANCES_DIR, app_name, str(index))
+    return os.path.join(base_dir, 'output'), os.path.join(base_dir, 'temp')
+
+# A1111/Forge read their output folders from the settings file, so every extra instance gets its
+# own config.json (a copy of the app's, with the outdir_* options moved into the instance folder)
+# and ui-config.json, passed with --ui-settings-file / --ui-config-file
+WEBUI_OUTDIRS = {
+    'outdir_samples': '',
+    'outdir_txt2img_samples': 'txt2img-images',
+    'outdir_img2img_samples': 'img2img-images',
+    'outdir_extras_samples': 'extras-images',
+    'outdir_grids': '',
+    'outdir_txt2img_grids': 'txt2img-grids',
+    'outdir_img2img_grids': 'img2img-grids',
+    'outdir_save': 'saved',
+    'outdir_init_images': 'init-images',
+}
+
+def write_instance_settings(app_config, output_dir):
+    instance_dir = os.path.dirname(output_dir)
+    settings_file = os.path.join(instance_dir, 'config.json')
+    ui_config_file = os.path.join(instance_dir, 'ui-config.json')
+
+    settings = {}
+    # Settings changed in an instance are kept; only a new instance starts from the app's settings
+    source = settings_file if os.path.exists(settings_file) else os.path.join(app_config['app_path'], 'config.json')
+    try:
+        with open(source, 'r') as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        pass
+    for key, name in WEBUI_OUTDIRS.items():
+        settings[key] = os.path.join(output_dir, name) if name else ''
+    with open(settings_file, 'w') as f:
+        json.dump(settings, f, indent=4)
+
+    base_ui_config = os.path.join(app_config['app_path'], 'ui-config.json')
+    if not os.path.exists(ui_config_file) and os.path.exists(base_ui_config):
+        shutil.copyfile(base_ui_config, ui_config_file)
+    return settings_file, ui_config_file
+
+def is_port_free(port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(('0.0.0.0', port))
+            return True
+        except OSError:
+            return False
+
+def allocate_instance_ports(app_name, count, app_configs, running_processes):
+    base_port = app_configs[app_name]['port']
+    reserved = {config['port'] for config in app_configs.values()}
+    reserved.update(info['port'] for info in running_processes.values() if info.get('port'))
+    reserved.update(config['port'] + BALANCER_PORT_OFFSET for config in app_configs.values())
+
+    ports = []
+    port = base_port + 1
+    while len(ports) < count and port < 65535:
+        if port not in reserved and is_port_free(port):
+            ports.append(port)
+        port += 1
+    if len(ports) < count:
+        raise RuntimeError(f"Could not allocate {count} free ports for {app_name}")
+    return ports
+
+def build_instance_command(app_name, index, port, app_configs):
+    app_config = app_configs[app_name]
+    command = re.sub(r'--port\s+\d+', f'--port {port}', app_config['command'])
+    if index == 0:
+        return command
+
+    output_dir, temp_dir = get_instance_dirs(app_name, index)
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(temp_dir, exist_ok=True)
+
+    settings_file = ui_config_file = ''
+    if '{settings_file}' in app_config.get('instance_args', ''):
+        settings_file, ui_config_file = write_instance_settings(app_config, output_dir)
+
+    # Extra instances share venv_path and app_path, so they must not (re)install into them
+    instance_args = app_config.get('instance_args', '').format(output_dir=output_dir, temp_dir=temp_dir,
+                                                               settings_file=settings_file, ui_config_file=ui_config_file)
+    return f"export TMPDIR={temp_dir} && {command} {instance_args}".strip()
+
+def render_nginx_upstream(app_name, ports, listen_port):
+    upstream_name = f"{app_name}_instances"
+    servers = '\n'.join(f"    server 127.0.0.1:{port};" for port in ports)
+    return f"""# Generated by the launcher for {app_name} ({len(ports)} instances)
+upstream {upstream_name} {{
+    least_conn;
+{servers}
+}}
+
+server {{
+    listen {listen_port};
+    server_name _;
+
+    location / {{
+        proxy_pass http://{upstream_name};
+        proxy_http_version 1.1;
+        proxy_set_header Upgrade $http_upgrade;
+        proxy_set_header Connection $connection_upgrade;
+        proxy_set_header Host $host;
+        proxy_set_header X-Real-IP $remote_addr;
+        proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_set_header X-Forwarded-Proto $scheme;
+        proxy_read_timeout 3600;
+    }}
+}}
+"""
+
+def write_nginx_upstream(app_name, ports, listen_port):
+    config = render_nginx_upstream(app_name, ports, listen_port)
+    config_path = os.path.join(NGINX_INSTANCES_DIR, f"{app_name}-instances.conf")
+    try:
+        if len(ports) > 1:
+            os.makedirs(NGINX_INSTANCES_DIR, exist_ok=True)
+            with open(config_path, 'w') as f:
+                f.write(config)
+        elif os.path.exists(config_path):
+            os.remove(config_path)
+        else:
+            return config  # single instance and no balancer to remove, nothing to reload
+        if shutil.which('nginx'):
+            subprocess.run(['nginx', '-s', 'reload'], check=False)
+    except OSError as e:
+        print(f"Error writing nginx upstream for {app_name}: {str(e)}")
+    return config
@@ -0,0 +1,176 @@
+import os
+import re
+import json
+import time
+import zlib
+import queue
+import threading
+from datetime import datetime
+
+from gevent import get_hub
+
+LOG_DIR = '/workspace/.launcher_logs'
+SEGMENT_MAX_BYTES = 16 * 1024 * 1024  # rotate once a compressed segment reaches this size
+MAX_SEGMENTS = 20                      # segments kept per app, oldest are deleted
+BLOCK_MAX_BYTES = 256 * 1024           # uncompressed bytes buffered before a block is written
+BLOCK_MAX_AGE = 2.0                    # seconds a buffered line may wait before its block is written
+
+SEGMENT_SUFFIX = '.log.gz'
+INDEX_SUFFIX = '.idx'
+
+log_writers = {}
+log_writers_lock = threading.Lock()
+
+def get_app_log_dir(app_name):
+    return os.path.join(LOG_DIR, app_name)
+
+def compress_block(data):
+    # Each block is a complete gzip member: the segment stays a valid .gz file (zcat works)
+    # and any block can be decompressed on its own from the offset recorded in the index
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+class AppLogWriter:
+    def __init__(self, app_name):
+        self.app_name = app_name
+        self.log_dir = get_app_log_dir(app_name)
+        self.queue = queue.Queue()
+        self.segment_path = None
+        self.segment_size = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    # Called from the app reader thread; never touches the disk
+    def write(self, line):
+        self.queue.put((time.time(), line))
+
+    def flush(self):
+        self.queue.put(None)
+
+    def _run(self):
+        block = []
+        block_size = 0
+        block_started = None
+        while True:
+            timeout = None if block_started is None else max(0, block_started + BLOCK_MAX_AGE - time.time())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is not None:
+                timestamp, line = item
+                entry = f"{timestamp:.3f}\t{line}\n"
+                block.append((timestamp, entry))
+                block_size += len(entry)
+                if block_started is None:
+                    block_started = time.time()
+                if block_size < BLOCK_MAX_BYTES:
+                    continue
+
+            if block:
+                try:
+                    # Compression and the file writes run in a native thread; this loop is a greenlet under gevent
+                    get_hub().threadpool.apply(self._write_block, (block,))
+                except OSError as e:
+                    print(f"Error writing log segment for {self.app_name}: {str(e)}")
+                    self.segment_path = None  # the next block starts a new segment
+            block = []
+            block_size = 0
+            block_started = None
+
+    def _open_segment(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        name = f"{self.app_name}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+        self.segment_path = os.path.join(self.log_dir, name + SEGMENT_SUFFIX)
+        self.segment_size = 0
+        self._remove_old_segments()
+
+    def _remove_old_segments(self):
+        segments = list_segments(self.app_name)
+        # Keep room for the segment about to be opened
+        for segment_path in segments[:len(segments) - MAX_SEGMENTS + 1]:
+            for path in (segment_path, segment_path + INDEX_SUFFIX):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _write_block(self, block):
+        if self.segment_path is None or self.segment_size >= SEGMENT_MAX_BYTES:
+            self._open_segment()
+
+        data = compress_block(''.join(entry for _, entry in block).encode('utf-8'))
+        # The offset comes from the file itself, so a block written without its index entry cannot shift later entries
+        with open(self.segment_path, 'ab') as f:
+            offset = f.tell()
+            f.write(data)
+            self.segment_size = f.tell()
+        with open(self.segment_path + INDEX_SUFFIX, 'a') as f:
+            f.write(json.dumps({
+                'start': block[0][0],
+                'end': block[-1][0],
+                'offset': offset,
+                'length': len(data),
+                'lines': len(block),
+            }) + '\n')
+
+def get_log_writer(app_name):
+    with log_writers_lock:
+        if app_name not in log_writers:
+            log_writers[app_name] = AppLogWriter(app_name)
+        return log_writers[app_name]
+
+def list_segments(app_name):
+    log_dir = get_app_log_dir(app_name)
+    if not os.path.isdir(log_dir):
+        return []
+    # Segment names embed their creation time, so name order is time order
+    return sorted(os.path.join(log_dir, name) for name in os.listdir(log_dir) if name.endswith(SEGMENT_SUFFIX))
+
+def read_index(segment_path):
+    entries = []
+    try:
+        with open(segment_path + INDEX_SUFFIX, 'r') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass  # partially written last entry
+    except FileNotFoundError:
+        pass
+    return entries
+
+def search_logs(app_name, pattern=None, start=None, end=None, limit=1000):
+    regex = re.compile(pattern) if pattern else None
+    matches = 0
+    for segment_path in list_segments(app_name):
+        index = read_index(segment_path)
+        if not index:
+            continue
+        if (start is not None and index[-1]['end'] < start) or (end is not None and index[0]['start'] > end):
+            continue
+
+        try:
+            f = open(segment_path, 'rb')
+        except FileNotFoundError:
+            continue  # pruned by the writer since it was listed
+        with f:
+            for block in index:
+                if (start is not None and block['end'] < start) or (end is not None and block['start'] > end):
+                    continue
+                f.seek(block['offset'])
+                try:
+                    data = zlib.decompress(f.read(block['length']), 31).decode('utf-8', errors='replace')
+                except zlib.error as e:
+                    print(f"Skipping unreadable log block in {segment_path} at {block['offset']}: {str(e)}")
+                    continue
+                for entry in data.rstrip('\n').split('\n'):
+                    timestamp, _, line = entry.partition('\t')
+                    timestamp = float(timestamp)
+                    if (start is not None and timestamp < start) or (end is not None and timestamp > end):
+                        continue
+                    if regex and not regex.search(line):
+                        continue
+                    yield {'time': timestamp, 'line': line}
+                    matches += 1
+                    if limit and matches >= limit:
+                        return
@@ -0,0 +1,415 @@
+import os
+import re
+import json
+import time
+import uuid
+import queue
+import hashlib
+import threading
+from urllib.parse import urlparse, unquote
+
+import requests
+from gevent import get_hub
+
+from utils.disk_utils import SHARED_MODELS_DIR
+from utils.prometheus_utils import Counter, Gauge
+
+# The shared_models folders that sync_model_symlinks links into the apps
+MODEL_CATEGORIES = ['Stable-diffusion', 'VAE', 'Lora', 'ESRGAN']
+MAX_CONCURRENT_DOWNLOADS = 2     # files downloaded at the same time, the rest waits in the queue
+CONNECTIONS_PER_DOWNLOAD = 4     # ranged connections per file
+MIN_SEGMENT_SIZE = 32 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+PROGRESS_INTERVAL = 0.5          # seconds between two websocket progress events per download
+STATE_SAVE_INTERVAL = 5          # seconds between two writes of the resume state
+MAX_RETRIES = 5                  # per segment, with exponential backoff
+FINISHED_RETENTION = 3600        # seconds a completed, cancelled or failed download stays listed
+MAX_FINISHED_DOWNLOADS = 50      # finished downloads kept listed at most
+FINISHED_STATUSES = ['completed', 'cancelled', 'failed']
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+FILENAME_PATTERN = re.compile(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)"?', re.IGNORECASE)
+
+downloads = {}
+download_queue = queue.Queue()
+download_callbacks = {}
+download_workers = []
+download_lock = threading.Lock()
+
+model_download_bytes = Counter('launcher_model_download_bytes_total', 'Bytes downloaded into shared_models, by category.')
+model_downloads_active = Gauge('launcher_model_downloads_active', 'Model downloads currently transferring.',
+                               callback=lambda: sum(1 for job in downloads.values() if job['status'] == 'downloading'))
+
+class DownloadCancelled(Exception):
+    pass
+
+def get_model_categories():
+    # Other shared_models subfolders are not linked into any app, so a model downloaded there would never show up
+    return list(MODEL_CATEGORIES)
+
+def safe_filename(name):
+    name = os.path.basename(unquote(name or '').strip().replace('\\', '/'))
+    if not name or name.startswith('.'):
+        return None
+    return name
+
+def get_download_paths(job):
+    target_dir = os.path.join(SHARED_MODELS_DIR, job['category'])
+    part_path = os.path.join(target_dir, f".{job['filename']}.part")
+    return target_dir, os.path.join(target_dir, job['filename']), part_path, part_path + '.json'
+
+def find_active_download(category, filename, exclude=None, statuses=('queued', 'downloading', 'verifying')):
+    for other in downloads.values():
+        if other is not exclude and other['category'] == category and other['filename'] == filename and \
+                other['status'] in statuses:
+            return other
+    return None
+
+def public_job(job):
+    return {key: value for key, value in job.items() if key not in ['cancel', 'segments', 'last_progress', 'last_state_save']}
+
+def list_downloads():
+    return [public_job(job) for job in downloads.values()]
+
+def prune_downloads():
+    # Finished jobs leave the list (and the websocket state sent to every new client) after a while
+    finished = sorted((job for job in downloads.values() if job['status'] in FINISHED_STATUSES and job['finished']),
+                      key=lambda job: job['finished'], reverse=True)
+    now = time.time()
+    send_websocket_message = download_callbacks.get('send_websocket_message')
+    for index, job in enumerate(finished):
+        if index >= MAX_FINISHED_DOWNLOADS or now - job['finished'] > FINISHED_RETENTION:
+            downloads.pop(job['id'], None)
+            if send_websocket_message:
+                send_websocket_message('download_progress', {'download_id': job['id'], 'removed': True})
+
+def report_progress(job, force=False):
+    now = time.time()
+    if not force and now - job['last_progress'] < PROGRESS_INTERVAL:
+        return
+    job['last_progress'] = now
+
+    elapsed = now - job['run_started'] if job.get('run_started') else 0
+    transferred = job['downloaded'] - job.get('resumed_from', 0)
+    job['speed'] = round(transferred / elapsed) if elapsed > 0 else 0
+    job['eta'] = round((job['total'] - job['downloaded']) / job['speed']) if job['speed'] and job['total'] else None
+    job['percentage'] = round(job['downloaded'] * 100 / job['total'], 2) if job['total'] else None
+
+    send_websocket_message = download_callbacks.get('send_websocket_message')
+    if send_websocket_message:
+        send_websocket_message('download_progress', {
+            'download_id': job['id'],
+            'filename': job['filename'],
+            'category': job['category'],
+            'status': job['status'],
+            'downloaded': job['downloaded'],
+            'total': job['total'],
+            'percentage': job['percentage'],
+            'speed': job['speed'],
+            'eta': job['eta'],
+            'error': job['error'],
+        })
+
+def save_resume_state(job, state_path, force=False):
+    now = time.time()
+    if not force and now - job['last_state_save'] < STATE_SAVE_INTERVAL:
+        return
+    job['last_state_save'] = now
+    with open(state_path + '.tmp', 'w') as f:
+        json.dump({'url': job['url'], 'total': job['total'], 'segments': job['segments']}, f)
+    os.replace(state_path + '.tmp', state_path)
+
+def load_resume_state(job, part_path, state_path):
+    # Only resume a partial file of the same URL and size
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+        if state['url'] == job['url'] and state['total'] == job['total'] and os.path.exists(part_path):
+            return state['segments']
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+def plan_segments(total):
+    count = max(1, min(CONNECTIONS_PER_DOWNLOAD, total // MIN_SEGMENT_SIZE))
+    size = total // count
+    segments = []
+    for index in range(count):
+        start = index * size
+        end = total - 1 if index == count - 1 else start + size - 1
+        segments.append({'start': start, 'end': end, 'done': 0})
+    return segments
+
+def probe_download(job):
+    # A one byte ranged GET works where HEAD is not allowed (e.g. presigned URLs) and follows redirects to the CDN
+    with requests.get(job['url'], headers={'Range': 'bytes=0-0'}, stream=True, allow_redirects=True, timeout=30) as response:
+        response.raise_for_status()
+        supports_ranges = response.status_code == 206
+        if supports_ranges:
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            total = int(total) if total.isdigit() else None
+        else:
+            total = int(response.headers.get('Content-Length', 0)) or None
+
+        filename = None
+        match = FILENAME_PATTERN.search(response.headers.get('Content-Disposition', ''))
+        if match:
+            filename = safe_filename(match.group(1))
+
+        # Hugging Face publishes the sha256 of LFS files as X-Linked-Etag on the redirect
+        checksum = None
+        for hop in response.history + [response]:
+            etag = hop.headers.get('X-Linked-Etag', '').strip('"').lower()
+            if SHA256_PATTERN.match(etag):
+                checksum = etag
+        return response.url, total, supports_ranges, filename, checksum
+
+def resolve_download_url(job, url):
+    # Presigned redirect targets expire, so a retry resolves job['url'] again instead of reusing the old target
+    try:
+        return probe_download(job)[0]
+    except requests.RequestException as e:
+        print(f"Download {job['id']} could not resolve {job['url']} again ({str(e)}), keeping the previous URL")
+        return url
+
+def download_segment(job, url, fd, segment, state_path, stop_event):
+    retries = 0
+    while segment['start'] + segment['done'] <= segment['end']:
+        offset = segment['start'] + segment['done']
+        try:
+            with requests.get(url, headers={'Range': f"bytes={offset}-{segment['end']}"}, stream=True, timeout=60) as response:
+                if response.status_code != 206:
+                    raise requests.RequestException(f"Range request returned HTTP {response.status_code}")
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if job['cancel'] or stop_event.is_set():
+                        raise DownloadCancelled()
+                    chunk = chunk[:segment['end'] + 1 - segment['start'] - segment['done']]
+                    # Disk writes in a native thread, so a slow volume does not stall the event loop
+                    get_hub().threadpool.apply(os.pwrite, (fd, chunk, segment['start'] + segment['done']))
+                    segment['done'] += len(chunk)
+                    job['downloaded'] += len(chunk)
+                    model_download_bytes.inc(len(chunk), category=job['category'])
+                    report_progress(job)
+                    save_resume_state(job, state_path)
+            retries = 0
+        except requests.RequestException as e:
+            retries += 1
+            if retries > MAX_RETRIES:
+                raise
+            print(f"Download {job['id']} segment at {offset} failed ({str(e)}), retry {retries}/{MAX_RETRIES}")
+            time.sleep(min(2 ** retries, 30))
+            if job['cancel'] or stop_event.is_set():
+                raise DownloadCancelled()
+            url = resolve_download_url(job, url)
+
+def download_ranged(job, url, part_path, state_path):
+    segments = load_resume_state(job, part_path, state_path)
+    if segments is None:
+        segments = plan_segments(job['total'])
+        with open(part_path, 'wb') as f:
+            f.truncate(job['total'])
+    job['segments'] = segments
+    job['downloaded'] = job['resumed_from'] = sum(segment['done'] for segment in segments)
+
+    errors = []
+    stop_event = threading.Event()
+    def run_segment(segment):
+        try:
+            download_segment(job, url, fd, segment, state_path, stop_event)
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()  # one failing segment stops the others
+
+    fd = os.open(part_path, os.O_WRONLY)
+    try:
+        threads = [threading.Thread(target=run_segment, args=(segment,), daemon=True) for segment in segments]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        os.close(fd)
+        save_resume_state(job, state_path, force=True)
+
+    # Report the segment that failed rather than the ones it stopped
+    failures = [e for e in errors if not isinstance(e, DownloadCancelled)]
+    if failures:
+        raise failures[0]
+    if errors:
+        raise DownloadCancelled()
+
+def download_single(job, url, part_path):
+    # No range support: one connection, restarted from the beginning on failure
+    job['downloaded'] = job['resumed_from'] = 0
+    with requests.get(url, stream=True, timeout=60) as response, open(part_path, 'wb') as f:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            if job['cancel']:
+                raise DownloadCancelled()
+            f.write(chunk)
+            job['downloaded'] += len(chunk)
+            model_download_bytes.inc(len(chunk), category=job['category'])
+            report_progress(job)
+
+def hash_file(path, job=None):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            if job and job['cancel']:
+                raise DownloadCancelled()
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def run_download(job):
+    job['status'] = 'downloading'
+    job['error'] = None
+    job['cancel'] = False
+    job['run_started'] = time.time()
+    report_progress(job, force=True)
+    part_path = state_path = None
+    try:
+        url, total, supports_ranges, filename, checksum = probe_download(job)
+        job['filename'] = job['filename'] or filename or safe_filename(urlparse(url).path)
+        if not job['filename']:
+            raise ValueError("Could not determine a file name, pass 'filename'")
+        job['total'] = total
+        job['sha256'] = job['sha256'] or checksum
+
+        target_dir, target_path, part_path, state_path = get_download_paths(job)
+        # Jobs for the same file would share the part file
+        with download_lock:
+            other = find_active_download(job['category'], job['filename'], exclude=job, statuses=('downloading', 'verifying'))
+            if other:
+                part_path = state_path = None  # the other job's files are left alone
+                raise ValueError(f"{target_path} is already being downloaded ({other['id']})")
+            job['path'] = target_path
+        if os.path.exists(target_path) and not job['overwrite']:
+            raise FileExistsError(f"{target_path} already exists")
+        os.makedirs(target_dir, exist_ok=True)
+
+        if supports_ranges and total:
+            download_ranged(job, url, part_path, state_path)
+        else:
+            download_single(job, url, part_path)
+
+        if job['sha256']:
+            job['status'] = 'verifying'
+            report_progress(job, force=True)
+            # Hash multi-GB files in a native thread so the event loop keeps serving
+            sha256 = get_hub().threadpool.apply(hash_file, (part_path, job))
+            if sha256 != job['sha256']:
+                for path in [part_path, state_path]:
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise ValueError(f"Checksum mismatch: expected sha256 {job['sha256']}, got {sha256}")
+
+        # Same directory, so the finished model appears atomically under its final name
+        os.replace(part_path, target_path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        job['status'] = 'completed'
+        on_complete = download_callbacks.get('on_complete')
+        if on_complete:
+            on_complete()
+    except DownloadCancelled:
+        job['status'] = 'cancelled'
+        for path in [part_path, state_path]:
+            if path and os.path.exists(path):
+                os.remove(path)
+    except Exception as e:
+        # The partial file and its resume state are kept for a retry
+        job['status'] = 'failed'
+        job['error'] = str(e)
+        print(f"Model download {job['id']} failed: {str(e)}")
+    finally:
+        job['finished'] = time.time()
+        report_progress(job, force=True)
+
+def download_worker():
+    while True:
+        job = downloads.get(download_queue.get())
+        if job and job['status'] == 'queued':
+            run_download(job)
+            prune_downloads()
+
+def start_download_workers(send_websocket_message, on_complete):
+    download_callbacks['send_websocket_message'] = send_websocket_message
+    download_callbacks['on_complete'] = on_complete
+    with download_lock:
+        while len(download_workers) < MAX_CONCURRENT_DOWNLOADS:
+            thread = threading.Thread(target=download_worker, daemon=True)
+            thread.start()
+            download_workers.append(thread)
+
+def queue_model_download(url, category, filename=None, sha256=None, overwrite=False):
+    if not isinstance(url, str) or urlparse(url).scheme not in ['http', 'https']:
+        return False, f"Invalid URL: {url}"
+    if category not in get_model_categories():
+        return False, f"Unknown category '{category}', expected one of {', '.join(get_model_categories())}"
+    if filename is not None and (not isinstance(filename, str) or not safe_filename(filename)):
+        return False, f"Invalid file name: {filename}"
+    if sha256 and (not isinstance(sha256, str) or not SHA256_PATTERN.match(sha256.lower())):
+        return False, "sha256 must be 64 hex characters"
+    if not isinstance(overwrite, bool):
+        return False, "overwrite must be true or false"
+
+    prune_downloads()
+    for job in downloads.values():
+        if job['url'] == url and job['category'] == category and job['status'] in ['queued', 'downloading', 'verifying']:
+            return False, f"{url} is already being downloaded ({job['id']})"
+    if filename:
+        other = find_active_download(category, safe_filename(filename))
+        if other:
+            return False, f"{category}/{other['filename']} is already being downloaded ({other['id']})"
+
+    job = {
+        'id': uuid.uuid4().hex[:12],
+        'url': url,
+        'category': category,
+        'filename': safe_filename(filename) if filename else None,
+        'sha256': sha256.lower() if sha256 else None,
+        'overwrite': bool(overwrite),
+        'path': None,
+        'status': 'queued',
+        'downloaded': 0,
+        'total': None,
+        'percentage': None,
+        'speed': 0,
+        'eta': None,
+        'error': None,
+        'created': time.time(),
+        'finished': None,
+        'cancel': False,
+        'segments': [],
+        'last_progress': 0,
+        'last_state_save': 0,
+    }
+    downloads[job['id']] = job
+    download_queue.put(job['id'])
+    report_progress(job, force=True)
+    return True, job['id']
+
+def cancel_model_download(download_id):
+    job = downloads.get(download_id)
+    if not job:
+        return False, f"Download {download_id} not found"
+    if job['status'] == 'queued':
+        job['status'] = 'cancelled'
+        job['finished'] = time.time()
+        report_progress(job, force=True)
+    elif job['status'] in ['downloading', 'verifying']:
+        job['cancel'] = True
+    else:
+        return False, f"Download {download_id} is already {job['status']}"
+    return True, f"Download {download_id} cancelled"
+
+def retry_model_download(download_id):
+    job = downloads.get(download_id)
+    if not job:
+        return False, f"Download {download_id} not found"
+    if job['status'] not in ['failed', 'cancelled']:
+        return False, f"Download {download_id} is {job['status']}"
+    job['status'] = 'queued'
+    job['finished'] = None
+    download_queue.put(download_id)
+    report_progress(job, force=True)
+    return True, f"Download {download_id} queued again"
@@ -0,0 +1,116 @@
+import re
+import time
+
+# tqdm bars as printed by ComfyUI, Forge and A1111 (sampling steps and model downloads), e.g.
+#  45%|████▌     | 9/20 [00:02<00:02,  4.11it/s]
+# Total progress: 100%|██████████| 20/20 [00:03<00:00,  5.80it/s]
+# model.safetensors:  45%|███▌    | 1.02G/2.27G [00:10<00:12, 101MB/s]
+TQDM_PATTERN = re.compile(
+    r'(?:(?P<desc>[^|\r\n]*?):?\s*)?(?P<percentage>\d{1,3})%\|[^|]*\|\s*'
+    r'(?P<current>[\d.]+)(?P<current_suffix>[kMGTP]?)/(?P<total>[\d.]+|\?)(?P<total_suffix>[kMGTP]?)\s*'
+    r'\[(?P<elapsed>[\d:]+)(?:<(?P<eta>[\d:?]+))?,?\s*(?P<rate>[\d.]+|\?)?\s*(?P<rate_unit>[^\],]*)'
+)
+
+# A1111/Forge: "Model loaded in 4.2s (load weights from disk: 0.5s, ...)."
+MODEL_LOADED_PATTERN = re.compile(r'Model loaded in (?P<seconds>[\d.]+)s')
+# A1111/Forge: "Loading weights [6ce0161689] from /workspace/.../model.safetensors"
+MODEL_LOADING_PATTERN = re.compile(r'Loading weights \[(?P<hash>[^\]]*)\] from (?P<path>.+)')
+# ComfyUI: "Prompt executed in 3.45 seconds"
+PROMPT_EXECUTED_PATTERN = re.compile(r'Prompt executed in (?P<seconds>[\d.]+) seconds')
+
+SIZE_SUFFIXES = {'': 1, 'k': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12, 'P': 1e15}
+# tqdm rate units: 'MB/s' (unit_scale), 'MiB/s' (unit_divisor=1024), 'it/s' or 's/it' below one per second
+BYTE_RATE_PATTERN = re.compile(r'^(?P<suffix>[kKMGTP]?)(?P<binary>i?)B/s$')
+
+# Minimum seconds between two websocket progress events for the same app
+PROGRESS_EVENT_INTERVAL = 0.5
+
+def parse_duration(value):
+    if not value or '?' in value:
+        return None
+    seconds = 0
+    for part in value.split(':'):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+def scale_size(value, suffix, binary=False):
+    # tqdm scales counts and rate with the same divisor: 1024 when the rate unit is e.g. 'MiB/s'
+    suffix = suffix.upper().replace('K', 'k')
+    if binary:
+        return value * 1024 ** list(SIZE_SUFFIXES).index(suffix)
+    return value * SIZE_SUFFIXES[suffix]
+
+def normalize_rate(rate, rate_unit):
+    # Byte rates in B/s like current/total, step rates in it/s
+    match = BYTE_RATE_PATTERN.match(rate_unit)
+    if match:
+        return scale_size(rate, match.group('suffix'), bool(match.group('binary'))), 'B/s'
+    if rate_unit == 's/it':
+        return (1 / rate if rate else None), 'it/s'
+    return rate, rate_unit
+
+def parse_progress_line(line):
+    match = TQDM_PATTERN.search(line)
+    if match:
+        rate_unit = (match.group('rate_unit') or '').strip()
+        desc = (match.group('desc') or '').strip()
+        if desc.lower().startswith('total progress'):
+            kind = 'total'
+        elif rate_unit.endswith('B/s'):
+            kind = 'download'
+        else:
+            kind = 'steps'
+
+        total = match.group('total')
+        rate = match.group('rate')
+        binary = rate_unit.endswith('iB/s')
+        rate, rate_unit = normalize_rate(float(rate), rate_unit) if rate and rate != '?' else (None, rate_unit)
+        return {
+            'kind': kind,
+            'desc': desc,
+            'percentage': int(match.group('percentage')),
+            'current': scale_size(float(match.group('current')), match.group('current_suffix'), binary),
+            'total': None if total == '?' else scale_size(float(total), match.group('total_suffix'), binary),
+            'rate': rate,
+            'rate_unit': rate_unit,
+            'elapsed': parse_duration(match.group('elapsed')),
+            'eta': parse_duration(match.group('eta')),
+        }
+
+    match = MODEL_LOADED_PATTERN.search(line)
+    if match:
+        return {'kind': 'model_loaded', 'percentage': 100, 'seconds': float(match.group('seconds'))}
+
+    match = MODEL_LOADING_PATTERN.search(line)
+    if match:
+        return {'kind': 'model_loading', 'percentage': 0, 'path': match.group('path').strip()}
+
+    match = PROMPT_EXECUTED_PATTERN.search(line)
+    if match:
+        return {'kind': 'prompt_executed', 'percentage': 100, 'seconds': float(match.group('seconds'))}
+
+    return None
+
+class ProgressTracker:
+    def __init__(self, app_name, send_websocket_message):
+        self.app_name = app_name
+        self.send_websocket_message = send_websocket_message
+        self.last_event = None
+        self.last_sent = 0
+
+    # Returns the parsed event (or None); redraws are throttled, completions always go out
+    def handle_line(self, line, redraw=False):
+        event = parse_progress_line(line)
+        if not event:
+            return None
+
+        now = time.time()
+        finished = not redraw or event['percentage'] >= 100
+        changed_kind = not self.last_event or self.last_event['kind'] != event['kind']
+        if finished or changed_kind or now - self.last_sent >= PROGRESS_EVENT_INTERVAL:
+            event['app_name'] = self.app_name
+            event['timestamp'] = now
+            self.send_websocket_message('app_progress', event)
+            self.last_sent = now
+        self.last_event = event
+        return event
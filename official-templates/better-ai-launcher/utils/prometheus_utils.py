@@ -0,0 +1,148 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Minimal in-process Prometheus instrumentation (text exposition format 0.0.4).
+# Updates are a dict lookup and an add under a lock, cheap enough for every request and websocket message.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SLOW_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+registry = []
+
+def format_labels(label_items):
+    if not label_items:
+        return ''
+    escaped = [(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for key, value in label_items]
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    metric_type = 'untyped'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self.lock:
+            items = list(self.values.items())
+        for label_items, value in items:
+            lines.append(f"{self.name}{format_labels(label_items)} {format_value(value)}")
+        return lines
+
+class Counter(Metric):
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    metric_type = 'gauge'
+
+    def __init__(self, name, documentation, callback=None):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[tuple(sorted(labels.items()))] = value
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self):
+        # Callback gauges are read at scrape time, e.g. the number of open websockets
+        if self.callback:
+            self.set(self.callback())
+        return super().render()
+
+class Histogram(Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self.lock:
+            items = [(key, list(state['counts']), state['sum'], state['count']) for key, state in self.values.items()]
+        for label_items, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = label_items + (('le', format_value(float(bound))),)
+                lines.append(f"{self.name}_bucket{format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(label_items)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(label_items)} {count}")
+        return lines
+
+def render_metrics():
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+# Launcher control-plane metrics
+http_request_duration = Histogram('launcher_http_request_duration_seconds',
+                                  'HTTP request latency by route.')
+websocket_messages = Counter('launcher_websocket_messages_total',
+                             'Messages broadcast by send_websocket_message, by type.')
+websocket_send_errors = Counter('launcher_websocket_send_errors_total',
+                                'Websocket sends that failed and dropped the socket.')
+websocket_broadcast_duration = Histogram('launcher_websocket_broadcast_duration_seconds',
+                                         'Time to send one message to all connected websockets.')
+websocket_pending_broadcasts = Gauge('launcher_websocket_pending_broadcasts',
+                                     'Broadcasts currently being sent (the launcher has no separate send queue).')
+install_stage_duration = Histogram('launcher_install_stage_duration_seconds',
+                                   'Duration of each venv install stage.', SLOW_BUCKETS)
+install_bytes = Counter('launcher_install_downloaded_bytes_total',
+                        'Bytes downloaded by venv installs.')
+install_download_throughput = Gauge('launcher_install_download_bytes_per_second',
+                                    'Average download throughput of the last venv install.')
+app_start_to_ready = Histogram('launcher_app_start_to_ready_seconds',
+                               'Time from launching an app until its port accepts connections.', SLOW_BUCKETS)
+symlink_sync_duration = Histogram('launcher_symlink_sync_duration_seconds',
+                                  'Duration of a shared model symlink sync.')
+ui_interactive_duration = Histogram('launcher_ui_interactive_seconds',
+                                    'Time from navigation until the launcher page is interactive, reported by the browser.')
+ui_transfer_bytes = Counter('launcher_ui_transfer_bytes_total',
+                            'Bytes transferred for launcher page loads, reported by the browser.')
+ui_page_loads = Counter('launcher_ui_page_loads_total', 'Launcher page loads that reported their timing.')
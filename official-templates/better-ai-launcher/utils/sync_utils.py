@@ -0,0 +1,347 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+from gevent import get_hub
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.client import Config
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+
+from utils.disk_utils import WORKSPACE_DIR, SHARED_MODELS_DIR
+from utils.gallery_utils import get_output_dirs
+from utils.prometheus_utils import Counter
+from utils.thread_utils import run_parallel
+
+MB = 1024 * 1024
+SYNC_STATE_FILE = os.path.join(WORKSPACE_DIR, '.sync_state.json')
+MANIFEST_NAME = '.sync_manifest.json'
+SYNC_BUCKET = os.environ.get('SYNC_BUCKET', 'workspace-sync')
+SYNC_PREFIX = os.environ.get('SYNC_PREFIX', 'workspace')  # stable across pods, so a new pod can restore it
+FILE_WORKERS = 8            # files transferred at the same time
+PART_SIZE = 64 * MB         # multipart threshold and part size
+PART_CONCURRENCY = 4        # parts in flight per file
+HASH_CHUNK_SIZE = MB
+PROGRESS_INTERVAL = 1.0     # seconds between two websocket progress events
+STATE_SAVE_INTERVAL = 10    # seconds between two writes of the local state during a sync
+SYNC_CHECK_INTERVAL = 60    # seconds between two checks of the sync schedule
+
+# Per relative path: [size, mtime_ns, sha256] of the copy in the bucket. A file whose size and mtime
+# match is not read at all; a changed one is hashed and only uploaded if its content really changed.
+sync_state = {'operation': None, 'status': 'idle', 'started': None, 'finished': None, 'files': 0, 'done': 0,
+              'transferred': 0, 'unchanged': 0, 'skipped': 0, 'deleted': 0, 'bytes_total': 0, 'bytes_done': 0,
+              'errors': [], 'error': None, 'last_sync': None}
+sync_lock = threading.Lock()
+sync_callbacks = {}
+
+sync_bytes = Counter('launcher_sync_bytes_total', 'Bytes transferred by the workspace sync, by direction.')
+
+def get_s3_client():
+    # MinIO configuration (same environment variables as container-template/publish_venv.py)
+    return boto3.client('s3',
+                        endpoint_url=os.environ.get('MINIO_ENDPOINT', 'https://s3.madiator.com'),
+                        aws_access_key_id=os.environ.get('MINIO_ACCESS_KEY', ''),
+                        aws_secret_access_key=os.environ.get('MINIO_SECRET_KEY', ''),
+                        # Plain Content-MD5/Content-Length uploads, without the CRC trailers older MinIO versions reject
+                        config=Config(signature_version='s3v4', request_checksum_calculation='when_required',
+                                      response_checksum_validation='when_required'),
+                        region_name=os.environ.get('MINIO_REGION', 'us-east-1'))
+
+def get_transfer_config():
+    return TransferConfig(multipart_threshold=PART_SIZE, multipart_chunksize=PART_SIZE,
+                          max_concurrency=PART_CONCURRENCY, use_threads=True)
+
+def get_sync_target(settings):
+    return settings.get('sync_bucket') or SYNC_BUCKET, (settings.get('sync_prefix') or SYNC_PREFIX).strip('/')
+
+def get_sync_paths(app_configs, settings):
+    # Default: shared models, app outputs and ComfyUI workflows; the venvs and app code are reinstalled, not synced
+    if settings.get('sync_paths'):
+        paths = [os.path.join(WORKSPACE_DIR, path) for path in settings['sync_paths']]
+    else:
+        paths = [SHARED_MODELS_DIR]
+        for app_name, config in app_configs.items():
+            paths += get_output_dirs(app_name, config)
+            paths.append(os.path.join(config['app_path'], 'user', 'default', 'workflows'))
+    paths = [os.path.normpath(path) for path in paths]
+    return [path for path in paths if path.startswith(WORKSPACE_DIR + os.sep) and os.path.isdir(path)]
+
+def list_local_files(paths):
+    files = {}
+    for path in paths:
+        for root, dirs, names in os.walk(path):
+            # Hidden entries are launcher state and partial downloads (.<name>.part)
+            dirs[:] = [name for name in dirs if not name.startswith('.')]
+            for name in names:
+                file_path = os.path.join(root, name)
+                if name.startswith('.') or os.path.islink(file_path):
+                    continue
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                files[os.path.relpath(file_path, WORKSPACE_DIR)] = (stat.st_size, stat.st_mtime_ns, file_path)
+    return files
+
+def hash_file(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+def load_manifest(client, bucket, prefix):
+    try:
+        response = client.get_object(Bucket=bucket, Key=f"{prefix}/{MANIFEST_NAME}")
+        return json.loads(response['Body'].read())
+    except ClientError as e:
+        if e.response['Error']['Code'] in ['NoSuchKey', 'NoSuchBucket', '404']:
+            return None
+        raise
+
+def load_sync_state(client, bucket, prefix):
+    # The local state only applies to the bucket and prefix it was written for, otherwise the bucket's manifest is used
+    try:
+        with open(SYNC_STATE_FILE, 'r') as f:
+            state = json.load(f)
+        if state.get('bucket') == bucket and state.get('prefix') == prefix:
+            return state
+    except (OSError, ValueError):
+        pass
+    manifest = load_manifest(client, bucket, prefix)
+    return {'bucket': bucket, 'prefix': prefix, 'files': manifest['files'] if manifest else {}}
+
+def save_sync_state(state):
+    with open(SYNC_STATE_FILE + '.tmp', 'w') as f:
+        json.dump(state, f, separators=(',', ':'))
+    os.replace(SYNC_STATE_FILE + '.tmp', SYNC_STATE_FILE)
+
+def report_progress(force=False):
+    now = time.time()
+    if not force and now - sync_state.get('last_progress', 0) < PROGRESS_INTERVAL:
+        return
+    sync_state['last_progress'] = now
+    send_websocket_message = sync_callbacks.get('send_websocket_message')
+    if send_websocket_message:
+        send_websocket_message('sync_progress', get_sync_status())
+
+def transfer_callback(direction):
+    # Called from the boto3 transfer threads with the bytes of each chunk
+    def callback(num_bytes):
+        sync_state['bytes_done'] += num_bytes
+        sync_bytes.inc(num_bytes, direction=direction)
+        report_progress()
+    return callback
+
+def ensure_bucket(client, bucket):
+    try:
+        client.head_bucket(Bucket=bucket)
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ['404', 'NoSuchBucket']:
+            raise
+        client.create_bucket(Bucket=bucket)
+
+def start_operation(operation):
+    sync_state.update({'operation': operation, 'status': 'scanning', 'started': time.time(), 'finished': None,
+                       'files': 0, 'done': 0, 'transferred': 0, 'unchanged': 0, 'skipped': 0, 'deleted': 0,
+                       'bytes_total': 0, 'bytes_done': 0, 'errors': [], 'error': None})
+    report_progress(force=True)
+
+def sync_workspace(app_configs, settings, delete=False):
+    bucket, prefix = get_sync_target(settings)
+    client = get_s3_client()
+    ensure_bucket(client, bucket)
+    state = load_sync_state(client, bucket, prefix)
+    remote_files = state['files']
+
+    paths = get_sync_paths(app_configs, settings)
+    local_files = get_hub().threadpool.apply(list_local_files, (paths,))
+    changed = [{'name': name, 'size': size, 'mtime_ns': mtime_ns, 'path': path}
+               for name, (size, mtime_ns, path) in local_files.items()
+               if remote_files.get(name, [None, None])[:2] != [size, mtime_ns]]
+    sync_state.update({'status': 'uploading', 'files': len(changed), 'bytes_total': sum(item['size'] for item in changed)})
+    report_progress(force=True)
+
+    transfer_config = get_transfer_config()
+    last_save = [time.time()]
+
+    def upload(item):
+        try:
+            # Touched but identical files (e.g. copied back with a new mtime) only update the state
+            sha256 = get_hub().threadpool.apply(hash_file, (item['path'],))
+            previous = remote_files.get(item['name'])
+            if previous and previous[2] == sha256:
+                sync_state['unchanged'] += 1
+                sync_state['bytes_done'] += item['size']
+            else:
+                client.upload_file(item['path'], bucket, f"{prefix}/{item['name']}", Config=transfer_config,
+                                   ExtraArgs={'Metadata': {'sha256': sha256}}, Callback=transfer_callback('upload'))
+                sync_state['transferred'] += 1
+            remote_files[item['name']] = [item['size'], item['mtime_ns'], sha256]
+            return True
+        except Exception as e:
+            sync_state['errors'].append(f"{item['name']}: {str(e)}")
+            return False
+        finally:
+            sync_state['done'] += 1
+            report_progress()
+            # Uploaded files are recorded as they finish, so an interrupted sync resumes where it stopped
+            if time.time() - last_save[0] > STATE_SAVE_INTERVAL:
+                last_save[0] = time.time()
+                save_sync_state(state)
+
+    run_parallel(upload, changed, FILE_WORKERS)
+
+    # Files deleted locally stay in the bucket unless asked otherwise; only paths under the synced folders are removed
+    if delete:
+        sync_state['status'] = 'deleting'
+        roots = tuple(os.path.relpath(path, WORKSPACE_DIR) + os.sep for path in paths)
+        removed = [name for name in remote_files if name not in local_files and name.startswith(roots)]
+        for offset in range(0, len(removed), 1000):
+            batch = removed[offset:offset + 1000]
+            client.delete_objects(Bucket=bucket, Delete={'Objects': [{'Key': f"{prefix}/{name}"} for name in batch],
+                                                         'Quiet': True})
+            for name in batch:
+                del remote_files[name]
+            sync_state['deleted'] += len(batch)
+
+    save_sync_state(state)
+    client.put_object(Bucket=bucket, Key=f"{prefix}/{MANIFEST_NAME}", ContentType='application/json',
+                      Body=json.dumps({'files': remote_files, 'updated': time.time()}).encode('utf-8'))
+    return state
+
+def restore_workspace(settings, overwrite=False):
+    bucket, prefix = get_sync_target(settings)
+    client = get_s3_client()
+    manifest = load_manifest(client, bucket, prefix)
+    if manifest is None:
+        raise FileNotFoundError(f"No workspace sync found at {bucket}/{prefix}")
+
+    items = []
+    for name, (size, mtime_ns, sha256) in manifest['files'].items():
+        path = os.path.normpath(os.path.join(WORKSPACE_DIR, name))
+        if not path.startswith(WORKSPACE_DIR + os.sep):
+            continue
+        if os.path.exists(path):
+            stat = os.stat(path)
+            # Identical files are kept; local files that differ are only replaced with overwrite
+            if (stat.st_size, stat.st_mtime_ns) == (size, mtime_ns):
+                sync_state['unchanged'] += 1
+                continue
+            if not overwrite:
+                sync_state['skipped'] += 1
+                continue
+        items.append({'name': name, 'path': path, 'size': size, 'mtime_ns': mtime_ns, 'sha256': sha256})
+    sync_state.update({'status': 'downloading', 'files': len(items), 'bytes_total': sum(item['size'] for item in items)})
+    report_progress(force=True)
+
+    transfer_config = get_transfer_config()
+
+    def download(item):
+        directory, filename = os.path.split(item['path'])
+        temp_path = os.path.join(directory, f".{filename}.sync")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            client.download_file(bucket, f"{prefix}/{item['name']}", temp_path, Config=transfer_config,
+                                 Callback=transfer_callback('download'))
+            sha256 = get_hub().threadpool.apply(hash_file, (temp_path,))
+            if sha256 != item['sha256']:
+                raise ValueError(f"Checksum mismatch: expected sha256 {item['sha256']}, got {sha256}")
+            # The original mtime keeps the file "unchanged" for the next sync
+            os.utime(temp_path, ns=(item['mtime_ns'], item['mtime_ns']))
+            os.replace(temp_path, item['path'])
+            sync_state['transferred'] += 1
+            return True
+        except Exception as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            sync_state['errors'].append(f"{item['name']}: {str(e)}")
+            return False
+        finally:
+            sync_state['done'] += 1
+            report_progress()
+
+    results = run_parallel(download, items, FILE_WORKERS)
+
+    # Failed files are left out of the state, so they are uploaded again if they exist locally
+    files = {name: entry for name, entry in manifest['files'].items() if results.get(name, True)}
+    state = {'bucket': bucket, 'prefix': prefix, 'files': files}
+    save_sync_state(state)
+    return state
+
+def run_sync_operation(operation, target, *args):
+    try:
+        target(*args)
+        sync_state['status'] = 'completed' if not sync_state['errors'] else 'failed'
+        if sync_state['errors']:
+            sync_state['error'] = f"{len(sync_state['errors'])} files failed"
+    except Exception as e:
+        sync_state['status'] = 'failed'
+        sync_state['error'] = str(e)
+        print(f"Workspace {operation} failed: {str(e)}")
+    finally:
+        sync_state['finished'] = time.time()
+        if operation == 'sync':
+            sync_state['last_sync'] = sync_state['finished']
+        elif sync_state['transferred'] and sync_callbacks.get('on_restore'):
+            sync_callbacks['on_restore']()
+        print(f"Workspace {operation}: {sync_state['transferred']} files transferred, {sync_state['unchanged']} unchanged, "
+              f"{len(sync_state['errors'])} errors in {sync_state['finished'] - sync_state['started']:.1f}s")
+        report_progress(force=True)
+
+def claim_sync(operation):
+    if boto3 is None:
+        return False, "boto3 is not installed"
+    with sync_lock:
+        if sync_state['status'] in ['scanning', 'uploading', 'downloading', 'deleting']:
+            return False, f"A workspace {sync_state['operation']} is already running"
+        start_operation(operation)
+    return True, f"Workspace {operation} started"
+
+def start_sync(app_configs, settings, delete=False):
+    success, message = claim_sync('sync')
+    if success:
+        threading.Thread(target=run_sync_operation, args=('sync', sync_workspace, app_configs, settings, delete),
+                         daemon=True).start()
+    return success, message
+
+def start_restore(settings, overwrite=False):
+    success, message = claim_sync('restore')
+    if success:
+        threading.Thread(target=run_sync_operation, args=('restore', restore_workspace, settings, overwrite),
+                         daemon=True).start()
+    return success, message
+
+def get_sync_status():
+    status = {key: value for key, value in sync_state.items() if key != 'last_progress'}
+    status['errors'] = sync_state['errors'][-20:]
+    return status
+
+def run_sync_scheduler(app_configs, load_settings):
+    while True:
+        try:
+            settings = load_settings()
+            interval = settings.get('sync_interval_minutes', 0) * 60
+            last_sync = sync_state['last_sync'] or sync_callbacks.get('scheduler_started', 0)
+            if interval and time.time() - last_sync >= interval:
+                success, message = claim_sync('sync')
+                if success:
+                    run_sync_operation('sync', sync_workspace, app_configs, settings, settings.get('sync_delete') is True)
+        except Exception as e:
+            print(f"Error running the scheduled workspace sync: {str(e)}")
+        time.sleep(SYNC_CHECK_INTERVAL)
+
+def start_sync_scheduler(app_configs, load_settings, send_websocket_message, on_restore=None):
+    sync_callbacks['send_websocket_message'] = send_websocket_message
+    sync_callbacks['on_restore'] = on_restore
+    # The first scheduled sync runs one interval after the launcher starts, not right away
+    sync_callbacks['scheduler_started'] = time.time()
+    thread = threading.Thread(target=run_sync_scheduler, args=(app_configs, load_settings), daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,137 @@
+import time
+import threading
+from collections import deque
+
+import psutil
+
+SAMPLE_INTERVAL = 5   # seconds between two walks of the app process trees
+HISTORY_SIZE = 720    # samples kept per app (1 hour at the default interval)
+PSS_EVERY = 6         # PSS needs /proc/<pid>/smaps, so it is refreshed every Nth sample only
+
+# Averaged when downsampling; counters are cumulative, so the last value of a bucket is kept instead
+GAUGE_FIELDS = ['cpu_percent', 'rss', 'pss', 'threads', 'fds', 'processes']
+COUNTER_FIELDS = ['read_bytes', 'write_bytes']
+
+app_metrics = {}
+sampler_stats = {
+    'interval': SAMPLE_INTERVAL,
+    'samples': 0,
+    'last_sample_seconds': 0.0,
+    'avg_sample_seconds': 0.0,
+    'cpu_seconds_total': 0.0,
+}
+
+# psutil.Process objects are kept between samples so cpu_percent() measures the interval since the last call
+tracked_processes = {}
+last_pss = {}
+
+def get_process_tree(pid):
+    root = tracked_processes.get(pid)
+    if root is None or not root.is_running():
+        root = psutil.Process(pid)
+    processes = [root]
+    for child in root.children(recursive=True):
+        cached = tracked_processes.get(child.pid)
+        processes.append(cached if cached is not None and cached.is_running() else child)
+    return processes
+
+def sample_process_tree(app_name, pid, include_pss, seen_pids):
+    sample = {'time': time.time(), 'cpu_percent': 0.0, 'rss': 0, 'pss': 0, 'threads': 0, 'fds': 0,
+              'read_bytes': 0, 'write_bytes': 0, 'processes': 0}
+
+    for process in get_process_tree(pid):
+        try:
+            # oneshot() caches /proc/<pid>/stat and status reads across the calls below
+            with process.oneshot():
+                sample['cpu_percent'] += process.cpu_percent(None)
+                sample['rss'] += process.memory_info().rss
+                sample['threads'] += process.num_threads()
+                sample['fds'] += process.num_fds()
+                try:
+                    io_counters = process.io_counters()
+                    sample['read_bytes'] += io_counters.read_bytes
+                    sample['write_bytes'] += io_counters.write_bytes
+                except (psutil.AccessDenied, AttributeError):
+                    pass
+                if include_pss:
+                    try:
+                        last_pss[process.pid] = process.memory_full_info().pss
+                    except (psutil.AccessDenied, AttributeError):
+                        last_pss[process.pid] = 0
+                sample['pss'] += last_pss.get(process.pid, 0)
+            tracked_processes[process.pid] = process
+            seen_pids.add(process.pid)
+            sample['processes'] += 1
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            tracked_processes.pop(process.pid, None)
+            last_pss.pop(process.pid, None)
+
+    sample['cpu_percent'] = round(sample['cpu_percent'], 1)
+    return sample
+
+def sample_running_apps(running_processes):
+    include_pss = sampler_stats['samples'] % PSS_EVERY == 0
+    seen_pids = set()
+    for app_name, process_info in list(running_processes.items()):
+        if process_info.get('status') != 'running':
+            continue
+        try:
+            sample = sample_process_tree(app_name, process_info['pid'], include_pss, seen_pids)
+        except psutil.NoSuchProcess:
+            continue
+        if app_name not in app_metrics:
+            app_metrics[app_name] = deque(maxlen=HISTORY_SIZE)
+        app_metrics[app_name].append(sample)
+
+    # Forget processes that exited since the previous sample
+    for pid in set(tracked_processes) - seen_pids:
+        tracked_processes.pop(pid, None)
+        last_pss.pop(pid, None)
+
+def run_sampler(running_processes):
+    while True:
+        start_time = time.perf_counter()
+        # CPU of this thread only: process_time would also count the threadpool (hashing, log compression, disk scans).
+        # A sample does not yield to other greenlets, so nothing else runs on this thread meanwhile
+        start_cpu = time.thread_time()
+        try:
+            sample_running_apps(running_processes)
+        except Exception as e:
+            print(f"Error sampling app resources: {str(e)}")
+
+        # Track the sampler's own cost so it can be left enabled in production
+        elapsed = time.perf_counter() - start_time
+        sampler_stats['samples'] += 1
+        sampler_stats['last_sample_seconds'] = round(elapsed, 6)
+        sampler_stats['avg_sample_seconds'] = round(
+            sampler_stats['avg_sample_seconds'] + (elapsed - sampler_stats['avg_sample_seconds']) / sampler_stats['samples'], 6)
+        sampler_stats['cpu_seconds_total'] = round(sampler_stats['cpu_seconds_total'] + time.thread_time() - start_cpu, 6)
+        time.sleep(SAMPLE_INTERVAL)
+
+def start_resource_sampler(running_processes):
+    thread = threading.Thread(target=run_sampler, args=(running_processes,), daemon=True)
+    thread.start()
+    return thread
+
+def downsample(samples, points):
+    if points <= 0 or len(samples) <= points:
+        return samples
+    bucket_size = len(samples) / points
+    result = []
+    for i in range(points):
+        bucket = samples[int(i * bucket_size):int((i + 1) * bucket_size)]
+        if not bucket:
+            continue
+        point = {'time': bucket[-1]['time']}
+        for field in GAUGE_FIELDS:
+            point[field] = round(sum(sample[field] for sample in bucket) / len(bucket), 1)
+        for field in COUNTER_FIELDS:
+            point[field] = bucket[-1][field]
+        result.append(point)
+    return result
+
+def get_app_metrics(app_name, since=None, points=120):
+    samples = list(app_metrics.get(app_name, []))
+    if since is not None:
+        samples = [sample for sample in samples if sample['time'] >= since]
+    return downsample(samples, points)
@@ -0,0 +1,28 @@
+import threading
+
+def run_parallel(target, items, workers):
+    # Runs target(item) on up to `workers` threads (greenlets under gevent, so the work should be subprocesses,
+    # network or threadpool calls); results are keyed by item['name'], False when target raised
+    results = {}
+    pending = list(items)
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not pending:
+                    return
+                item = pending.pop(0)
+            try:
+                results[item['name']] = target(item)
+            except Exception as e:
+                # Every item gets a result, so callers can read results[name] and list the failures
+                print(f"Error processing {item['name']}: {str(e)}")
+                results[item['name']] = False
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(min(workers, len(items)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
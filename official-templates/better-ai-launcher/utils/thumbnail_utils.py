@@ -0,0 +1,120 @@
+import os
+import json
+import zlib
+import struct
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Metadata and thumbnails for the gallery, run in its worker processes. Only the standard library and PIL
+# are imported here: the workers load this module and nothing of the launcher with its background threads.
+
+THUMBNAIL_SIZE = 320
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def read_png_text_chunks(path):
+    # Text chunks come before the image data in ComfyUI/A1111 PNGs, so IDAT is never read
+    info = {}
+    with open(path, 'rb') as f:
+        if f.read(8) != PNG_SIGNATURE:
+            return info
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            length, chunk_type = struct.unpack('>I4s', header)
+            if chunk_type in (b'IDAT', b'IEND'):
+                break
+            data = f.read(length)
+            f.seek(4, os.SEEK_CUR)  # CRC
+            if chunk_type == b'IHDR':
+                info['width'], info['height'] = struct.unpack('>II', data[:8])
+            elif chunk_type == b'tEXt':
+                key, _, value = data.partition(b'\0')
+                info.setdefault('text', {})[key.decode('latin-1')] = value.decode('latin-1')
+            elif chunk_type == b'zTXt':
+                key, _, value = data.partition(b'\0')
+                info.setdefault('text', {})[key.decode('latin-1')] = zlib.decompress(value[1:]).decode('latin-1')
+            elif chunk_type == b'iTXt':
+                key, _, rest = data.partition(b'\0')
+                compressed, rest = rest[0], rest[2:]
+                _, _, rest = rest.partition(b'\0')   # language tag
+                _, _, value = rest.partition(b'\0')  # translated keyword
+                info.setdefault('text', {})[key.decode('latin-1')] = (zlib.decompress(value) if compressed else value).decode('utf-8')
+    return info
+
+def parse_a1111_parameters(text):
+    # "<prompt>\nNegative prompt: <negative>\nSteps: 20, Sampler: Euler a, CFG scale: 7, Seed: 1, Size: 512x512, ..."
+    lines = text.strip().split('\n')
+    settings_line = lines.pop() if lines and lines[-1].startswith('Steps:') else ''
+    prompt_lines, negative_lines = [], []
+    target = prompt_lines
+    for line in lines:
+        if line.startswith('Negative prompt:'):
+            target = negative_lines
+            line = line[len('Negative prompt:'):].strip()
+        target.append(line)
+
+    settings = {}
+    for part in settings_line.split(', '):
+        key, separator, value = part.partition(': ')
+        if separator:
+            settings[key.strip()] = value.strip()
+    return {'prompt': '\n'.join(prompt_lines), 'negative_prompt': '\n'.join(negative_lines), 'settings': settings}
+
+def parse_comfy_prompt(text):
+    # API format graph: {node_id: {'class_type', 'inputs'}}; follow the sampler's positive/negative links to the text encoders
+    graph = json.loads(text)
+    result = {'prompt': '', 'negative_prompt': '', 'settings': {}}
+    def linked_text(link):
+        node = graph.get(str(link[0])) if isinstance(link, list) else None
+        return node['inputs'].get('text', '') if node and isinstance(node['inputs'].get('text'), str) else ''
+
+    for node in graph.values():
+        inputs = node.get('inputs', {})
+        if 'KSampler' in node.get('class_type', ''):
+            result['prompt'] = result['prompt'] or linked_text(inputs.get('positive'))
+            result['negative_prompt'] = result['negative_prompt'] or linked_text(inputs.get('negative'))
+            for key in ['seed', 'noise_seed', 'steps', 'cfg', 'sampler_name', 'scheduler', 'denoise']:
+                if key in inputs and not isinstance(inputs[key], list):
+                    result['settings'].setdefault(key, inputs[key])
+        elif 'ckpt_name' in inputs:
+            result['settings'].setdefault('model', inputs['ckpt_name'])
+    return result
+
+def extract_metadata(path):
+    info = read_png_text_chunks(path) if path.lower().endswith('.png') else {}
+    text = info.get('text', {})
+    params = {}
+    try:
+        if 'parameters' in text:
+            params = parse_a1111_parameters(text['parameters'])
+        elif 'prompt' in text:
+            params = parse_comfy_prompt(text['prompt'])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        pass
+    # The ComfyUI workflow can be megabytes and is only needed to reload it, so it is not indexed
+    params['text_keys'] = sorted(text)
+    return info.get('width'), info.get('height'), params
+
+def process_image(path, thumbnail_path):
+    width, height, params = extract_metadata(path)
+    thumbnail = None
+    if Image is not None:
+        with Image.open(path) as image:
+            width, height = width or image.width, height or image.height
+            image.draft('RGB', (THUMBNAIL_SIZE, THUMBNAIL_SIZE))  # JPEG decodes at a reduced scale
+            image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+            image.convert('RGB').save(thumbnail_path + '.tmp', 'WEBP', quality=80)
+            os.replace(thumbnail_path + '.tmp', thumbnail_path)
+            thumbnail = thumbnail_path
+    return width, height, params, thumbnail
+
+def process_image_safe(args):
+    try:
+        return process_image(*args), None
+    except Exception as e:
+        return None, str(e)
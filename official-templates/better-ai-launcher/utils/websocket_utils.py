@@ -1,16 +1,140 @@
 import json
+import time
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from utils.prometheus_utils import Gauge, websocket_messages, websocket_send_errors, websocket_broadcast_duration, websocket_pending_broadcasts
+
+# Protocol 1: every message is a full JSON document {'type', 'data'} (clients that never send 'hello').
+# Protocol 2: the client sends {'type': 'hello', 'data': {'protocol': 2, 'encoding': 'json' | 'msgpack'}},
+# gets a 'snapshot' of the state below and afterwards only 'delta' messages with the fields that changed.
+# Other events are sent as is. Compression is negotiated by the websocket server (permessage-deflate).
+PROTOCOL_VERSION = 2
+
+# Message types that describe per-app state; protocol 2 clients receive them as deltas of websocket_state
+STATE_MESSAGE_TYPES = {
+    'status_update': 'status',
+    'install_progress': 'install',
+    'app_progress': 'progress',
+    'download_progress': 'downloads',
+    'sync_progress': 'sync',
+}
+# Field that identifies the entry in the state (default 'app_name')
+STATE_KEY_FIELDS = {
+    'download_progress': 'download_id',
+    'sync_progress': 'operation',
+}
+# An event with {'removed': True} drops its entry (e.g. a pruned download); delta clients get the entry as None
 
 active_websockets = set()
+websocket_clients = {}
+websocket_state = {key: {} for key in STATE_MESSAGE_TYPES.values()}
+websocket_seq = 0
+
+websockets_active = Gauge('launcher_websockets_active', 'Currently connected dashboard websockets.',
+                          callback=lambda: len(active_websockets))
+
+def register_websocket(ws):
+    websocket_clients[ws] = {'protocol': 1, 'encoding': 'json'}
+    active_websockets.add(ws)
+
+def unregister_websocket(ws):
+    active_websockets.discard(ws)
+    websocket_clients.pop(ws, None)
+
+def encode_message(message, encoding):
+    if encoding == 'msgpack':
+        return msgpack.packb(message, use_bin_type=True)
+    return json.dumps(message, separators=(',', ':'))
+
+def negotiate_protocol(ws, options):
+    protocol = PROTOCOL_VERSION if options.get('protocol', 1) >= PROTOCOL_VERSION else 1
+    encoding = 'msgpack' if options.get('encoding') == 'msgpack' and msgpack is not None else 'json'
+    websocket_clients[ws] = {'protocol': protocol, 'encoding': encoding}
+
+    # The hello reply is always JSON so the client learns which encoding follows
+    ws.send(json.dumps({'type': 'hello', 'data': {'protocol': protocol, 'encoding': encoding}}))
+    if protocol == PROTOCOL_VERSION:
+        ws.send(encode_message({'type': 'snapshot', 'seq': websocket_seq, 'data': websocket_state}, encoding))
+    return protocol, encoding
+
+def update_websocket_state(key, data):
+    state = websocket_state[key]
+    delta = {}
+    for app_name, value in data.items():
+        previous = state.get(app_name)
+        if value is None:
+            if app_name in state:
+                del state[app_name]
+                delta[app_name] = None
+        elif isinstance(value, dict):
+            if not isinstance(previous, dict):
+                previous = state[app_name] = {}
+            changed = {field: field_value for field, field_value in value.items() if previous.get(field) != field_value}
+            # Each event describes the whole entry: fields it no longer has (e.g. speed/eta after
+            # the download stage) are removed and sent as None, which the client deletes
+            removed = [field for field in previous if field not in value]
+            for field in removed:
+                del previous[field]
+                changed[field] = None
+            if changed:
+                previous.update((field, field_value) for field, field_value in changed.items() if field not in removed)
+                delta[app_name] = changed
+        elif previous != value:
+            state[app_name] = value
+            delta[app_name] = value
+    return delta
 
 def send_websocket_message(message_type, data):
-    message = json.dumps({'type': message_type, 'data': data})
+    global websocket_seq
+    websocket_messages.inc(type=message_type)
+
+    v2_message = {'type': message_type, 'data': data}
+    if message_type in STATE_MESSAGE_TYPES:
+        key = STATE_MESSAGE_TYPES[message_type]
+        key_field = STATE_KEY_FIELDS.get(message_type, 'app_name')
+        if key_field in data and data.get('removed'):
+            state_data = {data[key_field]: None}
+        elif key_field in data:
+            fields = {field: value for field, value in data.items() if field != key_field}
+            state_data = {data[key_field]: fields}
+        else:
+            state_data = data
+        delta = update_websocket_state(key, state_data)
+        v2_message = None
+        if delta:
+            websocket_seq += 1
+            v2_message = {'type': 'delta', 'seq': websocket_seq, 'key': key, 'data': delta}
+
+    websocket_pending_broadcasts.inc()
+    start_time = time.perf_counter()
+    encoded = {}
     dead_sockets = set()
-    for ws in active_websockets:
+    for ws in list(active_websockets):
+        options = websocket_clients.get(ws, {'protocol': 1, 'encoding': 'json'})
+        if options['protocol'] == 1:
+            message = {'type': message_type, 'data': data}
+        elif v2_message is None:
+            continue  # nothing changed for delta clients
+        else:
+            message = v2_message
+
+        # Encode once per (protocol, encoding) pair, not once per socket
+        cache_key = (options['protocol'], options['encoding'])
+        if cache_key not in encoded:
+            encoded[cache_key] = json.dumps(message) if options['protocol'] == 1 else encode_message(message, options['encoding'])
         try:
-            ws.send(message)
+            ws.send(encoded[cache_key])
         except Exception as e:
             print(f"Error sending WebSocket message: {str(e)}")
             dead_sockets.add(ws)
-    
+            websocket_send_errors.inc()
+    websocket_broadcast_duration.observe(time.perf_counter() - start_time)
+    websocket_pending_broadcasts.dec()
+
     # Remove dead sockets
-    active_websockets.difference_update(dead_sockets)
+    for ws in dead_sockets:
+        unregister_websocket(ws)